@@ -1,317 +1,1090 @@
 import asyncio
 import aiohttp
+import codecs
 import json
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+import os
+import zlib
+from multidict import CIMultiDict
+from urllib.parse import urldefrag, urljoin, urlparse, urlsplit
 import re
-from typing import Dict, List, Any
+import ssl
 import time
+from concurrent.futures import Executor
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional, Tuple
 
-class WebsiteAnalyzer:
+from dom_rules import RuleEngine, default_rules
+from html_parsers import get_parser_backend
+from http_session import create_session, get_shared_session
+from rate_limit import THROTTLE_STATUSES, HostRateLimiter, host_limiter
+from request_timing import RequestTiming, unthrottled_clock
+from scoring import CATEGORIES
+from single_flight import SingleFlight
+
+try:
+    import brotli
+    # Decompressed output can only be bounded with output_buffer_limit, new in brotli 1.2
+    if not hasattr(brotli.Decompressor(), 'can_accept_more_data'):
+        brotli = None
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Categories that only inspect the fetched document, with no further requests
+DOCUMENT_CATEGORIES = ['accessibility', 'seo', 'security', 'content']
+
+# Per-category time limits in seconds; performance also probes images. The
+# transport audit is not a scored category but runs under a limit too
+DEFAULT_CATEGORY_TIMEOUTS = {
+    'performance': 60,
+    'accessibility': 30,
+    'seo': 30,
+    'security': 30,
+    'content': 30,
+    'transport': 30
+}
+
+# Pages are read in chunks and cut off after MAX_PAGE_BYTES of decoded body
+MAX_PAGE_BYTES = int(os.environ.get('MAX_PAGE_BYTES', 5 * 1024 * 1024))
+FETCH_CHUNK_SIZE = int(os.environ.get('FETCH_CHUNK_SIZE', 64 * 1024))
+
+# Retries after a 429/503, only when the host asks us to wait at most RATE_LIMIT_MAX_WAIT seconds
+RATE_LIMIT_RETRIES = int(os.environ.get('RATE_LIMIT_RETRIES', 2))
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', 30))
+
+# Only advertise codings we can decode ourselves
+ACCEPT_ENCODING = ', '.join(['gzip', 'deflate'] + (['br'] if brotli else []) + (['zstd'] if zstandard else []))
+
+# The transport audit requests the page once with each of these codings
+AUDIT_ENCODINGS = ('gzip', 'br', 'zstd', 'identity')
+
+# Resource size probes running in this process by URL, shared by every analyzer
+_probes = SingleFlight()
+
+class PageDocument:
+    """A page fetched and parsed once, shared by every category analyzer
+    
+    The HTML is parsed with the configured html_parsers backend on first
+    access to index, and every rule the checks need is evaluated in that
+    single pass over its parse events. When the checks run in an executor,
+    the page is never parsed here; apply_evaluation() stores the compact
+    results sent back instead.
+    """
+    
+    def __init__(self, url: str, status: int, headers: CIMultiDict, content: str, load_time: float,
+                 content_size: Optional[int] = None, transfer_size: Optional[int] = None,
+                 truncated: bool = False, timing: Optional[RequestTiming] = None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.load_time = load_time
+        # Decoded body bytes; fetch_page counts them while streaming
+        self.content_size = len(content.encode('utf-8')) if content_size is None else content_size
+        # Bytes received on the wire, before content decoding
+        self.transfer_size = self.content_size if transfer_size is None else transfer_size
+        # True when the body was cut off at MAX_PAGE_BYTES
+        self.truncated = truncated
+        # Phase timings of the fetch, when it was measured
+        self.timing = timing
+        # Category results computed off the event loop
+        self.checks: Dict[str, Dict[str, Any]] = {}
+        self._index = None
+        self._image_sources = None
+        self._internal_links = None
+        self._sub_resources = None
+    
+    @property
+    def index(self) -> Dict[str, Any]:
+        """Results of the single-pass rule traversal, keyed by rule name"""
+        if self._index is None:
+            self._index = RuleEngine(default_rules()).run(get_parser_backend().events(self.content))
+        return self._index
+    
+    def visible_text(self) -> str:
+        """Document text without script, style, template or ruby annotation contents"""
+        return self.index['text']
+    
+    @property
+    def is_html(self) -> bool:
+        content_type = self.headers.get('content-type', 'text/html')
+        return 'html' in content_type.lower()
+    
+    def image_sources(self) -> List[Optional[str]]:
+        """The src attribute of every <img>, None where it is missing"""
+        if self._image_sources is None:
+            self._image_sources = self.index['images']['sources']
+        return self._image_sources
+    
+    def internal_links(self) -> List[str]:
+        """Absolute same-origin http(s) links on the page, without fragments, in document order"""
+        if self._internal_links is None:
+            origin = urlparse(self.url)
+            links = []
+            for href in self.index['links']:
+                target, _ = urldefrag(urljoin(self.url, href))
+                parts = urlparse(target)
+                if parts.scheme == origin.scheme and parts.netloc == origin.netloc:
+                    links.append(target)
+            self._internal_links = list(dict.fromkeys(links))
+        return self._internal_links
+    
+    def sub_resources(self) -> List[Dict[str, Any]]:
+        """Stylesheets, scripts and fonts the page loads, each absolute http(s) URL once
+        
+        Each is {"type", "url", "render_blocking"}; a URL referenced more than
+        once blocks rendering if any reference does.
+        """
+        if self._sub_resources is None:
+            resources = {}
+            for resource in self.index['sub_resources']:
+                target, _ = urldefrag(urljoin(self.url, resource["url"]))
+                if urlparse(target).scheme not in ('http', 'https'):
+                    continue
+                if target in resources:
+                    resources[target]["render_blocking"] |= resource["render_blocking"]
+                else:
+                    resources[target] = {**resource, "url": target}
+            self._sub_resources = list(resources.values())
+        return self._sub_resources
+    
+    def apply_evaluation(self, evaluation: Dict[str, Any]):
+        """Adopt results computed by evaluate_page so this page never needs parsing"""
+        self.checks = evaluation["checks"]
+        self._image_sources = evaluation["image_sources"]
+        self._internal_links = evaluation["internal_links"]
+        self._sub_resources = evaluation["sub_resources"]
+
+def evaluate_page(url: str, status: int, headers: List[Tuple[str, str]], content: str, load_time: float) -> Dict[str, Any]:
+    """Parse a page and run every CPU-bound check on it
+    
+    Module-level and free of live objects so it can run in a process pool;
+    only compact, picklable results are returned.
+    """
+    page = PageDocument(url, status, CIMultiDict(headers), content, load_time, content_size=0)
+    analyzer = WebsiteAnalyzer()
+    checks = {}
+    for category in DOCUMENT_CATEGORIES:
+        try:
+            checks[category] = getattr(analyzer, f"_check_{category}")(url, page)
+        except Exception as e:
+            checks[category] = {"error": str(e), "score": 0}
+    
+    return {
+        "checks": checks,
+        "image_sources": page.image_sources(),
+        "internal_links": page.internal_links(),
+        "sub_resources": page.sub_resources()
+    }
+
+class _OutputLimitReached(Exception):
+    pass
+
+class _CappedSink:
+    """Write target of a zstd stream writer, stopping decompression once it holds limit bytes"""
+    
     def __init__(self):
-        self.session = None
+        self.parts: List[bytes] = []
+        self.size = 0
+        self.limit = 0
+    
+    def write(self, data: bytes) -> int:
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= self.limit:
+            raise _OutputLimitReached()
+        return len(data)
+
+def _body_decompressor(content_encoding: str) -> Optional[Callable[[bytes, int], bytes]]:
+    """Incremental decoder for a Content-Encoding, None for identity
+    
+    The decoder takes a chunk and a size limit and stops producing output
+    at about the limit, so a compression bomb never expands in memory;
+    once it returns limit bytes or more the rest of the body is not wanted.
+    """
+    coding = content_encoding.strip().lower()
+    if coding in ('', 'identity'):
+        return None
+    if coding in ('gzip', 'x-gzip', 'deflate'):
+        decompressobj = zlib.decompressobj(zlib.MAX_WBITS if coding == 'deflate' else 16 + zlib.MAX_WBITS)
+        return lambda chunk, limit: decompressobj.decompress(chunk, limit)
+    if coding == 'br' and brotli:
+        decompressor = brotli.Decompressor()
+        return lambda chunk, limit: decompressor.process(chunk, output_buffer_limit=limit)
+    if coding == 'zstd' and zstandard:
+        sink = _CappedSink()
+        writer = zstandard.ZstdDecompressor().stream_writer(sink, write_size=FETCH_CHUNK_SIZE)
+        
+        def decompress(chunk, limit):
+            sink.parts, sink.size, sink.limit = [], 0, limit
+            try:
+                writer.write(chunk)
+            except _OutputLimitReached:
+                pass
+            return b''.join(sink.parts)
+        return decompress
+    raise ValueError(f"Unsupported content encoding: {content_encoding}")
+
+def _cache_lifetime(headers: CIMultiDict) -> Optional[int]:
+    """Seconds a browser may reuse a response without revalidating, None when the headers don't say"""
+    directives = {}
+    for directive in headers.get('Cache-Control', '').split(','):
+        name, _, value = directive.strip().partition('=')
+        directives[name.lower()] = value.strip('" ')
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+    # Browsers go by max-age; s-maxage only applies to shared caches such as CDNs
+    for name in ('max-age', 's-maxage'):
+        if directives.get(name, '').isdigit():
+            return int(directives[name])
+    
+    # Expires counts from the response Date, or from now without one
+    if 'Expires' in headers:
+        try:
+            expires = parsedate_to_datetime(headers['Expires'])
+            date = parsedate_to_datetime(headers['Date']) if 'Date' in headers else datetime.now(timezone.utc)
+        except (TypeError, ValueError):
+            # An invalid Expires, such as 0, means already expired
+            return 0
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo=timezone.utc)
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max(0, int((expires - date).total_seconds()))
+    return None
+
+class WebsiteAnalyzer:
+    def __init__(self, concurrent: bool = True, category_timeouts: Optional[Dict[str, float]] = None,
+                 image_probe_concurrency: int = 8, image_probe_budget: float = 20,
+                 session: Optional[aiohttp.ClientSession] = None, executor: Optional[Executor] = None,
+                 max_page_bytes: int = MAX_PAGE_BYTES, limiter: Optional[HostRateLimiter] = host_limiter,
+                 resource_fetch_concurrency: int = 6, resource_fetch_budget: float = 20, max_sub_resources: int = 50):
+        # Without an explicit session, requests go through the process-wide pool
+        self.session = session
+        # Per-host politeness shared with every other analyzer in the process
+        self.limiter = limiter
+        # When set, parsing and document checks run there instead of on the event loop
+        self.executor = executor
+        self._owns_session = False
+        self.concurrent = concurrent
+        self.category_timeouts = {**DEFAULT_CATEGORY_TIMEOUTS, **(category_timeouts or {})}
+        self.image_probe_concurrency = image_probe_concurrency
+        self.image_probe_budget = image_probe_budget
+        self.max_page_bytes = max_page_bytes
+        # Stylesheets, scripts and fonts are downloaded for the waterfall, like a browser would (6 per host)
+        self.resource_fetch_concurrency = resource_fetch_concurrency
+        self.resource_fetch_budget = resource_fetch_budget
+        self.max_sub_resources = max_sub_resources
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        if self.session is None:
+            self.session = create_session()
+            self._owns_session = True
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
+        if self.session and self._owns_session:
             await self.session.close()
+            self.session = None
+            self._owns_session = False
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Session used for outbound requests"""
+        return self.session or get_shared_session()
     
-    async def analyze_performance(self, url: str) -> Dict[str, Any]:
+    @asynccontextmanager
+    async def _request(self, method: str, url: str, timing: Optional[RequestTiming] = None,
+                       **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """Send a request through the per-host rate limiter
+        
+        A 429 or 503 slows the host down for everyone and the request is
+        retried once the host allows it, unless it asked for a longer wait
+        than RATE_LIMIT_MAX_WAIT. When timing is given, it measures the
+        final attempt from when it was sent to the response headers, with
+        the rate limit wait before it as its throttled phase; the caller
+        marks the end of the body.
+        """
+        if timing is not None:
+            kwargs['trace_request_ctx'] = timing
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            throttle_start = time.monotonic()
+            if self.limiter:
+                await self.limiter.acquire(url)
+            if timing is not None:
+                timing.begin(throttle_start)
+            async with self._get_session().request(method, url, **kwargs) as response:
+                if timing is not None:
+                    timing.headers_received(response.status)
+                if self.limiter:
+                    pause = self.limiter.record(url, response.status, response.headers.get('Retry-After'))
+                    if (response.status in THROTTLE_STATUSES and attempt < RATE_LIMIT_RETRIES
+                            and pause <= RATE_LIMIT_MAX_WAIT):
+                        continue
+                yield response
+                return
+    
+    async def fetch_page(self, url: str) -> PageDocument:
+        """Fetch a page once so every analyzer can share it
+        
+        The body is streamed in chunks and decompressed here rather than by
+        aiohttp, so both the transfer and decoded sizes are known and at
+        most max_page_bytes of decoded body is ever held in memory.
+        """
+        timing = RequestTiming(url)
+        async with self._request('GET', url, timing=timing, timeout=30, auto_decompress=False,
+                                 headers={'Accept-Encoding': ACCEPT_ENCODING}) as response:
+            # Load time is measured up to the response headers
+            load_time = timing.ttfb
+            
+            decompressor = _body_decompressor(response.headers.get('Content-Encoding', ''))
+            try:
+                text_decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+            except LookupError:
+                text_decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            
+            parts = []
+            transfer_size = 0
+            content_size = 0
+            truncated = False
+            async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                transfer_size += len(chunk)
+                if decompressor is not None:
+                    # Bound the output too, so a compression bomb cannot expand past the cap
+                    # Ask for one byte past the cap so truncation is detected
+                    chunk = decompressor(chunk, self.max_page_bytes - content_size + 1)
+                if content_size + len(chunk) > self.max_page_bytes:
+                    chunk = chunk[:self.max_page_bytes - content_size]
+                    truncated = True
+                content_size += len(chunk)
+                parts.append(text_decoder.decode(chunk))
+                if truncated:
+                    break
+            parts.append(text_decoder.decode(b'', final=True))
+            timing.transfer_size = transfer_size
+            timing.finish()
+            
+            return PageDocument(url, response.status, CIMultiDict(response.headers), ''.join(parts), load_time,
+                                content_size=content_size, transfer_size=transfer_size, truncated=truncated,
+                                timing=timing)
+    
+    async def is_unchanged(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+        """Check with a conditional GET whether a page still matches earlier validators"""
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        if not headers:
+            return False
+        
+        try:
+            async with self._request('GET', url, headers=headers, timeout=30) as response:
+                return response.status == 304
+        except Exception:
+            return False
+    
+    async def analyze_all(self, url: str, on_progress: Optional[Callable[[str, int], None]] = None,
+                          page: Optional[PageDocument] = None) -> Dict[str, Dict[str, Any]]:
+        """Fetch the page once and run every category analyzer against it
+        
+        Categories run concurrently unless the analyzer was created with
+        concurrent=False. on_progress is called with the category name and
+        the number of completed categories as each one finishes. A page that
+        was already fetched can be passed in to skip the fetch.
+        """
+        if page is None:
+            try:
+                page = await self.fetch_page(url)
+            except Exception as e:
+                return {category: {"error": str(e), "score": 0} for category in CATEGORIES}
+        
+        if self.executor is not None:
+            await self._evaluate_off_loop(page)
+        
+        completed = 0
+        
+        async def run(category):
+            nonlocal completed
+            data = await self._run_category(category, url, page)
+            completed += 1
+            if on_progress:
+                on_progress(category, completed)
+            return data
+        
+        if self.concurrent:
+            outcomes = await asyncio.gather(*(run(category) for category in CATEGORIES))
+        else:
+            outcomes = [await run(category) for category in CATEGORIES]
+        
+        return dict(zip(CATEGORIES, outcomes))
+    
+    async def _evaluate_off_loop(self, page: PageDocument):
+        """Parse the page and run the document checks in the executor
+        
+        On failure or timeout every document category gets an error result,
+        so nothing falls back to parsing on the event loop.
+        """
+        timeout = max(self.category_timeouts[category] for category in DOCUMENT_CATEGORIES)
+        loop = asyncio.get_running_loop()
+        try:
+            evaluation = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, evaluate_page, page.url, page.status,
+                                     list(page.headers.items()), page.content, page.load_time),
+                timeout
+            )
+        except Exception as e:
+            message = f"Page evaluation timed out after {timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+            error = {"error": message, "score": 0}
+            evaluation = {"checks": {category: error for category in DOCUMENT_CATEGORIES},
+                          "image_sources": [], "internal_links": [], "sub_resources": []}
+        page.apply_evaluation(evaluation)
+    
+    async def _run_category(self, category: str, url: str, page: PageDocument) -> Dict[str, Any]:
+        """Run one category analyzer under its own timeout, isolating failures"""
+        timeout = self.category_timeouts[category]
+        try:
+            return await asyncio.wait_for(getattr(self, f"analyze_{category}")(url, page), timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"{category} analysis timed out after {timeout}s", "score": 0}
+        except Exception as e:
+            return {"error": str(e), "score": 0}
+    
+    async def analyze_performance(self, url: str, page: Optional[PageDocument] = None) -> Dict[str, Any]:
         """Analyze website performance metrics"""
         try:
-            start_time = time.time()
+            if page is None:
+                page = await self.fetch_page(url)
+            
+            load_time = page.load_time
+            content_size = page.content_size
+            
+            # Probe each distinct image once for its size while stylesheets, scripts and fonts download
+            images = page.image_sources()
+            image_urls = list(dict.fromkeys(urljoin(url, src) for src in images if src))
+            
+            sub_resources = page.sub_resources()[:self.max_sub_resources]
+            image_sizes, fetched = await asyncio.gather(
+                self._probe_images(image_urls),
+                self._fetch_sub_resources(sub_resources)
+            )
+            
+            # Sizes only cover the images probed within the budget; the rest are counted as skipped
+            total_image_size = sum(image_sizes.values())
+            unoptimized_images = sum(1 for img_size in image_sizes.values() if img_size > 100000)  # > 100KB
+            
+            # Compression, caching and render-blocking of each stylesheet, script and font
+            assets = [self._audit_asset(resource, timing, headers)
+                      for resource, (timing, headers) in zip(sub_resources, fetched)]
+            asset_findings = self._summarize_assets(assets)
+            
+            # Waits on our own rate limiter say nothing about the site, so the waterfall leaves them out
+            timings = ([page.timing] if page.timing else []) + [timing for timing, _ in fetched]
+            clock = unthrottled_clock(timings)
+            origin = min((clock(timing.start) for timing in timings), default=0.0)
+            waterfall = [timing.entry(origin, clock) for timing in sorted(timings, key=lambda timing: timing.start)]
+            resources = self._summarize_resources(page, waterfall, len(image_urls), total_image_size)
+            
+            # Basic performance metrics
+            performance_data = {
+                "load_time": round(load_time, 2),
+                "page_size": content_size,
+                "transfer_size": page.transfer_size,
+                "truncated": page.truncated,
+                "status_code": page.status,
+                "headers": dict(page.headers),
+                "score": self._calculate_performance_score(load_time, content_size, page.status,
+                                                           total_bytes=resources["total_bytes"],
+                                                           request_count=resources["requests"],
+                                                           fully_loaded=resources["fully_loaded"]),
+                # Phases of the document request
+                "timing": page.timing.summary() if page.timing else None,
+                "resources": resources,
+                "waterfall": waterfall,
+                "assets": assets,
+                "asset_findings": asset_findings
+            }
+            
+            performance_data.update({
+                "total_images": len(images),
+                "images_probed": len(image_sizes),
+                "images_skipped": len(image_urls) - len(image_sizes),
+                "total_image_size": total_image_size,
+                "unoptimized_images": unoptimized_images,
+                "recommendations": self._get_performance_recommendations(load_time, content_size, unoptimized_images,
+                                                                         asset_findings)
+            })
+            
+            return performance_data
             
-            async with aiohttp.ClientSession() as session:
-                # Measure page load time
-                async with session.get(url, timeout=30) as response:
-                    load_time = time.time() - start_time
-                    content = await response.text()
-                    content_size = len(content.encode('utf-8'))
-                    
-                    # Basic performance metrics
-                    performance_data = {
-                        "load_time": round(load_time, 2),
-                        "page_size": content_size,
-                        "status_code": response.status,
-                        "headers": dict(response.headers),
-                        "score": self._calculate_performance_score(load_time, content_size, response.status)
-                    }
-                    
-                    # Analyze images
-                    soup = BeautifulSoup(content, 'html.parser')
-                    images = soup.find_all('img')
-                    total_image_size = 0
-                    unoptimized_images = 0
-                    
-                    for img in images:
-                        if img.get('src'):
-                            img_url = urljoin(url, img['src'])
-                            try:
-                                async with session.head(img_url, timeout=10) as img_response:
-                                    img_size = int(img_response.headers.get('content-length', 0))
-                                    total_image_size += img_size
-                                    if img_size > 100000:  # > 100KB
-                                        unoptimized_images += 1
-                            except:
-                                pass
-                    
-                    performance_data.update({
-                        "total_images": len(images),
-                        "total_image_size": total_image_size,
-                        "unoptimized_images": unoptimized_images,
-                        "recommendations": self._get_performance_recommendations(load_time, content_size, unoptimized_images)
-                    })
-                    
-                    return performance_data
-                    
         except Exception as e:
             return {"error": str(e), "score": 0}
     
-    async def analyze_accessibility(self, url: str) -> Dict[str, Any]:
+    async def _probe_images(self, image_urls: List[str]) -> Dict[str, int]:
+        """Probe image sizes concurrently within the configured time budget
+        
+        Returns sizes for the images that answered before the budget ran out;
+        failed and unfinished probes are left out.
+        """
+        if not image_urls:
+            return {}
+        
+        semaphore = asyncio.Semaphore(self.image_probe_concurrency)
+        
+        async def probe(img_url):
+            async with semaphore:
+                return img_url, await self._probe_shared(img_url)
+        
+        tasks = [asyncio.ensure_future(probe(img_url)) for img_url in image_urls]
+        done, pending = await asyncio.wait(tasks, timeout=self.image_probe_budget)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        image_sizes = {}
+        for task in done:
+            if task.exception() is None:
+                img_url, img_size = task.result()
+                image_sizes[img_url] = img_size
+        return image_sizes
+    
+    async def _fetch_sub_resources(self, resources: List[Dict[str, Any]]) -> List[Tuple[RequestTiming, Optional[CIMultiDict]]]:
+        """Download resources concurrently within the time budget, timing each request
+        
+        Returns each resource's timing and response headers, in order.
+        Downloads still running when the budget runs out are cancelled and
+        reported with an error, so every resource gets a waterfall row.
+        """
+        if not resources:
+            return []
+        
+        semaphore = asyncio.Semaphore(self.resource_fetch_concurrency)
+        timings = [RequestTiming(resource["url"], resource["type"]) for resource in resources]
+        headers: List[Optional[CIMultiDict]] = [None] * len(resources)
+        
+        async def fetch(index, timing):
+            async with semaphore:
+                headers[index] = await self._fetch_resource(timing)
+        
+        tasks = [asyncio.ensure_future(fetch(index, timing)) for index, timing in enumerate(timings)]
+        done, pending = await asyncio.wait(tasks, timeout=self.resource_fetch_budget)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        
+        for timing in timings:
+            if timing.end is None:
+                timing.finish(error=f"Not finished within {self.resource_fetch_budget:g}s")
+        return list(zip(timings, headers))
+    
+    async def _fetch_resource(self, timing: RequestTiming) -> Optional[CIMultiDict]:
+        """Download one resource, recording its phases and transfer size into timing; returns its headers"""
+        try:
+            async with self._request('GET', timing.url, timing=timing, timeout=30, auto_decompress=False,
+                                     headers={'Accept-Encoding': ACCEPT_ENCODING}) as response:
+                # Only the bytes on the wire matter here, so the body is counted, not decoded
+                async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                    timing.transfer_size += len(chunk)
+                    if timing.transfer_size > self.max_page_bytes:
+                        break
+                timing.finish()
+                return CIMultiDict(response.headers)
+        except Exception as e:
+            timing.finish(error=str(e) or type(e).__name__)
+            return None
+    
+    def _audit_asset(self, resource: Dict[str, Any], timing: RequestTiming,
+                     headers: Optional[CIMultiDict]) -> Dict[str, Any]:
+        """Compression and caching headers of a downloaded stylesheet, script or font"""
+        headers = headers if headers is not None else CIMultiDict()
+        encoding = headers.get('Content-Encoding', '').strip().lower()
+        return {
+            "url": resource["url"],
+            "type": resource["type"],
+            "render_blocking": resource["render_blocking"],
+            "status": timing.status,
+            "transfer_size": timing.transfer_size,
+            "content_encoding": encoding or None,
+            "compressed": encoding not in ('', 'identity'),
+            "cache_control": headers.get('Cache-Control'),
+            "cache_lifetime": _cache_lifetime(headers),
+            "etag": 'ETag' in headers,
+            "last_modified": 'Last-Modified' in headers,
+            "error": timing.error
+        }
+    
+    def _summarize_assets(self, assets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Counts of the asset problems that have a recommendation"""
+        loaded = [asset for asset in assets if not asset["error"] and (asset["status"] or 0) < 400]
+        return {
+            "render_blocking": sum(1 for asset in assets if asset["render_blocking"]),
+            # Fonts are already compressed (WOFF2); small files gain little
+            "uncompressed": sum(1 for asset in loaded if asset["type"] in ('stylesheet', 'script')
+                                and not asset["compressed"] and asset["transfer_size"] > 1024),
+            # Static assets should be cached for at least a week
+            "short_cache": sum(1 for asset in loaded if (asset["cache_lifetime"] or 0) < 7 * 24 * 3600),
+            "no_validator": sum(1 for asset in loaded if not asset["etag"] and not asset["last_modified"]),
+            "script_bytes": sum(asset["transfer_size"] for asset in loaded if asset["type"] == 'script'),
+            "stylesheet_bytes": sum(asset["transfer_size"] for asset in loaded if asset["type"] == 'stylesheet')
+        }
+    
+    def _summarize_resources(self, page: PageDocument, waterfall: List[Dict[str, Any]], image_count: int,
+                             image_bytes: int) -> Dict[str, Any]:
+        """Request count, bytes by resource type and fully loaded time from the waterfall
+        
+        Images are probed rather than downloaded, so they count towards the
+        requests and bytes by their reported size but not the loaded time.
+        """
+        bytes_by_type = {"document": page.transfer_size}
+        for row in waterfall:
+            if row["type"] != "document":
+                bytes_by_type[row["type"]] = bytes_by_type.get(row["type"], 0) + row["transfer_size"]
+        bytes_by_type["image"] = image_bytes
+        
+        ends = [row["start"] + row["duration"] for row in waterfall if row["duration"] is not None]
+        return {
+            "requests": 1 + sum(1 for row in waterfall if row["type"] != "document") + image_count,
+            "total_bytes": sum(bytes_by_type.values()),
+            "bytes_by_type": bytes_by_type,
+            "failed_requests": sum(1 for row in waterfall if row["error"] or (row["status"] or 0) >= 400),
+            "fully_loaded": round(max(ends), 3) if ends else round(page.load_time, 3)
+        }
+    
+    async def _probe_shared(self, resource_url: str) -> int:
+        """Probe a resource size, joining an identical probe already running for any analysis"""
+        if self.session is not None:
+            # A private session may close while others still wait on the probe, so don't share it
+            return await self._probe_size(resource_url)
+        
+        # One analysis running out of probe budget does not cancel the probe for the others
+        return await _probes.do(resource_url, lambda: self._probe_size(resource_url))
+    
+    async def _probe_size(self, resource_url: str) -> int:
+        """Get a resource size from HEAD, falling back to a one-byte ranged GET"""
+        async with self._request('HEAD', resource_url, timeout=10) as response:
+            content_length = response.headers.get('content-length')
+        if content_length is not None:
+            return int(content_length)
+        
+        # No content-length on HEAD; a ranged GET reports the full size in Content-Range
+        async with self._request('GET', resource_url, timeout=10, headers={'Range': 'bytes=0-0'}) as response:
+            content_range = response.headers.get('content-range', '')
+            total = content_range.rpartition('/')[2]
+            if response.status == 206 and total.isdigit():
+                return int(total)
+            return int(response.headers.get('content-length', 0))
+    
+    async def analyze_transport(self, url: str) -> Dict[str, Any]:
+        """Audit compression, protocol negotiation and connection reuse for a page
+        
+        An informational section rather than a scored category. The page is
+        requested once per coding in AUDIT_ENCODINGS, one after another, so
+        whether those requests reuse a connection shows keep-alive support.
+        """
+        timeout = self.category_timeouts['transport']
+        try:
+            return await asyncio.wait_for(self._audit_transport(url), timeout)
+        except asyncio.TimeoutError:
+            return {"error": f"transport audit timed out after {timeout}s"}
+        except Exception as e:
+            return {"error": str(e)}
+    
+    async def _audit_transport(self, url: str) -> Dict[str, Any]:
+        encodings = {}
+        timings = []
+        responses = []
+        for coding in AUDIT_ENCODINGS:
+            timing = RequestTiming(url)
+            encodings[coding], headers = await self._fetch_encoded(url, coding, timing)
+            timings.append(timing)
+            responses.append(headers)
+        
+        compression = self._summarize_compression(encodings)
+        protocol = await self._audit_protocol(url, responses[-1])
+        keep_alive = self._summarize_keep_alive(timings, responses)
+        return {
+            "compression": compression,
+            "protocol": protocol,
+            "keep_alive": keep_alive,
+            "recommendations": self._get_transport_recommendations(compression, protocol, keep_alive)
+        }
+    
+    async def _fetch_encoded(self, url: str, coding: str, timing: RequestTiming) -> Tuple[Dict[str, Any], CIMultiDict]:
+        """Request the page accepting only one coding; returns the sizes seen and the response headers"""
+        async with self._request('GET', url, timing=timing, timeout=30, auto_decompress=False,
+                                 headers={'Accept-Encoding': coding}) as response:
+            content_encoding = response.headers.get('Content-Encoding', '').strip().lower() or 'identity'
+            try:
+                decompressor = _body_decompressor(content_encoding)
+                decodable = True
+            except ValueError:
+                # A coding we cannot decode; only its transfer size is known
+                decompressor = None
+                decodable = False
+            
+            transfer_size = 0
+            content_size = 0
+            truncated = False
+            async for chunk in response.content.iter_chunked(FETCH_CHUNK_SIZE):
+                transfer_size += len(chunk)
+                if decodable:
+                    content_size += len(decompressor(chunk, self.max_page_bytes - content_size + 1) if decompressor else chunk)
+                if max(transfer_size, content_size) > self.max_page_bytes:
+                    truncated = True
+                    break
+            timing.transfer_size = transfer_size
+            timing.finish()
+            
+            return {
+                "status": response.status,
+                "content_encoding": content_encoding,
+                "honored": content_encoding == coding,
+                "transfer_size": transfer_size,
+                "content_size": content_size if decodable else None,
+                "truncated": truncated
+            }, CIMultiDict(response.headers)
+    
+    def _summarize_compression(self, encodings: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Compare each coding's transfer size against the uncompressed page"""
+        # The identity response is the uncompressed page, unless the server compressed it anyway
+        identity = encodings['identity']
+        if identity['content_encoding'] == 'identity':
+            uncompressed_size = identity['transfer_size']
+        else:
+            uncompressed_size = max((entry['content_size'] or 0 for entry in encodings.values()), default=0)
+        
+        for entry in encodings.values():
+            entry["ratio"] = round(entry["transfer_size"] / uncompressed_size, 3) if uncompressed_size else None
+        
+        supported = [coding for coding, entry in encodings.items() if coding != 'identity' and entry["honored"]]
+        best = min(supported, key=lambda coding: encodings[coding]["transfer_size"], default=None)
+        savings = None
+        if best and uncompressed_size:
+            savings = round(1 - encodings[best]["transfer_size"] / uncompressed_size, 3)
+        return {
+            "encodings": encodings,
+            "supported": supported,
+            "best_encoding": best,
+            "uncompressed_size": uncompressed_size,
+            "savings": savings
+        }
+    
+    async def _audit_protocol(self, url: str, headers: CIMultiDict) -> Dict[str, Any]:
+        """Protocol the origin negotiates over TLS (ALPN), its TLS version and advertised HTTP/3"""
+        parts = urlsplit(url)
+        alt_svc = headers.get('Alt-Svc')
+        protocol = {
+            "scheme": parts.scheme,
+            "alpn": None,
+            "http_version": "HTTP/1.1",
+            "tls_version": None,
+            "http3_advertised": bool(alt_svc and re.search(r'\bh3(-\d+)?=', alt_svc)),
+            "alt_svc": alt_svc
+        }
+        if parts.scheme != 'https':
+            return protocol
+        
+        try:
+            alpn, tls_version = await self._negotiate_alpn(url, parts.hostname, parts.port or 443)
+        except Exception as e:
+            protocol["error"] = f"TLS handshake failed: {e}"
+            return protocol
+        protocol.update({
+            "alpn": alpn,
+            "http_version": "HTTP/2" if alpn == 'h2' else "HTTP/1.1",
+            "tls_version": tls_version
+        })
+        return protocol
+    
+    async def _negotiate_alpn(self, url: str, host: str, port: int) -> Tuple[Optional[str], Optional[str]]:
+        """Open a TLS connection offering h2 and http/1.1; returns the ALPN choice and TLS version"""
+        # aiohttp only speaks HTTP/1.1, so the handshake is done here to see what the server would pick
+        context = ssl.create_default_context()
+        context.set_alpn_protocols(['h2', 'http/1.1'])
+        if self.limiter:
+            await self.limiter.acquire(url)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context, server_hostname=host), 10)
+        try:
+            ssl_object = writer.get_extra_info('ssl_object')
+            return ssl_object.selected_alpn_protocol(), ssl_object.version()
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+    
+    def _summarize_keep_alive(self, timings: List[RequestTiming], responses: List[CIMultiDict]) -> Dict[str, Any]:
+        """Whether back-to-back requests reused a connection, and what the server says about it
+        
+        supported is None when it can't be told: no request was traced (a
+        session without the timing hooks), or other requests to the host
+        held every pooled connection at the time.
+        """
+        followers = timings[1:]
+        reused = sum(1 for timing in followers if timing.reused)
+        closes = any('close' in headers.get('Connection', '').lower() for headers in responses)
+        
+        keep_alive_header = responses[-1].get('Keep-Alive', '')
+        timeout = re.search(r'timeout=(\d+)', keep_alive_header)
+        return {
+            "supported": True if reused else (False if closes else None),
+            "requests": len(timings),
+            "reused_connections": reused,
+            "connection_header": responses[-1].get('Connection'),
+            "keep_alive_timeout": int(timeout.group(1)) if timeout else None
+        }
+    
+    async def analyze_accessibility(self, url: str, page: Optional[PageDocument] = None) -> Dict[str, Any]:
         """Analyze website accessibility"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Accessibility checks
-                    issues = []
-                    score = 100
-                    
-                    # Check for alt text on images
-                    images_without_alt = soup.find_all('img', alt='')
-                    if images_without_alt:
-                        issues.append(f"Found {len(images_without_alt)} images without alt text")
-                        score -= len(images_without_alt) * 2
-                    
-                    # Check for heading structure
-                    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                    h1_count = len(soup.find_all('h1'))
-                    if h1_count == 0:
-                        issues.append("No H1 heading found")
-                        score -= 10
-                    elif h1_count > 1:
-                        issues.append(f"Multiple H1 headings found ({h1_count})")
-                        score -= 5
-                    
-                    # Check for form labels
-                    inputs = soup.find_all('input')
-                    inputs_without_labels = 0
-                    for input_tag in inputs:
-                        if input_tag.get('type') not in ['hidden', 'submit', 'button']:
-                            if not input_tag.get('aria-label') and not input_tag.get('aria-labelledby'):
-                                # Check if there's a label associated
-                                input_id = input_tag.get('id')
-                                if input_id:
-                                    label = soup.find('label', {'for': input_id})
-                                    if not label:
-                                        inputs_without_labels += 1
-                    
-                    if inputs_without_labels > 0:
-                        issues.append(f"Found {inputs_without_labels} form inputs without proper labels")
-                        score -= inputs_without_labels * 3
-                    
-                    # Check for color contrast (basic check)
-                    style_tags = soup.find_all('style')
-                    inline_styles = soup.find_all(attrs={'style': True})
-                    if not style_tags and not inline_styles:
-                        issues.append("No CSS found - color contrast cannot be verified")
-                        score -= 5
-                    
-                    return {
-                        "score": max(0, score),
-                        "issues": issues,
-                        "total_issues": len(issues),
-                        "recommendations": self._get_accessibility_recommendations(issues)
-                    }
-                    
+            if page is None:
+                page = await self.fetch_page(url)
+            if 'accessibility' in page.checks:
+                # Already evaluated off the event loop
+                return page.checks['accessibility']
+            return self._check_accessibility(url, page)
         except Exception as e:
             return {"error": str(e), "score": 0}
     
-    async def analyze_seo(self, url: str) -> Dict[str, Any]:
+    def _check_accessibility(self, url: str, page: PageDocument) -> Dict[str, Any]:
+        """Run the accessibility checks on a parsed page"""
+        index = page.index
+        
+        # Accessibility checks
+        issues = []
+        score = 100
+        
+        # Check for alt text on images
+        images_without_alt = index['images']['empty_alt']
+        if images_without_alt:
+            issues.append(f"Found {images_without_alt} images without alt text")
+            score -= images_without_alt * 2
+        
+        # Check for heading structure
+        h1_count = index['h1']
+        if h1_count == 0:
+            issues.append("No H1 heading found")
+            score -= 10
+        elif h1_count > 1:
+            issues.append(f"Multiple H1 headings found ({h1_count})")
+            score -= 5
+        
+        # Check for form labels
+        inputs_without_labels = index['unlabeled_inputs']
+        if inputs_without_labels > 0:
+            issues.append(f"Found {inputs_without_labels} form inputs without proper labels")
+            score -= inputs_without_labels * 3
+        
+        # Check for color contrast (basic check)
+        if not index['has_css']:
+            issues.append("No CSS found - color contrast cannot be verified")
+            score -= 5
+        
+        return {
+            "score": max(0, score),
+            "issues": issues,
+            "total_issues": len(issues),
+            "recommendations": self._get_accessibility_recommendations(issues)
+        }
+    
+    async def analyze_seo(self, url: str, page: Optional[PageDocument] = None) -> Dict[str, Any]:
         """Analyze SEO aspects"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    seo_data = {"score": 100, "issues": [], "recommendations": []}
-                    
-                    # Check title tag
-                    title = soup.find('title')
-                    if not title or not title.get_text().strip():
-                        seo_data["issues"].append("Missing or empty title tag")
-                        seo_data["score"] -= 20
-                    else:
-                        title_text = title.get_text().strip()
-                        if len(title_text) < 30:
-                            seo_data["issues"].append("Title tag is too short (less than 30 characters)")
-                            seo_data["score"] -= 5
-                        elif len(title_text) > 60:
-                            seo_data["issues"].append("Title tag is too long (more than 60 characters)")
-                            seo_data["score"] -= 5
-                    
-                    # Check meta description
-                    meta_desc = soup.find('meta', attrs={'name': 'description'})
-                    if not meta_desc or not meta_desc.get('content', '').strip():
-                        seo_data["issues"].append("Missing meta description")
-                        seo_data["score"] -= 15
-                    else:
-                        desc_text = meta_desc.get('content', '').strip()
-                        if len(desc_text) < 120:
-                            seo_data["issues"].append("Meta description is too short (less than 120 characters)")
-                            seo_data["score"] -= 5
-                        elif len(desc_text) > 160:
-                            seo_data["issues"].append("Meta description is too long (more than 160 characters)")
-                            seo_data["score"] -= 5
-                    
-                    # Check for H1 tag
-                    h1_tags = soup.find_all('h1')
-                    if len(h1_tags) == 0:
-                        seo_data["issues"].append("No H1 tag found")
-                        seo_data["score"] -= 10
-                    elif len(h1_tags) > 1:
-                        seo_data["issues"].append("Multiple H1 tags found")
-                        seo_data["score"] -= 5
-                    
-                    # Check for images without alt text
-                    images = soup.find_all('img')
-                    images_without_alt = [img for img in images if not img.get('alt')]
-                    if images_without_alt:
-                        seo_data["issues"].append(f"Found {len(images_without_alt)} images without alt text")
-                        seo_data["score"] -= len(images_without_alt) * 2
-                    
-                    # Check for internal links
-                    links = soup.find_all('a', href=True)
-                    internal_links = 0
-                    for link in links:
-                        href = link['href']
-                        if href.startswith('/') or urlparse(href).netloc == urlparse(url).netloc:
-                            internal_links += 1
-                    
-                    if internal_links < 3:
-                        seo_data["issues"].append("Very few internal links found")
-                        seo_data["score"] -= 5
-                    
-                    # Check for structured data
-                    json_ld = soup.find_all('script', type='application/ld+json')
-                    if not json_ld:
-                        seo_data["issues"].append("No structured data (JSON-LD) found")
-                        seo_data["score"] -= 10
-                    
-                    seo_data["total_issues"] = len(seo_data["issues"])
-                    seo_data["recommendations"] = self._get_seo_recommendations(seo_data["issues"])
-                    
-                    return seo_data
-                    
+            if page is None:
+                page = await self.fetch_page(url)
+            if 'seo' in page.checks:
+                # Already evaluated off the event loop
+                return page.checks['seo']
+            return self._check_seo(url, page)
         except Exception as e:
             return {"error": str(e), "score": 0}
     
-    async def analyze_security(self, url: str) -> Dict[str, Any]:
+    def _check_seo(self, url: str, page: PageDocument) -> Dict[str, Any]:
+        """Run the SEO checks on a parsed page"""
+        index = page.index
+        
+        seo_data = {"score": 100, "issues": [], "recommendations": []}
+        
+        # Check title tag
+        title = index['title']
+        if not title or not title.strip():
+            seo_data["issues"].append("Missing or empty title tag")
+            seo_data["score"] -= 20
+        else:
+            title_text = title.strip()
+            if len(title_text) < 30:
+                seo_data["issues"].append("Title tag is too short (less than 30 characters)")
+                seo_data["score"] -= 5
+            elif len(title_text) > 60:
+                seo_data["issues"].append("Title tag is too long (more than 60 characters)")
+                seo_data["score"] -= 5
+        
+        # Check meta description
+        meta_desc = index['meta_description']
+        if meta_desc is None or not meta_desc.strip():
+            seo_data["issues"].append("Missing meta description")
+            seo_data["score"] -= 15
+        else:
+            desc_text = meta_desc.strip()
+            if len(desc_text) < 120:
+                seo_data["issues"].append("Meta description is too short (less than 120 characters)")
+                seo_data["score"] -= 5
+            elif len(desc_text) > 160:
+                seo_data["issues"].append("Meta description is too long (more than 160 characters)")
+                seo_data["score"] -= 5
+        
+        # Check for H1 tag
+        h1_count = index['h1']
+        if h1_count == 0:
+            seo_data["issues"].append("No H1 tag found")
+            seo_data["score"] -= 10
+        elif h1_count > 1:
+            seo_data["issues"].append("Multiple H1 tags found")
+            seo_data["score"] -= 5
+        
+        # Check for images without alt text
+        images_without_alt = index['images']['missing_alt']
+        if images_without_alt:
+            seo_data["issues"].append(f"Found {images_without_alt} images without alt text")
+            seo_data["score"] -= images_without_alt * 2
+        
+        # Check for internal links
+        site_netloc = urlparse(url).netloc
+        internal_links = 0
+        for href in index['links']:
+            if href.startswith('/') or urlparse(href).netloc == site_netloc:
+                internal_links += 1
+        
+        if internal_links < 3:
+            seo_data["issues"].append("Very few internal links found")
+            seo_data["score"] -= 5
+        
+        # Check for structured data
+        if not index['json_ld']:
+            seo_data["issues"].append("No structured data (JSON-LD) found")
+            seo_data["score"] -= 10
+        
+        seo_data["total_issues"] = len(seo_data["issues"])
+        seo_data["recommendations"] = self._get_seo_recommendations(seo_data["issues"])
+        
+        return seo_data
+    
+    async def analyze_security(self, url: str, page: Optional[PageDocument] = None) -> Dict[str, Any]:
         """Analyze basic security aspects"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    security_data = {"score": 100, "issues": [], "recommendations": []}
-                    
-                    # Check HTTPS
-                    if not url.startswith('https://'):
-                        security_data["issues"].append("Site is not using HTTPS")
-                        security_data["score"] -= 30
-                    
-                    # Check security headers
-                    headers = response.headers
-                    security_headers = {
-                        'X-Frame-Options': 'Prevents clickjacking attacks',
-                        'X-Content-Type-Options': 'Prevents MIME type sniffing',
-                        'X-XSS-Protection': 'Enables XSS filtering',
-                        'Strict-Transport-Security': 'Enforces HTTPS',
-                        'Content-Security-Policy': 'Prevents XSS attacks'
-                    }
-                    
-                    for header, description in security_headers.items():
-                        if header not in headers:
-                            security_data["issues"].append(f"Missing security header: {header}")
-                            security_data["score"] -= 10
-                    
-                    # Check for mixed content
-                    content = await response.text()
-                    if 'http://' in content and url.startswith('https://'):
-                        security_data["issues"].append("Mixed content detected (HTTP resources on HTTPS page)")
-                        security_data["score"] -= 15
-                    
-                    security_data["total_issues"] = len(security_data["issues"])
-                    security_data["recommendations"] = self._get_security_recommendations(security_data["issues"])
-                    
-                    return security_data
-                    
+            if page is None:
+                page = await self.fetch_page(url)
+            if 'security' in page.checks:
+                # Already evaluated off the event loop
+                return page.checks['security']
+            return self._check_security(url, page)
         except Exception as e:
             return {"error": str(e), "score": 0}
     
-    async def analyze_content(self, url: str) -> Dict[str, Any]:
+    def _check_security(self, url: str, page: PageDocument) -> Dict[str, Any]:
+        """Run the security checks on a parsed page"""
+        security_data = {"score": 100, "issues": [], "recommendations": []}
+        
+        # Check HTTPS
+        if not url.startswith('https://'):
+            security_data["issues"].append("Site is not using HTTPS")
+            security_data["score"] -= 30
+        
+        # Check security headers
+        headers = page.headers
+        security_headers = {
+            'X-Frame-Options': 'Prevents clickjacking attacks',
+            'X-Content-Type-Options': 'Prevents MIME type sniffing',
+            'X-XSS-Protection': 'Enables XSS filtering',
+            'Strict-Transport-Security': 'Enforces HTTPS',
+            'Content-Security-Policy': 'Prevents XSS attacks'
+        }
+        
+        for header, description in security_headers.items():
+            if header not in headers:
+                security_data["issues"].append(f"Missing security header: {header}")
+                security_data["score"] -= 10
+        
+        # Check for mixed content
+        if 'http://' in page.content and url.startswith('https://'):
+            security_data["issues"].append("Mixed content detected (HTTP resources on HTTPS page)")
+            security_data["score"] -= 15
+        
+        security_data["total_issues"] = len(security_data["issues"])
+        security_data["recommendations"] = self._get_security_recommendations(security_data["issues"])
+        
+        return security_data
+    
+    async def analyze_content(self, url: str, page: Optional[PageDocument] = None) -> Dict[str, Any]:
         """Analyze content quality and structure"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=30) as response:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    # Remove script and style elements
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    # Get text content
-                    text = soup.get_text()
-                    words = text.split()
-                    
-                    content_data = {
-                        "word_count": len(words),
-                        "score": 100,
-                        "issues": [],
-                        "recommendations": []
-                    }
-                    
-                    # Check content length
-                    if len(words) < 300:
-                        content_data["issues"].append("Content is too short (less than 300 words)")
-                        content_data["score"] -= 20
-                    elif len(words) > 2000:
-                        content_data["issues"].append("Content is very long (more than 2000 words)")
-                        content_data["score"] -= 5
-                    
-                    # Check for headings structure
-                    headings = soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
-                    if len(headings) < 2:
-                        content_data["issues"].append("Insufficient heading structure")
-                        content_data["score"] -= 10
-                    
-                    # Check for paragraphs
-                    paragraphs = soup.find_all('p')
-                    if len(paragraphs) < 3:
-                        content_data["issues"].append("Insufficient paragraph structure")
-                        content_data["score"] -= 10
-                    
-                    # Check for lists
-                    lists = soup.find_all(['ul', 'ol'])
-                    if len(lists) == 0 and len(words) > 500:
-                        content_data["issues"].append("Long content without lists for better readability")
-                        content_data["score"] -= 5
-                    
-                    content_data["total_issues"] = len(content_data["issues"])
-                    content_data["recommendations"] = self._get_content_recommendations(content_data["issues"])
-                    
-                    return content_data
-                    
+            if page is None:
+                page = await self.fetch_page(url)
+            if 'content' in page.checks:
+                # Already evaluated off the event loop
+                return page.checks['content']
+            return self._check_content(url, page)
         except Exception as e:
             return {"error": str(e), "score": 0}
     
-    def _calculate_performance_score(self, load_time: float, content_size: int, status_code: int) -> int:
-        """Calculate performance score based on metrics"""
+    def _check_content(self, url: str, page: PageDocument) -> Dict[str, Any]:
+        """Run the content checks on a parsed page"""
+        index = page.index
+        
+        # Get text content without script and style elements
+        text = page.visible_text()
+        words = text.split()
+        
+        content_data = {
+            "word_count": len(words),
+            "score": 100,
+            "issues": [],
+            "recommendations": []
+        }
+        
+        # Check content length
+        if len(words) < 300:
+            content_data["issues"].append("Content is too short (less than 300 words)")
+            content_data["score"] -= 20
+        elif len(words) > 2000:
+            content_data["issues"].append("Content is very long (more than 2000 words)")
+            content_data["score"] -= 5
+        
+        # Check for headings structure
+        if index['headings'] < 2:
+            content_data["issues"].append("Insufficient heading structure")
+            content_data["score"] -= 10
+        
+        # Check for paragraphs
+        if index['paragraphs'] < 3:
+            content_data["issues"].append("Insufficient paragraph structure")
+            content_data["score"] -= 10
+        
+        # Check for lists
+        if index['lists'] == 0 and len(words) > 500:
+            content_data["issues"].append("Long content without lists for better readability")
+            content_data["score"] -= 5
+        
+        content_data["total_issues"] = len(content_data["issues"])
+        content_data["recommendations"] = self._get_content_recommendations(content_data["issues"])
+        
+        return content_data
+    
+    def _calculate_performance_score(self, load_time: float, content_size: int, status_code: int,
+                                     total_bytes: Optional[int] = None, request_count: Optional[int] = None,
+                                     fully_loaded: Optional[float] = None) -> int:
+        """Calculate performance score based on metrics
+        
+        The page weight, request count and fully loaded time come from the
+        resource waterfall and are only scored when given.
+        """
         score = 100
         
         # Load time scoring
@@ -332,11 +1105,33 @@ class WebsiteAnalyzer:
         if status_code != 200:
             score -= 20
         
+        # Page weight including sub-resources and images
+        if total_bytes is not None:
+            if total_bytes > 3000000:  # > 3MB
+                score -= 15
+            elif total_bytes > 1500000:  # > 1.5MB
+                score -= 5
+        
+        if request_count is not None:
+            if request_count > 100:
+                score -= 10
+            elif request_count > 50:
+                score -= 5
+        
+        # Time until the document and its stylesheets, scripts and fonts are in
+        if fully_loaded is not None:
+            if fully_loaded > 5:
+                score -= 15
+            elif fully_loaded > 3:
+                score -= 5
+        
         return max(0, score)
     
-    def _get_performance_recommendations(self, load_time: float, content_size: int, unoptimized_images: int) -> List[str]:
+    def _get_performance_recommendations(self, load_time: float, content_size: int, unoptimized_images: int,
+                                         asset_findings: Optional[Dict[str, Any]] = None) -> List[str]:
         """Get performance improvement recommendations"""
         recommendations = []
+        asset_findings = asset_findings or {}
         
         if load_time > 2:
             recommendations.append("Optimize page load time - consider using a CDN or optimizing server response")
@@ -347,6 +1142,51 @@ class WebsiteAnalyzer:
         if unoptimized_images > 0:
             recommendations.append(f"Optimize {unoptimized_images} large images - compress and use modern formats like WebP")
         
+        if asset_findings.get("render_blocking", 0) > 0:
+            recommendations.append(f"Eliminate {asset_findings['render_blocking']} render-blocking resources in <head> - add async or defer to scripts and inline critical CSS")
+        
+        if asset_findings.get("uncompressed", 0) > 0:
+            recommendations.append(f"Enable gzip or Brotli compression for {asset_findings['uncompressed']} uncompressed stylesheets and scripts")
+        
+        if asset_findings.get("short_cache", 0) > 0:
+            recommendations.append(f"Cache {asset_findings['short_cache']} static assets for longer - set Cache-Control max-age on fingerprinted files")
+        
+        if asset_findings.get("no_validator", 0) > 0:
+            recommendations.append(f"Send ETag or Last-Modified for {asset_findings['no_validator']} assets so browsers can revalidate them")
+        
+        if asset_findings.get("script_bytes", 0) > 300000:  # > 300KB
+            recommendations.append(f"Reduce JavaScript size ({asset_findings['script_bytes'] // 1024} KB) - remove unused code and split bundles")
+        
+        if asset_findings.get("stylesheet_bytes", 0) > 100000:  # > 100KB
+            recommendations.append(f"Reduce CSS size ({asset_findings['stylesheet_bytes'] // 1024} KB) - remove unused rules")
+        
+        return recommendations
+    
+    def _get_transport_recommendations(self, compression: Dict[str, Any], protocol: Dict[str, Any],
+                                       keep_alive: Dict[str, Any]) -> List[str]:
+        """Get compression and protocol improvement recommendations"""
+        recommendations = []
+        supported = compression["supported"]
+        
+        if not supported:
+            recommendations.append("Enable gzip or Brotli compression for HTML responses")
+        elif 'br' not in supported and 'zstd' not in supported:
+            recommendations.append("Add Brotli compression - it is typically 15-20% smaller than gzip for text")
+        
+        if not compression["encodings"]["identity"]["honored"]:
+            recommendations.append("Respect Accept-Encoding - the server compresses responses for clients that did not ask for it")
+        
+        if protocol["scheme"] == 'https' and protocol["alpn"] is not None and protocol["alpn"] != 'h2':
+            recommendations.append("Enable HTTP/2 to multiplex requests over a single connection")
+        
+        if protocol["tls_version"] in ('TLSv1', 'TLSv1.1'):
+            recommendations.append("Upgrade to TLS 1.2 or 1.3 - older versions are deprecated")
+        elif protocol["tls_version"] == 'TLSv1.2':
+            recommendations.append("Enable TLS 1.3 for a faster, one round-trip handshake")
+        
+        if keep_alive["supported"] is False:
+            recommendations.append("Enable HTTP keep-alive so clients can reuse connections")
+        
         return recommendations
     
     def _get_accessibility_recommendations(self, issues: List[str]) -> List[str]:
@@ -0,0 +1,111 @@
+import asyncio
+from collections import Counter, defaultdict, deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from http_session import get_shared_session
+from robots import RobotsCache, robots_cache
+from url_utils import normalize_url
+
+def unique_urls(urls: Iterable[str]) -> List[str]:
+    """The http(s) URLs of a list in order, dropping duplicates after normalization"""
+    unique = []
+    seen = set()
+    for url in urls:
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            continue
+        normalized = normalize_url(url)
+        if normalized not in seen:
+            seen.add(normalized)
+            unique.append(url)
+    return unique
+
+def parse_url_list(text: str) -> List[str]:
+    """Extract URLs from an uploaded list, one per line
+    
+    Blank lines and '#' comments are skipped, only the first column of CSV
+    rows is used, and duplicates (after normalization) are dropped.
+    """
+    candidates = (line.split(',', 1)[0].strip().strip('"\'') for line in text.splitlines())
+    return unique_urls(candidate for candidate in candidates if candidate and not candidate.startswith('#'))
+
+class BatchRunner:
+    """Analyze many URLs under global and per-host concurrency limits
+    
+    All analyses share the pooled HTTP session and the parsed robots.txt
+    cache; URLs disallowed by robots.txt are skipped. analyze returns the
+    fields of a completed item, at least its "results".
+    """
+    
+    def __init__(self, analyze: Callable[[str], Awaitable[Dict[str, Any]]], concurrency: int = 10,
+                 per_host_concurrency: int = 2, robots: Optional[RobotsCache] = robots_cache):
+        self.analyze = analyze
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.robots = robots
+    
+    async def run(self, urls: Iterable[str]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one item per URL as soon as its analysis finishes
+        
+        A fixed set of workers pulls URLs from the list, so only `concurrency`
+        analyses (and tasks) exist at a time however long the list is. A URL
+        whose host is already at its limit is set aside for the next worker
+        to finish on that host, rather than keeping a worker waiting.
+        """
+        pending = iter(urls)
+        parked: Dict[str, deque] = defaultdict(deque)
+        active = Counter()
+        # Bounded, so workers pause while the consumer is slow to take results
+        finished: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        
+        def take(host: Optional[str]):
+            """Claim the next URL a worker may analyze, counting it against its host"""
+            # The host a worker just finished on has room for exactly one of its parked URLs
+            if host in parked:
+                url = parked[host].popleft()
+                if not parked[host]:
+                    del parked[host]
+            else:
+                for url in pending:
+                    host = urlsplit(url).hostname
+                    if active[host] < self.per_host_concurrency:
+                        break
+                    parked[host].append(url)
+                else:
+                    return None, None
+            active[host] += 1
+            return url, host
+        
+        async def worker():
+            url, host = take(None)
+            while url is not None:
+                item = await self._analyze_one(url)
+                active[host] -= 1
+                # Claim the next URL before waiting on the consumer, so no other worker takes this host's room
+                following = take(host)
+                await finished.put(item)
+                url, host = following
+            await finished.put(None)
+        
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        try:
+            running = len(workers)
+            while running:
+                item = await finished.get()
+                if item is None:
+                    running -= 1
+                else:
+                    yield item
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def _analyze_one(self, url: str) -> Dict[str, Any]:
+        try:
+            if self.robots and not await self.robots.allowed(url, get_shared_session()):
+                return {"url": url, "status": "skipped", "error": "Disallowed by robots.txt"}
+            return {"url": url, "status": "completed", **await self.analyze(url)}
+        except Exception as e:
+            return {"url": url, "status": "failed", "error": str(e)}
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+from analyzer import CATEGORIES, PageDocument, WebsiteAnalyzer
+from robots import RobotsCache, robots_cache
+from scoring import ScoreAggregate
+from url_utils import normalize_url
+
+class BloomFilter:
+    """Fixed-size probabilistic set for very large crawl frontiers
+    
+    Membership tests may give false positives at roughly error_rate once
+    capacity items were added, which only means a page is skipped.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, item: str):
+        digest = hashlib.sha256(item.encode('utf-8')).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:16], 'big') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size
+    
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class SiteReport:
+    """Site-level summary built incrementally from crawled pages
+    
+    Only aggregates are kept: score statistics, how many pages share each
+    issue, and the lowest-scoring pages.
+    """
+    
+    def __init__(self, start_url: str, worst_pages: int = 10):
+        self.start_url = start_url
+        self.scores = ScoreAggregate()
+        self.issues = Counter()
+        self.worst_pages_limit = worst_pages
+        self._worst_pages = []
+        self._order = 0
+    
+    def add(self, item: Dict[str, Any]):
+        """Fold one crawled page into the report"""
+        results = item.get("results")
+        self.scores.add(item["status"], results)
+        if not results:
+            return
+        
+        for category in CATEGORIES:
+            for issue in (results.get(category) or {}).get("issues", []):
+                # Group issues that only differ by their counts
+                self.issues[f"[{category.upper()}] {re.sub(r'[0-9]+', 'N', issue)}"] += 1
+        
+        # Max-heap on score (via negation) keeps the lowest-scoring pages
+        self._order += 1
+        entry = (-results.get("overall_score", 0), self._order, item["url"])
+        if len(self._worst_pages) < self.worst_pages_limit:
+            heapq.heappush(self._worst_pages, entry)
+        else:
+            heapq.heappushpop(self._worst_pages, entry)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start_url": self.start_url,
+            **self.scores.to_dict(),
+            "common_issues": [
+                {"issue": issue, "pages": pages} for issue, pages in self.issues.most_common(20)
+            ],
+            "worst_pages": [
+                {"url": url, "overall_score": -score} for score, _, url in sorted(self._worst_pages, reverse=True)
+            ]
+        }
+
+class SiteCrawler:
+    """Crawl same-origin pages from a start URL and run every category on each
+    
+    The frontier is deduplicated on normalized URLs (optionally with a Bloom
+    filter) and each parsed page is dropped as soon as its results and links
+    are extracted. The rate limit and any robots.txt Crawl-delay cap the
+    site's rate in the analyzer's shared per-host limiter, so page fetches,
+    image probes and other analyses of the same site all stay within it.
+    Each instance runs a single crawl.
+    """
+    
+    def __init__(self, analyze: Callable[[str, PageDocument], Awaitable[Dict[str, Any]]],
+                 analyzer: Optional[WebsiteAnalyzer] = None, max_depth: int = 2, max_pages: int = 100,
+                 concurrency: int = 4, requests_per_second: float = 2.0, use_bloom_filter: bool = False,
+                 robots: Optional[RobotsCache] = robots_cache):
+        self.analyze = analyze
+        self.analyzer = analyzer or WebsiteAnalyzer()
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.robots = robots
+        self._seen = BloomFilter(max_pages) if use_bloom_filter else set()
+        self._scheduled = 0
+    
+    async def crawl(self, start_url: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one item per crawled page as soon as it is analyzed"""
+        origin = urlsplit(start_url)
+        frontier: asyncio.Queue = asyncio.Queue()
+        finished: asyncio.Queue = asyncio.Queue()
+        
+        rate = self.requests_per_second
+        if self.robots:
+            delay = await self.robots.crawl_delay(start_url, self.analyzer._get_session())
+            if delay:
+                rate = min(rate, 1 / delay)
+        # Workers only start fetching once this generator first awaits, inside the cap
+        limit = self.analyzer.limiter.limited(start_url, rate) if self.analyzer.limiter else nullcontext()
+        
+        self._schedule(start_url, 0, origin, frontier)
+        
+        async def worker():
+            while True:
+                url, depth = await frontier.get()
+                try:
+                    finished.put_nowait(await self._crawl_one(url, depth, origin, frontier))
+                except Exception as e:
+                    finished.put_nowait({"url": url, "depth": depth, "status": "failed", "error": str(e)})
+                finally:
+                    frontier.task_done()
+        
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        drained = asyncio.ensure_future(frontier.join())
+        try:
+            with limit:
+                while True:
+                    next_item = asyncio.ensure_future(finished.get())
+                    await asyncio.wait({next_item, drained}, return_when=asyncio.FIRST_COMPLETED)
+                    if next_item.done():
+                        yield next_item.result()
+                        continue
+                    next_item.cancel()
+                    # Every page is finished; its item was queued before task_done
+                    while not finished.empty():
+                        yield finished.get_nowait()
+                    return
+        finally:
+            drained.cancel()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(drained, *workers, return_exceptions=True)
+    
+    def _schedule(self, url: str, depth: int, origin, frontier: asyncio.Queue):
+        """Add a URL to the frontier unless it is off-site, too deep, seen or over the page limit"""
+        if depth > self.max_depth or self._scheduled >= self.max_pages:
+            return
+        parts = urlsplit(url)
+        if parts.scheme != origin.scheme or parts.netloc != origin.netloc:
+            return
+        normalized = normalize_url(url)
+        if normalized in self._seen:
+            return
+        self._seen.add(normalized)
+        self._scheduled += 1
+        frontier.put_nowait((url, depth))
+    
+    async def _crawl_one(self, url: str, depth: int, origin, frontier: asyncio.Queue) -> Dict[str, Any]:
+        session = self.analyzer._get_session()
+        if self.robots and not await self.robots.allowed(url, session):
+            return {"url": url, "depth": depth, "status": "skipped", "error": "Disallowed by robots.txt"}
+        
+        page = await self.analyzer.fetch_page(url)
+        if not page.is_html:
+            return {"url": url, "depth": depth, "status": "skipped", "error": "Not an HTML page"}
+        
+        # Links are read after analysis so an off-loop evaluation can supply them
+        results = await self.analyze(url, page)
+        if depth < self.max_depth:
+            for link in page.internal_links():
+                self._schedule(link, depth + 1, origin, frontier)
+        return {"url": url, "depth": depth, "status": "completed", "results": results}
@@ -0,0 +1,336 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from html_parsers import Element
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# Registering this tag name dispatches every element to the rule
+ANY_TAG = '*'
+
+# Elements allowed in <head>; any other element starts the body, as in an HTML5 parser
+HEAD_TAGS = frozenset(('html', 'head', 'title', 'base', 'meta', 'link', 'style', 'script', 'noscript', 'template'))
+
+# What HTML counts as whitespace; str.strip() would also take e.g. a non-breaking space
+HTML_WHITESPACE = ' \t\n\r\f'
+
+# @import rules in a <style> block: the URL, then any media query list
+CSS_IMPORT = re.compile(r'@import\s+(?:url\(\s*)?["\']?([^"\')\s;]+)["\']?\s*\)?\s*([^;]*)', re.IGNORECASE)
+
+class Rule:
+    """A check fed by the single document traversal
+    
+    Subclasses declare the tag names (or ANY_TAG) and attribute names they
+    care about; visit() is called once for every matching element. Rules that need the
+    visible text set wants_text and receive each text node through text().
+    Elements follow the small html_parsers.Element interface, so rules work
+    with whichever parser backend produced them.
+    """
+    
+    name = ''
+    tags: Tuple[str, ...] = ()
+    attributes: Tuple[str, ...] = ()
+    wants_text = False
+    
+    def visit(self, element: Element):
+        pass
+    
+    def text(self, string: str):
+        pass
+    
+    def result(self) -> Any:
+        raise NotImplementedError
+
+class CountRule(Rule):
+    """Count elements with any of the given tag names"""
+    
+    def __init__(self, name: str, tags: Tuple[str, ...]):
+        self.name = name
+        self.tags = tags
+        self.count = 0
+    
+    def visit(self, element: Element):
+        self.count += 1
+    
+    def result(self) -> int:
+        return self.count
+
+class ImageRule(Rule):
+    """Image sources plus counts of images with an empty alt and with no usable alt"""
+    
+    name = 'images'
+    tags = ('img',)
+    
+    def __init__(self):
+        self.sources: List[Optional[str]] = []
+        self.empty_alt = 0
+        self.missing_alt = 0
+    
+    def visit(self, element: Element):
+        self.sources.append(element.get('src'))
+        alt = element.get('alt')
+        if alt == '':
+            self.empty_alt += 1
+        if not alt:
+            self.missing_alt += 1
+    
+    def result(self) -> Dict[str, Any]:
+        return {"sources": self.sources, "empty_alt": self.empty_alt, "missing_alt": self.missing_alt}
+
+class FormLabelRule(Rule):
+    """Visible inputs with an id but no aria label and no <label for> pointing at them
+    
+    Label targets are collected into a set during the traversal, so the
+    lookup is O(1) per input wherever the label appears in the document.
+    """
+    
+    name = 'unlabeled_inputs'
+    tags = ('input', 'label')
+    
+    def __init__(self):
+        self.label_targets = set()
+        self.candidate_ids: List[str] = []
+    
+    def visit(self, element: Element):
+        if element.name == 'label':
+            target = element.get('for')
+            if target is not None:
+                self.label_targets.add(target)
+            return
+        if element.get('type') in ['hidden', 'submit', 'button']:
+            return
+        if element.get('aria-label') or element.get('aria-labelledby'):
+            return
+        input_id = element.get('id')
+        if input_id:
+            self.candidate_ids.append(input_id)
+    
+    def result(self) -> int:
+        return sum(1 for input_id in self.candidate_ids if input_id not in self.label_targets)
+
+class StyleRule(Rule):
+    """Whether the page has any <style> block or inline style attribute"""
+    
+    name = 'has_css'
+    tags = ('style',)
+    attributes = ('style',)
+    
+    def __init__(self):
+        self.found = False
+    
+    def visit(self, element: Element):
+        self.found = True
+    
+    def result(self) -> bool:
+        return self.found
+
+class TitleRule(Rule):
+    """Text of the first <title>, or None when there is none"""
+    
+    name = 'title'
+    tags = ('title',)
+    
+    def __init__(self):
+        self.title: Optional[str] = None
+    
+    def visit(self, element: Element):
+        if self.title is None:
+            self.title = element.get_text()
+    
+    def result(self) -> Optional[str]:
+        return self.title
+
+class MetaDescriptionRule(Rule):
+    """Content of the first <meta name="description">, or None when there is none"""
+    
+    name = 'meta_description'
+    tags = ('meta',)
+    
+    def __init__(self):
+        self.description: Optional[str] = None
+    
+    def visit(self, element: Element):
+        if self.description is None and element.get('name') == 'description':
+            self.description = element.get('content', '')
+    
+    def result(self) -> Optional[str]:
+        return self.description
+
+class LinkRule(Rule):
+    """href of every <a> that has one, in document order"""
+    
+    name = 'links'
+    tags = ('a',)
+    
+    def __init__(self):
+        self.hrefs: List[str] = []
+    
+    def visit(self, element: Element):
+        href = element.get('href')
+        if href is not None:
+            self.hrefs.append(href)
+    
+    def result(self) -> List[str]:
+        return self.hrefs
+
+class SubResourceRule(Rule):
+    """Stylesheets, scripts and fonts the page loads, as {"type", "url", "render_blocking"} in document order
+    
+    Covers <script src>, stylesheet and preload links and @import rules in
+    <style> blocks, with URLs left as written. Synchronous scripts and
+    screen stylesheets (and their imports) in <head> block rendering. Head
+    ends at the first element that cannot be in it or the first text that is
+    not a title (either starts the body in an HTML5 parser), so every
+    backend agrees without needing end tags.
+    """
+    
+    name = 'sub_resources'
+    tags = (ANY_TAG,)
+    wants_text = True
+    
+    PRELOAD_TYPES = {'style': 'stylesheet', 'script': 'script', 'font': 'font'}
+    
+    def __init__(self):
+        self.resources: List[Dict[str, Any]] = []
+        self.in_head = True
+        self.in_title = False
+    
+    def visit(self, element: Element):
+        name = element.name
+        self.in_title = name == 'title'
+        if name not in HEAD_TAGS:
+            self.in_head = False
+        elif name == 'script':
+            # Module scripts are deferred by default
+            blocking = (element.get('async') is None and element.get('defer') is None
+                        and (element.get('type') or '').lower() != 'module')
+            self._add('script', element.get('src'), blocking)
+        elif name == 'link':
+            rel = (element.get('rel') or '').lower().split()
+            if 'stylesheet' in rel:
+                blocking = 'alternate' not in rel and element.get('disabled') is None and _blocks_rendering(element.get('media'))
+                self._add('stylesheet', element.get('href'), blocking)
+            elif 'modulepreload' in rel:
+                self._add('script', element.get('href'), False)
+            elif 'preload' in rel:
+                self._add(self.PRELOAD_TYPES.get((element.get('as') or '').lower()), element.get('href'), False)
+        elif name == 'style':
+            blocking = _blocks_rendering(element.get('media'))
+            for url, media in CSS_IMPORT.findall(element.get_text()):
+                self._add('stylesheet', url, blocking and _blocks_rendering(media))
+    
+    def text(self, string: str):
+        if self.in_title:
+            # Only the text right after <title> is the title's
+            self.in_title = False
+        elif string.strip(HTML_WHITESPACE):
+            self.in_head = False
+    
+    def _add(self, resource_type: Optional[str], url: Optional[str], blocking: bool):
+        if resource_type and url and url.strip():
+            self.resources.append({"type": resource_type, "url": url.strip(), "render_blocking": blocking and self.in_head})
+    
+    def result(self) -> List[Dict[str, Any]]:
+        return self.resources
+
+def _blocks_rendering(media: Optional[str]) -> bool:
+    """Whether a stylesheet for this media query list holds up rendering on screen"""
+    return (media or '').strip().lower() not in ('print', 'not all', 'speech')
+
+class StructuredDataRule(Rule):
+    """Number of JSON-LD script blocks"""
+    
+    name = 'json_ld'
+    tags = ('script',)
+    
+    def __init__(self):
+        self.count = 0
+    
+    def visit(self, element: Element):
+        if element.get('type') == 'application/ld+json':
+            self.count += 1
+    
+    def result(self) -> int:
+        return self.count
+
+class VisibleTextRule(Rule):
+    """Document text outside script and style elements"""
+    
+    name = 'text'
+    wants_text = True
+    
+    def __init__(self):
+        self.parts: List[str] = []
+    
+    def text(self, string: str):
+        self.parts.append(string)
+    
+    def result(self) -> str:
+        return ''.join(self.parts)
+
+def default_rules() -> List[Rule]:
+    """Fresh instances of every rule the category checks read"""
+    return [
+        ImageRule(),
+        FormLabelRule(),
+        StyleRule(),
+        TitleRule(),
+        MetaDescriptionRule(),
+        LinkRule(),
+        SubResourceRule(),
+        StructuredDataRule(),
+        VisibleTextRule(),
+        CountRule('h1', ('h1',)),
+        CountRule('headings', HEADING_TAGS),
+        CountRule('paragraphs', ('p',)),
+        CountRule('lists', ('ul', 'ol'))
+    ]
+
+class RuleEngine:
+    """Evaluate many rules in one traversal of the document
+    
+    Rules are indexed by the tags and attributes they registered, so each
+    node is dispatched only to the rules that care about it and the whole
+    rule set costs O(n) in the size of the document.
+    """
+    
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self._by_tag = defaultdict(list)
+        self._by_attribute = defaultdict(list)
+        # Rules registered for ANY_TAG, the only ones elements with no tag-specific rule go to
+        self._any_tag = [rule for rule in rules if ANY_TAG in rule.tags]
+        for rule in rules:
+            for tag in rule.tags:
+                if tag != ANY_TAG:
+                    self._by_tag[tag].append(rule)
+            for attribute in rule.attributes:
+                self._by_attribute[attribute].append(rule)
+        if self._any_tag:
+            for tag, tag_rules in self._by_tag.items():
+                self._by_tag[tag] = list(dict.fromkeys(tag_rules + self._any_tag))
+        self._text_rules = [rule for rule in rules if rule.wants_text]
+    
+    def run(self, events: Iterable[Union[Element, str]]) -> Dict[str, Any]:
+        """Consume a backend's parse events once and return each rule's result by name"""
+        by_tag = self._by_tag
+        by_attribute = self._by_attribute
+        any_tag = self._any_tag
+        text_rules = self._text_rules
+        
+        for node in events:
+            if isinstance(node, str):
+                for rule in text_rules:
+                    rule.text(node)
+                continue
+            matched = by_tag.get(node.name, any_tag)
+            if by_attribute:
+                attribute_rules = [rule for attribute in node.attrs for rule in by_attribute.get(attribute, ())]
+                if attribute_rules:
+                    # A rule registered for both the tag and an attribute still sees the element once
+                    matched = list(dict.fromkeys(matched + attribute_rules))
+            for rule in matched:
+                rule.visit(node)
+        
+        return {rule.name: rule.result() for rule in self.rules}
@@ -0,0 +1,176 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from scoring import CATEGORIES
+from sqlite_db import SQLiteDatabase
+from url_utils import normalize_url
+
+# Runs older than this are dropped by cleanup
+HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', 365))
+
+# Metrics kept for every run, by dotted path into the result document, with whether
+# higher is better (None when neither is) and the smallest change a diff reports
+TRACKED_METRICS: Dict[str, Tuple[Optional[bool], float]] = {
+    'overall_score': (True, 1),
+    'performance.score': (True, 1),
+    'accessibility.score': (True, 1),
+    'seo.score': (True, 1),
+    'security.score': (True, 1),
+    'content.score': (True, 1),
+    'performance.load_time': (False, 0.1),
+    'performance.timing.ttfb': (False, 0.05),
+    'performance.resources.fully_loaded': (False, 0.2),
+    'performance.resources.requests': (False, 1),
+    'performance.resources.total_bytes': (False, 10240),
+    'performance.page_size': (False, 1024),
+    'performance.unoptimized_images': (False, 1),
+    'performance.asset_findings.render_blocking': (False, 1),
+    'content.word_count': (None, 10),
+    'transport.compression.savings': (True, 0.01)
+}
+
+def extract_metrics(results: Dict[str, Any]) -> Dict[str, float]:
+    """The tracked metrics present in a result document; categories that failed are left out"""
+    metrics = {}
+    for path in TRACKED_METRICS:
+        value = results
+        for key in path.split('.'):
+            if not isinstance(value, dict) or "error" in value:
+                value = None
+                break
+            value = value.get(key)
+        if isinstance(value, (int, float)):
+            metrics[path] = value
+    return metrics
+
+def extract_issues(results: Dict[str, Any]) -> List[str]:
+    """Every category's issues, prefixed with the category like the priority recommendations"""
+    issues = []
+    for category in CATEGORIES:
+        for issue in (results.get(category) or {}).get("issues", []):
+            issues.append(f"[{category.upper()}] {issue}")
+    return issues
+
+def diff_runs(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """What changed from one run to the next: metrics past their threshold and issues added or resolved"""
+    def summary(run):
+        return {"analysis_id": run["analysis_id"], "recorded_at": run["recorded_at"]} if run else None
+    
+    previous_metrics = previous["metrics"] if previous else {}
+    previous_issues = set(previous["issues"]) if previous else set()
+    
+    changes = {}
+    for metric, value in current["metrics"].items():
+        before = previous_metrics.get(metric)
+        if before is None:
+            continue
+        higher_is_better, threshold = TRACKED_METRICS.get(metric, (None, 0))
+        delta = value - before
+        if delta == 0 or abs(delta) < threshold:
+            continue
+        if higher_is_better is None:
+            direction = "changed"
+        else:
+            direction = "improved" if (delta > 0) == higher_is_better else "regressed"
+        changes[metric] = {"previous": before, "current": value, "delta": round(delta, 3), "direction": direction}
+    
+    current_issues = set(current["issues"])
+    return {
+        "current": summary(current),
+        "previous": summary(previous),
+        "changes": changes,
+        "regressions": [metric for metric, change in changes.items() if change["direction"] == "regressed"],
+        "improvements": [metric for metric, change in changes.items() if change["direction"] == "improved"],
+        # Metrics the previous run had but this one could not measure, e.g. a category that failed
+        "missing": sorted(set(previous_metrics) - set(current["metrics"])),
+        "new_issues": sorted(current_issues - previous_issues),
+        "resolved_issues": sorted(previous_issues - current_issues)
+    }
+
+class HistoryStore:
+    """Interface for the append-only per-URL history of finished analyses"""
+    
+    def record(self, url: str, analysis_id: str, results: Dict[str, Any]):
+        """Append the tracked metrics and issues of a finished analysis"""
+        raise NotImplementedError
+    
+    def runs(self, url: str, limit: int = 30, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """The most recent runs for a URL (any form that normalizes the same), oldest first"""
+        raise NotImplementedError
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        """Delete runs older than max_age_seconds; returns the number removed"""
+        raise NotImplementedError
+
+class SQLiteHistoryStore(HistoryStore):
+    """One row per run in SQLite (WAL mode), indexed by normalized URL and time
+    
+    Rows are only ever inserted, never updated, so recording a run is a
+    single append and a trend is one index range scan. Metrics are a small
+    JSON object, so newly tracked metrics need no migration.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'analysis_history.db')
+        self._db = SQLiteDatabase(self.path)
+        with self._db.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS history (
+                    run_id INTEGER PRIMARY KEY,
+                    url_key TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    analysis_id TEXT NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    metrics TEXT NOT NULL,
+                    issues TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_url_time ON history(url_key, recorded_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_recorded_at ON history(recorded_at)")
+    
+    def record(self, url: str, analysis_id: str, results: Dict[str, Any]):
+        with self._db.connect() as conn:
+            conn.execute(
+                "INSERT INTO history (url_key, url, analysis_id, recorded_at, metrics, issues) VALUES (?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), url, analysis_id, time.time(),
+                 json.dumps(extract_metrics(results)), json.dumps(extract_issues(results)))
+            )
+    
+    def runs(self, url: str, limit: int = 30, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        rows = self._db.connect().execute("""
+            SELECT analysis_id, recorded_at, metrics, issues FROM history
+            WHERE url_key = ? AND recorded_at >= ?
+            ORDER BY recorded_at DESC, run_id DESC LIMIT ?
+        """, (normalize_url(url), since or 0, limit)).fetchall()
+        return [
+            {
+                "analysis_id": analysis_id,
+                "recorded_at": datetime.fromtimestamp(recorded_at).isoformat(),
+                "metrics": json.loads(metrics),
+                "issues": json.loads(issues)
+            }
+            for analysis_id, recorded_at, metrics, issues in reversed(rows)
+        ]
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        with self._db.connect() as conn:
+            cursor = conn.execute("DELETE FROM history WHERE recorded_at < ?", (time.time() - max_age_seconds,))
+        return cursor.rowcount
+
+_history_store: Optional[HistoryStore] = None
+
+def get_history_store() -> HistoryStore:
+    """Get the configured history store; HISTORY_STORE selects 'sqlite' (the only backend so far)"""
+    global _history_store
+    if _history_store is None:
+        backend = os.environ.get('HISTORY_STORE', 'sqlite')
+        path = os.environ.get('HISTORY_STORE_PATH')
+        if backend == 'sqlite':
+            _history_store = SQLiteHistoryStore(path)
+        else:
+            raise ValueError(f"Unknown history store backend: {backend}")
+    return _history_store
@@ -0,0 +1,250 @@
+import os
+import re
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# "auto" (fastest installed), "lxml", "selectolax" or "bs4"
+HTML_PARSER = os.environ.get('HTML_PARSER', 'auto')
+
+# Text anywhere inside these elements is not part of the visible text, as with BeautifulSoup's get_text()
+HIDDEN_TEXT_TAGS = frozenset(('script', 'style', 'template', 'rt', 'rp'))
+# Elements libxml2 and HTML5 parsers read as raw text but html.parser reads as markup; the fast
+# backends parse their text again so every backend sees the same elements
+RAW_MARKUP_TAGS = frozenset(('iframe', 'noembed', 'noframes', 'plaintext', 'xmp'))
+# libxml2 drops everything after </html>, where html.parser carries on
+HTML_END_TAG = re.compile(rb'</html(?:[\s/][^>]*)?>', re.IGNORECASE)
+
+def _cdata_text(comment: str) -> Optional[str]:
+    """Text of a CDATA section, which libxml2 and HTML5 parsers read as a comment '[CDATA[...]]'"""
+    if comment.startswith('[CDATA[') and comment.endswith(']]'):
+        return comment[7:-2]
+    return None
+
+class Element:
+    """The view of an element that rules are written against
+    
+    Exposes the lowercase tag name, attrs (a mapping of attribute name to
+    string value, '' for valueless attributes), get() and get_text(), the
+    same surface as a BeautifulSoup Tag, so any backend can feed the rules.
+    """
+    
+    __slots__ = ('name', 'attrs', '_node')
+    
+    def __init__(self, name: str, attrs: Dict[str, str], node: Any):
+        self.name = name
+        self.attrs = attrs
+        self._node = node
+    
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return self.attrs.get(key, default)
+    
+    def get_text(self) -> str:
+        raise NotImplementedError
+
+class LxmlElement(Element):
+    __slots__ = ()
+    
+    def get_text(self) -> str:
+        return ''.join(self._node.itertext())
+
+class LexborElement(Element):
+    __slots__ = ()
+    
+    def get_text(self) -> str:
+        return self._node.text(deep=True)
+
+class ParserBackend:
+    """Turns an HTML document into a stream of parse events
+    
+    events() yields, in document order, one element object per start tag
+    and one str per visible text node. Every backend follows what the
+    original BeautifulSoup and html.parser code saw: elements inside
+    <template> and raw text elements such as <xmp> count like any other,
+    content after </html> is kept, CDATA sections are visible text and
+    text inside script, style, template and ruby annotations is not.
+    """
+    
+    name = ''
+    
+    def events(self, content: str) -> Iterator[Union[Element, Tag, str]]:
+        raise NotImplementedError
+
+class SoupBackend(ParserBackend):
+    """BeautifulSoup with the pure-Python html.parser, the original behaviour"""
+    
+    name = 'bs4'
+    
+    def events(self, content: str) -> Iterator[Union[Tag, str]]:
+        # Keep class, rel etc. as plain strings like the other backends
+        soup = BeautifulSoup(content, 'html.parser', multi_valued_attributes=None)
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                yield node
+            elif type(node) in (NavigableString, CData):
+                # Strings in script, style, template, rt and rp elements have their own subclasses
+                yield node
+
+class LxmlBackend(ParserBackend):
+    """libxml2's HTML parser through lxml"""
+    
+    name = 'lxml'
+    
+    def events(self, content: str) -> Iterator[Union[Element, str]]:
+        root = self._parse(content)
+        if root is not None:
+            yield from self._walk(root, False, True)
+    
+    def _parse(self, content: str):
+        # lxml parsers must not be shared between threads, so each document gets its own.
+        # huge_tree lifts libxml2's 256-level nesting limit, past which it silently stops parsing
+        parser = etree.HTMLParser(encoding='utf-8', huge_tree=True)
+        # Bytes with an explicit encoding, so an XML declaration or meta charset cannot override it
+        try:
+            return etree.fromstring(HTML_END_TAG.sub(b'', content.encode('utf-8')), parser)
+        except etree.XMLSyntaxError:
+            # Raised for documents with no markup at all
+            return None
+    
+    def _walk(self, root, hidden: bool, include_root: bool) -> Iterator[Union[Element, str]]:
+        """Events for everything in root and optionally root itself; hidden leaves out all text but CDATA sections"""
+        # Depth inside elements whose text is hidden
+        hiding = 1 if hidden else 0
+        # Comments and processing instructions come as their own events, never start/end,
+        # and only there is the text after them (their tail) seen
+        for action, node in etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+            tag = node.tag
+            if action == 'start':
+                if include_root or node is not root:
+                    yield LxmlElement(tag, node.attrib, node)
+                if tag in HIDDEN_TEXT_TAGS:
+                    hiding += 1
+                if not node.text:
+                    continue
+                if tag in RAW_MARKUP_TAGS:
+                    yield from self._fragment(node.text, hiding > 0)
+                elif not hiding:
+                    yield node.text
+                continue
+            
+            if action == 'end':
+                if tag in HIDDEN_TEXT_TAGS:
+                    hiding -= 1
+            elif action == 'comment':
+                cdata = _cdata_text(node.text or '')
+                if cdata:
+                    yield cdata
+            # Tail text sits after the node, inside its parent
+            if node.tail and not hiding:
+                yield node.tail
+    
+    def _fragment(self, markup: str, hidden: bool) -> Iterator[Union[Element, str]]:
+        """Events for markup parsed as the content of a body element, leaving out html and body themselves"""
+        root = self._parse('<body>' + markup)
+        body = root.find('body') if root is not None else None
+        if body is not None:
+            yield from self._walk(body, hidden, False)
+
+class SelectolaxBackend(ParserBackend):
+    """The lexbor HTML5 parser through selectolax"""
+    
+    name = 'selectolax'
+    
+    def events(self, content: str) -> Iterator[Union[Element, str]]:
+        root = LexborHTMLParser(content).root
+        if root is not None:
+            yield from self._walk(root.traverse(include_text=True), False)
+    
+    def _walk(self, nodes: Iterator[Any], hidden: bool) -> Iterator[Union[Element, str]]:
+        """Events for nodes in document order; hidden leaves out all text but CDATA sections"""
+        # traverse() has no end events, so a hidden stretch lasts until the first node past its element,
+        # or to the end when that is None
+        hiding = hidden
+        shown_from = None
+        for node in nodes:
+            if hiding and shown_from is not None and node.mem_id == shown_from:
+                hiding = False
+                shown_from = None
+            
+            tag = node.tag
+            if tag == '-text':
+                if node.parent.tag in RAW_MARKUP_TAGS:
+                    yield from self._fragment(node.text_content, hiding)
+                elif not hiding:
+                    yield node.text_content
+            elif tag == '-comment':
+                cdata = _cdata_text(node.comment_content or '')
+                if cdata:
+                    yield cdata
+            elif tag and tag[0] != '-':
+                # Other non-element nodes are named '-...', or None for processing instructions.
+                # Valueless attributes come back as None; bs4 reports them as ''
+                attrs = {key: value or '' for key, value in node.attributes.items()}
+                yield LexborElement(tag, attrs, node)
+                if tag == 'template':
+                    yield from self._template_contents(node)
+                elif tag in HIDDEN_TEXT_TAGS and not hiding:
+                    hiding = True
+                    shown_from = _following(node)
+    
+    def _template_contents(self, node: Any) -> Iterator[Union[Element, str]]:
+        # lexbor keeps template contents out of the tree it walks, but serializes them. The start tag
+        # ends at the first '>', as lexbor escapes it in attribute values
+        markup = node.html
+        yield from self._fragment(markup[markup.index('>') + 1:-len('</template>')], True)
+    
+    def _fragment(self, markup: str, hidden: bool) -> Iterator[Union[Element, str]]:
+        """Events for markup parsed as the content of a body element, leaving out html and body themselves"""
+        body = LexborHTMLParser('<body>' + markup).body
+        if body is not None:
+            nodes = body.traverse(include_text=True)
+            next(nodes)
+            yield from self._walk(nodes, hidden)
+
+def _following(node: Any) -> Optional[int]:
+    """mem_id of the first node after node and everything in it, None at the end of the document"""
+    while node is not None:
+        if node.next is not None:
+            return node.next.mem_id
+        node = node.parent
+    return None
+
+BACKENDS = {
+    'lxml': LxmlBackend,
+    'selectolax': SelectolaxBackend,
+    'bs4': SoupBackend
+}
+
+def available_backends() -> List[str]:
+    """Names of the backends whose parser is installed, fastest first"""
+    installed = {
+        'lxml': etree is not None,
+        'selectolax': LexborHTMLParser is not None,
+        'bs4': True
+    }
+    return [name for name in BACKENDS if installed[name]]
+
+_backends: Dict[str, ParserBackend] = {}
+
+def get_parser_backend(name: Optional[str] = None) -> ParserBackend:
+    """Get a backend by name, defaulting to HTML_PARSER"""
+    name = name or HTML_PARSER
+    if name == 'auto':
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser: {name}")
+    if name not in available_backends():
+        raise ValueError(f"HTML parser {name} is not installed")
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
@@ -0,0 +1,51 @@
+import aiohttp
+import os
+from typing import Optional
+
+from request_timing import create_trace_config
+
+# Connector tuning, overridable through the environment
+HTTP_CONNECTION_LIMIT = int(os.environ.get('HTTP_CONNECTION_LIMIT', 100))
+HTTP_LIMIT_PER_HOST = int(os.environ.get('HTTP_LIMIT_PER_HOST', 10))
+HTTP_DNS_CACHE_TTL = int(os.environ.get('HTTP_DNS_CACHE_TTL', 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get('HTTP_KEEPALIVE_TIMEOUT', 30))
+
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+def create_session(limit: int = HTTP_CONNECTION_LIMIT, limit_per_host: int = HTTP_LIMIT_PER_HOST,
+                   dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+                   keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT) -> aiohttp.ClientSession:
+    """Create a client session backed by a pooled, keep-alive connector
+    
+    Requests that pass a RequestTiming as trace_request_ctx get their
+    connection phases recorded; the hooks do nothing for other requests.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+        keepalive_timeout=keepalive_timeout
+    )
+    return aiohttp.ClientSession(connector=connector, trace_configs=[create_trace_config()])
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """Get the process-wide session, creating it on first use"""
+    global _shared_session
+    if _shared_session is None or _shared_session.closed:
+        _shared_session = create_session()
+    return _shared_session
+
+async def start_shared_session(**connector_options) -> aiohttp.ClientSession:
+    """Open the process-wide session, e.g. from an application startup hook"""
+    global _shared_session
+    await close_shared_session()
+    _shared_session = create_session(**connector_options)
+    return _shared_session
+
+async def close_shared_session():
+    """Close the process-wide session and its pooled connections"""
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
@@ -0,0 +1,334 @@
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from sqlite_db import SQLiteDatabase
+
+# Retry policy, overridable through the environment
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 5))
+JOB_RETRY_BACKOFF_MAX = float(os.environ.get('JOB_RETRY_BACKOFF_MAX', 300))
+
+# How long a claimed job stays invisible to other workers without a heartbeat
+JOB_VISIBILITY_TIMEOUT = float(os.environ.get('JOB_VISIBILITY_TIMEOUT', 60))
+
+class Job:
+    """A job claimed by a worker"""
+    
+    def __init__(self, job_id: str, job_type: str, payload: Dict[str, Any], priority: int,
+                 attempts: int, max_attempts: int):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.payload = payload
+        self.priority = priority
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+    
+    @property
+    def final_attempt(self) -> bool:
+        """Whether a failure now is permanent"""
+        return self.attempts >= self.max_attempts
+
+class JobQueue:
+    """Interface for a durable queue of background jobs
+    
+    Claiming a job leases it to one worker for a visibility timeout, which
+    heartbeat() extends. A job whose lease runs out, e.g. because its
+    worker died, becomes claimable again and counts as another attempt.
+    """
+    
+    def enqueue(self, job_type: str, payload: Dict[str, Any], priority: int = 0,
+                max_attempts: int = JOB_MAX_ATTEMPTS, job_id: Optional[str] = None) -> str:
+        """Add a job; higher priorities are claimed first. Returns the job id"""
+        raise NotImplementedError
+    
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+              job_types: Optional[List[str]] = None) -> Optional[Job]:
+        """Lease the next available job, or return None if there is none"""
+        raise NotImplementedError
+    
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> bool:
+        """Extend a lease; returns False if the worker no longer holds it"""
+        raise NotImplementedError
+    
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        """Mark a leased job as done"""
+        raise NotImplementedError
+    
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        """Record a failed attempt; returns True if a retry was scheduled"""
+        raise NotImplementedError
+    
+    def release(self, job_id: str, worker_id: str) -> bool:
+        """Hand a leased job back without counting the attempt, e.g. on shutdown"""
+        raise NotImplementedError
+    
+    def pending_count(self) -> int:
+        """Number of jobs queued or running"""
+        raise NotImplementedError
+    
+    def stats(self) -> Dict[str, int]:
+        """Number of jobs by status"""
+        raise NotImplementedError
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        """Delete finished jobs not updated within max_age_seconds; returns the number removed"""
+        raise NotImplementedError
+
+def retry_delay(attempts: int, base: float = JOB_RETRY_BACKOFF, cap: float = JOB_RETRY_BACKOFF_MAX) -> float:
+    """Exponential backoff with full jitter after the given number of attempts"""
+    return random.uniform(0, min(cap, base * 2 ** (attempts - 1)))
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in SQLite (WAL mode), shared by every process on the host
+    
+    Claims run in an immediate transaction, so concurrent workers in any
+    number of processes never lease the same job twice.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'analysis_jobs.db')
+        # Autocommit, so claims can open their own immediate transaction
+        self._db = SQLiteDatabase(self.path, autocommit=True)
+        conn = self._db.connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                job_type TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_expires_at REAL,
+                worker_id TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, priority DESC, available_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_expires_at)")
+    
+    def enqueue(self, job_type: str, payload: Dict[str, Any], priority: int = 0,
+                max_attempts: int = JOB_MAX_ATTEMPTS, job_id: Optional[str] = None) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        self._db.connect().execute("""
+            INSERT INTO jobs (job_id, job_type, payload, priority, status, max_attempts, available_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?)
+        """, (job_id, job_type, json.dumps(payload), priority, max_attempts, now, now, now))
+        return job_id
+    
+    def claim(self, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+              job_types: Optional[List[str]] = None) -> Optional[Job]:
+        now = time.time()
+        type_filter = ""
+        params: List[Any] = [now, now]
+        if job_types:
+            type_filter = f"AND job_type IN ({', '.join('?' for _ in job_types)})"
+            params.extend(job_types)
+        
+        conn = self._db.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"""
+                SELECT job_id, job_type, payload, priority, attempts, max_attempts FROM jobs
+                WHERE ((status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_expires_at <= ?))
+                {type_filter}
+                ORDER BY priority DESC, available_at
+                LIMIT 1
+            """, params).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            job_id, job_type, payload, priority, attempts, max_attempts = row
+            conn.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, worker_id = ?,
+                    lease_expires_at = ?, updated_at = ?
+                WHERE job_id = ?
+            """, (worker_id, now + visibility_timeout, now, job_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return Job(job_id, job_type, json.loads(payload), priority, attempts + 1, max_attempts)
+    
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> bool:
+        now = time.time()
+        cursor = self._db.connect().execute("""
+            UPDATE jobs SET lease_expires_at = ?, updated_at = ?
+            WHERE job_id = ? AND worker_id = ? AND status = 'running'
+        """, (now + visibility_timeout, now, job_id, worker_id))
+        return cursor.rowcount > 0
+    
+    def complete(self, job_id: str, worker_id: str) -> bool:
+        cursor = self._db.connect().execute("""
+            UPDATE jobs SET status = 'completed', lease_expires_at = NULL, updated_at = ?
+            WHERE job_id = ? AND worker_id = ? AND status = 'running'
+        """, (time.time(), job_id, worker_id))
+        return cursor.rowcount > 0
+    
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        conn = self._db.connect()
+        row = conn.execute(
+            "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND worker_id = ? AND status = 'running'",
+            (job_id, worker_id)
+        ).fetchone()
+        if row is None:
+            return False
+        attempts, max_attempts = row
+        now = time.time()
+        if attempts < max_attempts:
+            conn.execute("""
+                UPDATE jobs SET status = 'queued', available_at = ?, lease_expires_at = NULL,
+                    worker_id = NULL, last_error = ?, updated_at = ?
+                WHERE job_id = ? AND worker_id = ? AND status = 'running'
+            """, (now + retry_delay(attempts), error, now, job_id, worker_id))
+            return True
+        conn.execute("""
+            UPDATE jobs SET status = 'failed', lease_expires_at = NULL, last_error = ?, updated_at = ?
+            WHERE job_id = ? AND worker_id = ? AND status = 'running'
+        """, (error, now, job_id, worker_id))
+        return False
+    
+    def release(self, job_id: str, worker_id: str) -> bool:
+        now = time.time()
+        cursor = self._db.connect().execute("""
+            UPDATE jobs SET status = 'queued', attempts = attempts - 1, available_at = ?,
+                lease_expires_at = NULL, worker_id = NULL, updated_at = ?
+            WHERE job_id = ? AND worker_id = ? AND status = 'running'
+        """, (now, now, job_id, worker_id))
+        return cursor.rowcount > 0
+    
+    def pending_count(self) -> int:
+        return self._db.connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+    
+    def stats(self) -> Dict[str, int]:
+        rows = self._db.connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        cursor = self._db.connect().execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?",
+            (time.time() - max_age_seconds,)
+        )
+        return cursor.rowcount
+
+class JobWorker:
+    """Pull jobs from a queue and run up to concurrency of them at a time
+    
+    handlers maps a job type to an async function taking the Job. A job
+    that raises is retried with backoff until its attempts run out, then
+    on_failed is called with the job and the error. Jobs still running on
+    stop() go back to the queue and are passed to on_released. Leases are
+    renewed while a job runs, so visibility_timeout only bounds how long a
+    dead worker holds on to its jobs.
+    """
+    
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Job], Awaitable[Any]]],
+                 concurrency: int = 10, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT,
+                 poll_interval: float = 1.0, on_failed: Optional[Callable[[Job, str], None]] = None,
+                 on_released: Optional[Callable[[Job], None]] = None):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.on_failed = on_failed
+        self.on_released = on_released
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._wakeup = asyncio.Event()
+        self._tasks: set = set()
+        self._stopping = False
+    
+    def wake(self):
+        """Check the queue now instead of after the poll interval, e.g. right after enqueueing"""
+        self._wakeup.set()
+    
+    async def run(self):
+        """Claim and run jobs until stop() is called"""
+        slots = asyncio.Semaphore(self.concurrency)
+        job_types = list(self.handlers)
+        while not self._stopping:
+            await slots.acquire()
+            if self._stopping:
+                break
+            try:
+                job = self.queue.claim(self.worker_id, self.visibility_timeout, job_types)
+            except Exception as e:
+                print(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                slots.release()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            task = asyncio.create_task(self._process(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+    
+    async def stop(self):
+        """Stop claiming and hand running jobs back to the queue"""
+        self._stopping = True
+        self.wake()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def _process(self, job: Job):
+        if job.attempts > job.max_attempts:
+            # Every attempt so far lost its lease without finishing
+            self._failed(job, "Job did not finish within its visibility timeout")
+            return
+        
+        keepalive = asyncio.create_task(self._keep_leased(job))
+        try:
+            await self.handlers[job.job_type](job)
+        except asyncio.CancelledError:
+            if self.queue.release(job.job_id, self.worker_id) and self.on_released:
+                self.on_released(job)
+            raise
+        except Exception as e:
+            self._failed(job, str(e) or type(e).__name__)
+        else:
+            self.queue.complete(job.job_id, self.worker_id)
+        finally:
+            keepalive.cancel()
+    
+    def _failed(self, job: Job, error: str):
+        if not self.queue.fail(job.job_id, self.worker_id, error) and self.on_failed:
+            self.on_failed(job, error)
+    
+    async def _keep_leased(self, job: Job):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not self.queue.heartbeat(job.job_id, self.worker_id, self.visibility_timeout):
+                print(f"Lost the lease on job {job.job_id}")
+                return
+
+_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Get the configured queue; JOB_QUEUE selects the backend (only 'sqlite' for now)"""
+    global _job_queue
+    if _job_queue is None:
+        backend = os.environ.get('JOB_QUEUE', 'sqlite')
+        if backend == 'sqlite':
+            _job_queue = SQLiteJobQueue(os.environ.get('JOB_QUEUE_PATH'))
+        else:
+            raise ValueError(f"Unknown job queue backend: {backend}")
+    return _job_queue
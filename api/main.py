@@ -1,18 +1,65 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, File, Query, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
-from pydantic import BaseModel, HttpUrl
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl
 import asyncio
+import json
 import os
-from typing import Optional
+from typing import AsyncIterator, Iterator, List, Optional
 import uuid
+import weakref
 from datetime import datetime
 
-from analyzer import WebsiteAnalyzer
-from report_generator import PDFReportGenerator
+from analyzer import CATEGORIES, WebsiteAnalyzer
+from batch import BatchRunner, parse_url_list, unique_urls
+from crawler import SiteCrawler, SiteReport
+from history import HISTORY_RETENTION_DAYS, diff_runs, get_history_store
+from http_session import close_shared_session, start_shared_session
+from job_queue import Job, JobWorker, get_job_queue
+from parse_pool import get_parse_executor, shutdown_parse_executor
+from progress import TERMINAL_STATUSES, ProgressBus
+from render_pool import RenderQueueFull, RenderTimeout, get_render_pool, shutdown_render_pool
+from report_cache import ReportCache
+from report_formats import get_renderer
+from result_cache import ResultCache, cache_key
+from result_store import get_result_store
+from scoring import ScoreAggregate
+from single_flight import SingleFlight
 
 app = FastAPI(title="Website Analyzer API", version="1.0.0")
 
+# Batch limits, overridable through the environment
+MAX_BATCH_URLS = int(os.environ.get('MAX_BATCH_URLS', 10000))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 10))
+BATCH_PER_HOST_CONCURRENCY = int(os.environ.get('BATCH_PER_HOST_CONCURRENCY', 2))
+
+# Batches and crawls run in the API process while they stream, so each process runs only this many at once
+MAX_CONCURRENT_BATCHES = int(os.environ.get('MAX_CONCURRENT_BATCHES', 2))
+MAX_CONCURRENT_CRAWLS = int(os.environ.get('MAX_CONCURRENT_CRAWLS', 2))
+
+# Crawl limits, overridable through the environment
+MAX_CRAWL_PAGES = int(os.environ.get('MAX_CRAWL_PAGES', 10000))
+MAX_CRAWL_DEPTH = int(os.environ.get('MAX_CRAWL_DEPTH', 10))
+CRAWL_CONCURRENCY = int(os.environ.get('CRAWL_CONCURRENCY', 4))
+CRAWL_REQUESTS_PER_SECOND = float(os.environ.get('CRAWL_REQUESTS_PER_SECOND', 2))
+
+# Stored analyses older than this are removed by the periodic cleanup
+REPORT_RETENTION_DAYS = float(os.environ.get('REPORT_RETENTION_DAYS', 7))
+
+# Analysis job queue: per-process worker concurrency, time limit per attempt and backpressure
+MAX_CONCURRENT_ANALYSES = int(os.environ.get('MAX_CONCURRENT_ANALYSES', 10))
+ANALYSIS_TIMEOUT = float(os.environ.get('ANALYSIS_TIMEOUT', 300))
+MAX_QUEUED_ANALYSES = int(os.environ.get('MAX_QUEUED_ANALYSES', 1000))
+# Requests may lower their own queue priority (e.g. for bulk work) but never rank above other requests
+MIN_REQUEST_PRIORITY = -10
+# Run a worker inside the API process; turn off when running worker.py separately
+EMBEDDED_WORKER = os.environ.get('EMBEDDED_WORKER', 'true').lower() in ('1', 'true', 'yes')
+
+# How often an event stream re-reads the store for jobs running in another process
+STATUS_POLL_INTERVAL = float(os.environ.get('STATUS_POLL_INTERVAL', 2))
+
+ANALYSIS_JOB = 'analysis'
+
 # CORS middleware for frontend communication
 app.add_middleware(
     CORSMiddleware,
@@ -22,40 +69,124 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# File-based storage for analysis results (in production, use a database)
-import json
+@app.on_event("startup")
+async def startup():
+    """Open the pooled HTTP session shared by all analyses, start result cleanup and the embedded worker"""
+    await start_shared_session()
+    app.state.cleanup_task = asyncio.create_task(cleanup_expired_results())
+    app.state.job_worker = None
+    if EMBEDDED_WORKER:
+        app.state.job_worker = create_job_worker()
+        app.state.worker_task = asyncio.create_task(app.state.job_worker.run())
 
-def get_analysis_results():
-    """Get analysis results from file storage"""
-    import tempfile
-    storage_path = os.path.join(tempfile.gettempdir(), 'analysis_results.json')
-    try:
-        with open(storage_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-def save_analysis_results(results):
-    """Save analysis results to file storage"""
-    import tempfile
-    storage_path = os.path.join(tempfile.gettempdir(), 'analysis_results.json')
-    with open(storage_path, 'w') as f:
-        json.dump(results, f)
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop the embedded worker and result cleanup, close pooled HTTP connections and stop parse and render workers"""
+    if app.state.job_worker:
+        await app.state.job_worker.stop()
+        app.state.worker_task.cancel()
+    app.state.cleanup_task.cancel()
+    await close_shared_session()
+    shutdown_parse_executor()
+    shutdown_render_pool()
+
+async def cleanup_expired_results(interval: float = 3600):
+    """Periodically drop stored analyses, finished jobs, history and unused reports past their retention periods"""
+    while True:
+        try:
+            removed = get_result_store().cleanup(REPORT_RETENTION_DAYS * 86400)
+            if removed:
+                print(f"Removed {removed} expired analysis results")
+            get_job_queue().cleanup(REPORT_RETENTION_DAYS * 86400)
+            get_history_store().cleanup(HISTORY_RETENTION_DAYS * 86400)
+            report_cache.evict()
+        except Exception as e:
+            print(f"Result cleanup failed: {e}")
+        await asyncio.sleep(interval)
 
 def get_analysis_result(analysis_id):
     """Get a specific analysis result"""
-    results = get_analysis_results()
-    return results.get(analysis_id)
+    return get_result_store().get(analysis_id)
 
 def save_analysis_result(analysis_id, result):
     """Save a specific analysis result"""
-    results = get_analysis_results()
-    results[analysis_id] = result
-    save_analysis_results(results)
+    get_result_store().save(analysis_id, result)
+
+def persist_state(analysis_id, state):
+    """Write a finished analysis, or the progress of one nobody follows here, back to the result store"""
+    get_result_store().update(analysis_id, **state)
+
+# Live progress stays in memory; terminal states, and coarse progress when no one here subscribes, are persisted
+progress_bus = ProgressBus(persist=persist_state)
+
+# Recent results per normalized URL and options, revalidated against the origin once stale
+result_cache = ResultCache()
+
+# PDF reports, rendered on first download and shared by identical results
+report_cache = ReportCache()
+
+# Analyses running in this process by cache key, owned by the analysis_id running them;
+# the run is cancelled with its owner, and identical analyses waiting on it then run their own
+running_analyses = SingleFlight(owned=True)
+
+class StreamSlots:
+    """Per-process cap on streamed jobs (batches, crawls), which run here rather than in the job queue
+    
+    stream() takes a slot or rejects the request with a 503 when none is
+    free; the slot is given back once the stream ends, is abandoned by the
+    client or is dropped without ever being started.
+    """
+    
+    def __init__(self, limit: int, name: str):
+        self.limit = limit
+        self.name = name
+        self.running = 0
+    
+    def stream(self, body: AsyncIterator[str], media_type: str) -> StreamingResponse:
+        """Stream body as the response if a slot is free"""
+        if self.running >= self.limit:
+            raise HTTPException(status_code=503, detail=f"Too many {self.name} running, try again later",
+                                headers={"Retry-After": "30"})
+        self.running += 1
+        released = []
+        
+        def release():
+            if not released:
+                released.append(True)
+                self.running -= 1
+        
+        guarded = self._guarded(body, release)
+        # A stream dropped before its first chunk never runs its finally
+        weakref.finalize(guarded, release)
+        return StreamingResponse(guarded, media_type=media_type)
+    
+    async def _guarded(self, body: AsyncIterator[str], release):
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            try:
+                await body.aclose()
+            finally:
+                release()
+
+batch_slots = StreamSlots(MAX_CONCURRENT_BATCHES, "batches")
+crawl_slots = StreamSlots(MAX_CONCURRENT_CRAWLS, "crawls")
 
 class AnalysisRequest(BaseModel):
     url: HttpUrl
     options: Optional[dict] = {}
+    priority: int = Field(0, ge=MIN_REQUEST_PRIORITY, le=0)
+
+class BatchAnalysisRequest(BaseModel):
+    urls: List[HttpUrl]
+    options: Optional[dict] = {}
+
+class CrawlRequest(BaseModel):
+    url: HttpUrl
+    max_depth: int = 2
+    max_pages: int = 100
+    options: Optional[dict] = {}
 
 class AnalysisResponse(BaseModel):
     analysis_id: str
@@ -70,81 +201,470 @@ async def root():
 async def api_root():
     return {"message": "Website Analyzer API is running!"}
 
-# Endpoints are now handled by individual serverless functions
+@app.post("/api/analyze", response_model=AnalysisResponse)
+async def start_analysis(request: AnalysisRequest):
+    """Queue a website analysis and return its id right away"""
+    job_queue = get_job_queue()
+    if job_queue.pending_count() >= MAX_QUEUED_ANALYSES:
+        raise HTTPException(status_code=503, detail="Analysis queue is full, try again later",
+                            headers={"Retry-After": "30"})
+    
+    analysis_id = str(uuid.uuid4())
+    url = str(request.url)
+    save_analysis_result(analysis_id, {
+        "id": analysis_id,
+        "url": url,
+        "status": "queued",
+        "started_at": datetime.now().isoformat(),
+        "progress": 0,
+        "results": None,
+        "error": None
+    })
+    job_queue.enqueue(ANALYSIS_JOB, {"analysis_id": analysis_id, "url": url, "options": request.options or {}},
+                      priority=request.priority, job_id=analysis_id)
+    if app.state.job_worker:
+        app.state.job_worker.wake()
+    
+    return AnalysisResponse(analysis_id=analysis_id, status="queued", message="Analysis queued")
+
+@app.get("/api/analysis/{analysis_id}")
+async def get_analysis_status(analysis_id: str):
+    """Get analysis status, preferring live progress over the stored record"""
+    result = get_analysis_result(analysis_id)
+    live_state = progress_bus.get(analysis_id)
+    if result is None and live_state is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return {**(result or {}), **(live_state or {})}
 
-async def run_analysis(analysis_id: str, url: str, options: dict):
-    """Run the complete website analysis"""
+@app.get("/api/download/{analysis_id}")
+async def download_report(analysis_id: str, format: str = "pdf"):
+    """Download the report of an analysis, batch or crawl as PDF, JSON, HTML, CSV or SARIF
+    
+    Batch and crawl reports are built one stored page record at a time:
+    text formats are streamed as they are rendered, and PDFs (one section
+    per site) are laid out incrementally. PDFs are rendered on first
+    request and cached.
+    """
+    result = get_analysis_result(analysis_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    is_job = result.get("type") in ("batch", "crawl")
+    # Batches and crawls list their pages once finished (or cancelled part way)
+    finished = result.get("analysis_ids") is not None if is_job else result.get("status") == "completed"
+    if not finished:
+        raise HTTPException(status_code=400, detail="Analysis not completed yet")
+    
+    if format != "pdf":
+        try:
+            renderer = get_renderer(format)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # A sync iterator, so Starlette reads the stored records from a worker thread
+        return StreamingResponse(
+            renderer.render(result, report_records(result)), media_type=renderer.media_type,
+            headers={"Content-Disposition": f"attachment; filename=website_analysis_{analysis_id[:8]}.{renderer.extension}"}
+        )
+    
     try:
-        # Get current result and update status
-        result = get_analysis_result(analysis_id)
-        if result:
-            result["status"] = "analyzing"
-            result["progress"] = 10
-            save_analysis_result(analysis_id, result)
-        
-        # Initialize analyzer
-        analyzer = WebsiteAnalyzer()
-        
-        # Run analysis steps
-        if result:
-            result["progress"] = 20
-            save_analysis_result(analysis_id, result)
-        performance_data = await analyzer.analyze_performance(url)
-        
-        if result:
-            result["progress"] = 40
-            save_analysis_result(analysis_id, result)
-        accessibility_data = await analyzer.analyze_accessibility(url)
-        
-        if result:
-            result["progress"] = 60
-            save_analysis_result(analysis_id, result)
-        seo_data = await analyzer.analyze_seo(url)
-        
-        if result:
-            result["progress"] = 80
-            save_analysis_result(analysis_id, result)
-        security_data = await analyzer.analyze_security(url)
-        
-        if result:
-            result["progress"] = 90
-            save_analysis_result(analysis_id, result)
-        content_data = await analyzer.analyze_content(url)
-        
-        # Compile results
-        analysis_results_data = {
-            "url": url,
-            "analyzed_at": datetime.now().isoformat(),
-            "performance": performance_data,
-            "accessibility": accessibility_data,
-            "seo": seo_data,
-            "security": security_data,
-            "content": content_data,
-            "overall_score": calculate_overall_score(performance_data, accessibility_data, seo_data, security_data, content_data)
-        }
-        
-        if result:
-            result["results"] = analysis_results_data
-            result["progress"] = 95
-            save_analysis_result(analysis_id, result)
-        
-        # Generate PDF report
-        report_generator = PDFReportGenerator()
-        pdf_path = await report_generator.generate_report(analysis_results_data, analysis_id)
+        if result.get("type") == "batch":
+            pdf_path = await report_cache.get_multi_site(result, "Batch Analysis Report")
+        elif result.get("type") == "crawl":
+            pdf_path = await report_cache.get_multi_site(result, f"Site Crawl Report - {result['url']}")
+        else:
+            pdf_path = await report_cache.get(result["results"])
+    except RenderQueueFull:
+        raise HTTPException(status_code=503, detail="Report rendering is busy, try again later",
+                            headers={"Retry-After": "5"})
+    except RenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    return FileResponse(pdf_path, media_type="application/pdf",
+                        filename=f"website_analysis_{analysis_id[:8]}.pdf")
+
+def report_records(result: dict) -> Iterator[dict]:
+    """The analysis records a report covers: the analysis itself, or a batch's or crawl's pages one at a time"""
+    if result.get("type") not in ("batch", "crawl"):
+        yield result
+        return
+    result_store = get_result_store()
+    for item_id in result["analysis_ids"]:
+        item = result_store.get(item_id)
+        if item is not None:
+            yield item
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Queue depths, outcome counts and latencies of the job queue and PDF render pool"""
+    return {"job_queue": get_job_queue().stats(), "render_pool": get_render_pool().stats()}
+
+@app.get("/api/history")
+async def get_history(url: str, limit: int = Query(30, ge=1, le=1000), since: Optional[datetime] = None,
+                      metric: Optional[List[str]] = Query(None)):
+    """Score and metric trend for a URL, oldest run first, optionally only some metrics"""
+    runs = get_history_store().runs(url, limit=limit, since=since.timestamp() if since else None)
+    if not runs:
+        raise HTTPException(status_code=404, detail="No history for this URL")
+    if metric:
+        for run in runs:
+            run["metrics"] = {name: value for name, value in run["metrics"].items() if name in metric}
+    return {"url": url, "runs": runs}
+
+@app.get("/api/history/diff")
+async def get_history_diff(url: str):
+    """What changed between the two most recent runs for a URL"""
+    runs = get_history_store().runs(url, limit=2)
+    if not runs:
+        raise HTTPException(status_code=404, detail="No history for this URL")
+    previous = runs[0] if len(runs) > 1 else None
+    return {"url": url, **diff_runs(previous, runs[-1])}
+
+@app.get("/api/analysis/{analysis_id}/events")
+async def stream_analysis_status(analysis_id: str):
+    """Stream analysis status as server-sent events until it finishes"""
+    result = get_analysis_result(analysis_id)
+    if result is None and progress_bus.get(analysis_id) is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    
+    async def events():
+        stored = result
+        if progress_bus.get(analysis_id) is None:
+            # Not running here yet (or already finished): start from the stored record
+            yield format_sse(stored)
+            if stored.get("status") in TERMINAL_STATUSES:
+                return
+        idle = 0
+        async for state in progress_bus.subscribe(analysis_id, heartbeat=STATUS_POLL_INTERVAL):
+            if state is not None:
+                idle = 0
+                yield format_sse(state)
+                continue
+            if progress_bus.get(analysis_id) is None:
+                # The job may be queued or running in a separate worker process; follow the store
+                latest = get_analysis_result(analysis_id)
+                if latest is not None and latest != stored:
+                    stored = latest
+                    idle = 0
+                    yield format_sse(latest)
+                    if latest.get("status") in TERMINAL_STATUSES:
+                        return
+                    continue
+            idle += STATUS_POLL_INTERVAL
+            if idle >= 15:
+                idle = 0
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def format_sse(data):
+    """Format a payload as a server-sent event"""
+    return f"data: {json.dumps(data)}\n\n"
+
+@app.post("/api/batch")
+async def start_batch(request: BatchAnalysisRequest):
+    """Analyze a list of URLs, streaming results as NDJSON"""
+    return stream_batch(unique_urls(str(url) for url in request.urls), request.options or {})
+
+@app.post("/api/batch/upload")
+async def upload_batch(file: UploadFile = File(...)):
+    """Analyze the URLs in an uploaded text or CSV file, streaming results as NDJSON"""
+    content = await file.read()
+    return stream_batch(parse_url_list(content.decode('utf-8', errors='replace')), {})
+
+@app.get("/api/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    """Get batch status, with aggregate scores once it has finished"""
+    batch = get_analysis_result(batch_id)
+    if batch is None or batch.get("type") != "batch":
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch
+
+def stream_batch(urls: List[str], options: dict) -> StreamingResponse:
+    """Validate a batch and start streaming its results"""
+    if not urls:
+        raise HTTPException(status_code=400, detail="No valid URLs provided")
+    if len(urls) > MAX_BATCH_URLS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_URLS} URLs")
+    return batch_slots.stream(run_batch(str(uuid.uuid4()), urls, options), media_type="application/x-ndjson")
+
+async def run_batch(batch_id: str, urls: List[str], options: dict):
+    """Run a batch, yielding an NDJSON line per URL and a final summary line
+    
+    Each URL is stored as its own analysis record linked to the batch, and
+    the batch record receives the aggregate summary when it finishes.
+    """
+    result_store = get_result_store()
+    result_store.save(batch_id, {
+        "id": batch_id,
+        "type": "batch",
+        "status": "analyzing",
+        "progress": 0,
+        "total": len(urls),
+        "started_at": datetime.now().isoformat(),
+        "summary": None
+    })
+    yield format_ndjson({"type": "batch", "batch_id": batch_id, "total": len(urls)})
+    
+    async def analyze(url):
+        # Items share the result cache and in-flight analyses with single analyses, under the batch's options
+        analysis_id = str(uuid.uuid4())
+        return {"analysis_id": analysis_id, **await coalesce_analysis(analysis_id, url, options, publish_progress=False)}
+    
+    runner = BatchRunner(analyze, concurrency=BATCH_CONCURRENCY, per_host_concurrency=BATCH_PER_HOST_CONCURRENCY)
+    aggregate = ScoreAggregate()
+    analysis_ids = []
+    finished = False
+    try:
+        async for item in runner.run(urls):
+            analysis_id = save_job_item("batch_id", batch_id, item)
+            analysis_ids.append(analysis_id)
+            aggregate.add(item["status"], item.get("results"))
+            result_store.update(batch_id, progress=100 * len(analysis_ids) // len(urls))
+            yield format_ndjson({"type": "result", "analysis_id": analysis_id, **item})
         
-        if result:
-            result["status"] = "completed"
-            result["progress"] = 100
-            result["pdf_path"] = pdf_path
-            save_analysis_result(analysis_id, result)
+        summary = aggregate.to_dict()
+        result_store.update(batch_id, status="completed", progress=100, summary=summary,
+                            analysis_ids=analysis_ids, completed_at=datetime.now().isoformat())
+        finished = True
+        yield format_ndjson({"type": "summary", "batch_id": batch_id, **summary})
+    finally:
+        if not finished:
+            # Client went away mid-batch; keep what was analyzed so far
+            result_store.update(batch_id, status="cancelled", summary=aggregate.to_dict(), analysis_ids=analysis_ids)
+
+@app.post("/api/crawl")
+async def start_crawl(request: CrawlRequest):
+    """Crawl a site from a start URL, streaming page results and a site report as NDJSON"""
+    if not 0 <= request.max_depth <= MAX_CRAWL_DEPTH:
+        raise HTTPException(status_code=400, detail=f"max_depth must be between 0 and {MAX_CRAWL_DEPTH}")
+    if not 1 <= request.max_pages <= MAX_CRAWL_PAGES:
+        raise HTTPException(status_code=400, detail=f"max_pages must be between 1 and {MAX_CRAWL_PAGES}")
+    crawl = run_crawl(str(uuid.uuid4()), str(request.url), request.max_depth, request.max_pages, request.options or {})
+    return crawl_slots.stream(crawl, media_type="application/x-ndjson")
+
+@app.get("/api/crawl/{crawl_id}")
+async def get_crawl(crawl_id: str):
+    """Get crawl status, with the site report once it has finished"""
+    crawl = get_analysis_result(crawl_id)
+    if crawl is None or crawl.get("type") != "crawl":
+        raise HTTPException(status_code=404, detail="Crawl not found")
+    return crawl
+
+async def run_crawl(crawl_id: str, url: str, max_depth: int, max_pages: int, options: dict):
+    """Run a site crawl, yielding an NDJSON line per page and a final site report line"""
+    result_store = get_result_store()
+    result_store.save(crawl_id, {
+        "id": crawl_id,
+        "type": "crawl",
+        "url": url,
+        "status": "analyzing",
+        "progress": 0,
+        "max_depth": max_depth,
+        "max_pages": max_pages,
+        "started_at": datetime.now().isoformat(),
+        "report": None
+    })
+    yield format_ndjson({"type": "crawl", "crawl_id": crawl_id, "url": url})
+    
+    analyzer = WebsiteAnalyzer(executor=get_parse_executor())
+    # Compression and protocol are much the same across a site, so crawled pages skip the transport audit
+    crawler = SiteCrawler(lambda page_url, page: analyze_url(analyzer, page_url, page=page),
+                          analyzer=analyzer, max_depth=max_depth, max_pages=max_pages, concurrency=CRAWL_CONCURRENCY,
+                          requests_per_second=CRAWL_REQUESTS_PER_SECOND, use_bloom_filter=max_pages > 1000)
+    report = SiteReport(url)
+    analysis_ids = []
+    finished = False
+    try:
+        async for item in crawler.crawl(url):
+            analysis_ids.append(save_job_item("crawl_id", crawl_id, item))
+            report.add(item)
+            result_store.update(crawl_id, progress=min(99, 100 * len(analysis_ids) // max_pages))
+            yield format_ndjson({"type": "page", "analysis_id": analysis_ids[-1], **item})
         
+        site_report = report.to_dict()
+        result_store.update(crawl_id, status="completed", progress=100, report=site_report,
+                            analysis_ids=analysis_ids, completed_at=datetime.now().isoformat())
+        finished = True
+        yield format_ndjson({"type": "site_report", "crawl_id": crawl_id, **site_report})
+    finally:
+        if not finished:
+            result_store.update(crawl_id, status="cancelled", report=report.to_dict(), analysis_ids=analysis_ids)
+
+def save_job_item(parent_key: str, parent_id: str, item: dict) -> str:
+    """Store one URL of a batch or crawl as its own analysis record, under the id it was analyzed as if any"""
+    analysis_id = item.get("analysis_id") or str(uuid.uuid4())
+    get_result_store().save(analysis_id, {
+        "id": analysis_id,
+        "url": item["url"],
+        parent_key: parent_id,
+        "status": item["status"],
+        "progress": 100,
+        "results": item.get("results"),
+        "error": item.get("error")
+    })
+    return analysis_id
+
+def format_ndjson(data):
+    """Format a payload as one NDJSON line"""
+    return json.dumps(data) + "\n"
+
+def create_job_worker() -> JobWorker:
+    """Build a worker that runs queued analyses, for the API process or worker.py"""
+    return JobWorker(get_job_queue(), {ANALYSIS_JOB: run_analysis_job}, concurrency=MAX_CONCURRENT_ANALYSES,
+                     on_failed=fail_analysis_job, on_released=requeue_analysis_job)
+
+async def run_analysis_job(job: Job):
+    """Run one attempt of a queued analysis"""
+    payload = job.payload
+    await run_analysis(payload["analysis_id"], payload["url"], payload["options"], final_attempt=job.final_attempt)
+
+def fail_analysis_job(job: Job, error: str):
+    """Record an analysis whose job ran out of attempts, unless it already recorded its own failure"""
+    analysis_id = job.payload["analysis_id"]
+    record = get_analysis_result(analysis_id)
+    if record is not None and record.get("status") != "failed":
+        get_result_store().update(analysis_id, status="failed", error=error)
+
+def requeue_analysis_job(job: Job):
+    """Show an analysis handed back to the queue (e.g. on shutdown) as queued, not stuck analyzing"""
+    progress_bus.publish(job.payload["analysis_id"], status="queued", progress=0)
+
+async def run_analysis(analysis_id: str, url: str, options: dict, final_attempt: bool = True):
+    """Run the complete website analysis, within ANALYSIS_TIMEOUT
+    
+    Errors are re-raised for the job queue. Unless this is the final
+    attempt, the analysis goes back to "queued" instead of "failed".
+    """
+    try:
+        await asyncio.wait_for(execute_analysis(analysis_id, url, options), ANALYSIS_TIMEOUT)
     except Exception as e:
-        result = get_analysis_result(analysis_id)
-        if result:
-            result["status"] = "failed"
-            result["error"] = str(e)
-            save_analysis_result(analysis_id, result)
-        print(f"Analysis failed for {analysis_id}: {e}")
+        error = f"Analysis timed out after {ANALYSIS_TIMEOUT:g}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+        if final_attempt:
+            progress_bus.publish(analysis_id, status="failed", error=error)
+            print(f"Analysis failed for {analysis_id}: {error}")
+        else:
+            # Hand the job back to the queue; any worker may pick up the retry
+            progress_bus.publish(analysis_id, status="queued", progress=0, error=error)
+        raise
+
+async def execute_analysis(analysis_id: str, url: str, options: dict):
+    """Analyze a URL, publishing progress, and store the results
+    
+    Identical requests (same normalized URL and options) already running in
+    this process are joined rather than repeated: the analysis mirrors the
+    running one's progress and completes with its results. Should the one
+    it follows be cancelled (e.g. it timed out), it runs the analysis itself.
+    """
+    # Progress goes to subscribers in memory; the bus persists the final state and, unwatched, coarse progress
+    progress_bus.publish(analysis_id, status="analyzing", progress=10, error=None)
+    
+    leader_id = running_analyses.owner(cache_key(url, options))
+    mirror = None
+    if leader_id not in (None, analysis_id):
+        mirror = asyncio.ensure_future(mirror_progress(analysis_id, leader_id))
+    
+    try:
+        outcome = await coalesce_analysis(analysis_id, url, options)
+    finally:
+        if mirror is not None:
+            mirror.cancel()
+    progress_bus.publish(analysis_id, status="completed", progress=100, **outcome)
+
+async def coalesce_analysis(analysis_id: str, url: str, options: dict, publish_progress: bool = True) -> dict:
+    """Completed fields of an analysis, joining an identical one already running in this process"""
+    key = cache_key(url, options)
+    
+    async def produce():
+        return analysis_id, await produce_analysis(analysis_id, url, key, options, publish_progress=publish_progress)
+    
+    producer_id, outcome = await running_analyses.do(key, produce, owner=analysis_id)
+    if producer_id != analysis_id:
+        outcome = {**outcome, "coalesced_with": producer_id}
+    return outcome
+
+async def mirror_progress(analysis_id: str, leader_id: str):
+    """Copy the progress of a running identical analysis onto one waiting for its results"""
+    async for state in progress_bus.subscribe(leader_id, relay=True):
+        if state.get("status") == "analyzing":
+            progress_bus.publish(analysis_id, progress=state.get("progress", 0))
+
+async def produce_analysis(analysis_id: str, url: str, key: str, options: dict, publish_progress: bool = True) -> dict:
+    """Run the analysis for a URL, returning the fields of its completed state
+    
+    Progress goes to the progress bus unless publish_progress is off, as for
+    batch items, which report only once finished.
+    """
+    def publish(**fields):
+        if publish_progress:
+            progress_bus.publish(analysis_id, **fields)
+    
+    # Initialize analyzer
+    analyzer = WebsiteAnalyzer(executor=get_parse_executor())
+    
+    # Serve a cached analysis when it is fresh or the origin confirms the page is unchanged
+    cached = result_cache.get(key)
+    if cached:
+        if result_cache.is_fresh(cached) or await analyzer.is_unchanged(url, cached.etag, cached.last_modified):
+            result_cache.refresh(cached)
+            return {"results": cached.results, "cached": True}
+    
+    publish(progress=20)
+    
+    # Categories may finish in any order, so progress follows the completed count
+    def report_progress(category, completed):
+        publish(progress=20 + 70 * completed // len(CATEGORIES))
+    
+    analysis_results_data = await analyze_url(analyzer, url, on_progress=report_progress,
+                                              audit_transport=bool(options.get("transport_audit")))
+    
+    publish(results=analysis_results_data, progress=95)
+    
+    # Don't cache partial analyses so failed checks are retried next time
+    if not any("error" in analysis_results_data[category] for category in CATEGORIES):
+        result_cache.put(key, analysis_results_data)
+    # Cached and coalesced analyses reuse this run, so only fresh runs enter the history
+    record_history(analysis_id, analysis_results_data)
+    return {"results": analysis_results_data}
+
+def record_history(analysis_id: str, results: dict):
+    """Append a finished analysis to its URL's history, without failing the analysis if that fails"""
+    try:
+        get_history_store().record(results["url"], analysis_id, results)
+    except Exception as e:
+        print(f"Recording history failed for {analysis_id}: {e}")
+
+async def analyze_url(analyzer: WebsiteAnalyzer, url: str, on_progress=None, page=None,
+                      audit_transport: bool = False) -> dict:
+    """Analyze every category of a URL and compile the result document
+    
+    The transport audit, only run when asked for since it requests the page
+    several more times, is reported alongside the categories but does not
+    count towards the overall score.
+    """
+    # Fetch and parse the page once (unless already fetched), then run every category against it
+    if audit_transport:
+        category_results, transport_data = await asyncio.gather(
+            analyzer.analyze_all(url, on_progress=on_progress, page=page),
+            analyzer.analyze_transport(url)
+        )
+    else:
+        category_results = await analyzer.analyze_all(url, on_progress=on_progress, page=page)
+        transport_data = None
+    performance_data = category_results["performance"]
+    accessibility_data = category_results["accessibility"]
+    seo_data = category_results["seo"]
+    security_data = category_results["security"]
+    content_data = category_results["content"]
+    
+    return {
+        "url": url,
+        "analyzed_at": datetime.now().isoformat(),
+        "performance": performance_data,
+        "accessibility": accessibility_data,
+        "seo": seo_data,
+        "security": security_data,
+        "content": content_data,
+        "transport": transport_data,
+        "overall_score": calculate_overall_score(performance_data, accessibility_data, seo_data, security_data, content_data)
+    }
 
 def calculate_overall_score(performance, accessibility, seo, security, content):
     """Calculate overall website score"""
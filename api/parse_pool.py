@@ -0,0 +1,28 @@
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+# "process" (default), "thread" or "none" to parse on the event loop
+PARSE_EXECUTOR = os.environ.get('PARSE_EXECUTOR', 'process')
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', os.cpu_count() or 1))
+
+_executor: Optional[Executor] = None
+
+def get_parse_executor() -> Optional[Executor]:
+    """Get the process-wide executor for HTML parsing and document checks"""
+    global _executor
+    if _executor is None:
+        if PARSE_EXECUTOR == 'process':
+            _executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        elif PARSE_EXECUTOR == 'thread':
+            _executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix='parse')
+        elif PARSE_EXECUTOR != 'none':
+            raise ValueError(f"Unknown parse executor: {PARSE_EXECUTOR}")
+    return _executor
+
+def shutdown_parse_executor():
+    """Stop the parse workers"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+TERMINAL_STATUSES = ('completed', 'failed', 'skipped', 'cancelled')
+
+# Statuses where the job leaves this process for now, e.g. back to the queue for a retry
+HANDOFF_STATUSES = ('queued',)
+
+class ProgressBus:
+    """In-process channel for live analysis status
+    
+    Publishers merge fields into the latest state of an analysis and
+    subscribers always receive the newest snapshot, so bursts of updates
+    are coalesced for slow readers. Terminal and handoff states are handed
+    to the persist callback; a handoff state is dropped right away, since
+    the job may continue in another process. While nobody in this process
+    is subscribed, e.g. when the job runs in a separate worker, status and
+    progress are persisted too, whenever the status changes or progress
+    moves by progress_step, so readers of the store can follow along.
+    """
+    
+    def __init__(self, persist: Optional[Callable[[str, Dict[str, Any]], None]] = None, retention: float = 300,
+                 progress_step: int = 10):
+        self.persist = persist
+        self.retention = retention
+        self.progress_step = progress_step
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._versions: Dict[str, int] = {}
+        # Versions come from one counter so they never repeat after a state is forgotten
+        self._version = 0
+        self._events: Dict[str, asyncio.Event] = {}
+        self._subscribers: Dict[str, int] = {}
+        # Last status and progress handed to persist for running analyses
+        self._persisted: Dict[str, Tuple[Any, int]] = {}
+    
+    def publish(self, analysis_id: str, **fields):
+        """Merge fields into the live state and wake subscribers"""
+        state = self._states.setdefault(analysis_id, {})
+        state.update(fields)
+        self._version += 1
+        self._versions[analysis_id] = self._version
+        
+        event = self._events.pop(analysis_id, None)
+        if event:
+            event.set()
+        
+        if state.get("status") in TERMINAL_STATUSES + HANDOFF_STATUSES:
+            self._persisted.pop(analysis_id, None)
+            if self.persist:
+                self.persist(analysis_id, dict(state))
+            if state["status"] in HANDOFF_STATUSES:
+                # The stored record is authoritative until a worker picks the job up again
+                self._forget(analysis_id)
+            else:
+                # Keep the final state around briefly for late subscribers
+                asyncio.get_running_loop().call_later(self.retention, self._forget, analysis_id)
+        elif self.persist and not self._subscribers.get(analysis_id):
+            self._persist_progress(analysis_id, state)
+    
+    def _persist_progress(self, analysis_id: str, state: Dict[str, Any]):
+        """Persist status and progress of a running analysis when they moved far enough"""
+        status, progress = state.get("status"), state.get("progress") or 0
+        last = self._persisted.get(analysis_id)
+        if status is None or (last is not None and last[0] == status and progress - last[1] < self.progress_step):
+            return
+        self._persisted[analysis_id] = (status, progress)
+        # Never the bulky fields (results), which only the final state writes
+        self.persist(analysis_id, {key: state[key] for key in ('status', 'progress', 'error') if key in state})
+    
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Get a copy of the live state, or None if nothing was published"""
+        state = self._states.get(analysis_id)
+        return dict(state) if state is not None else None
+    
+    async def subscribe(self, analysis_id: str, heartbeat: Optional[float] = None,
+                        relay: bool = False) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the latest state whenever it changes, until a terminal status
+        
+        When heartbeat is set, None is yielded after that many idle seconds
+        so callers can keep the connection alive. A relay subscription only
+        passes the state on inside this process, so it does not count as
+        someone following the analysis here.
+        """
+        if not relay:
+            self._subscribers[analysis_id] = self._subscribers.get(analysis_id, 0) + 1
+        try:
+            async for state in self._changes(analysis_id, heartbeat):
+                yield state
+        finally:
+            if not relay:
+                self._subscribers[analysis_id] -= 1
+                if not self._subscribers[analysis_id]:
+                    del self._subscribers[analysis_id]
+    
+    async def _changes(self, analysis_id: str, heartbeat: Optional[float]) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        seen = 0
+        while True:
+            version = self._versions.get(analysis_id, 0)
+            if version != seen and analysis_id in self._states:
+                seen = version
+                state = dict(self._states[analysis_id])
+                yield state
+                if state.get("status") in TERMINAL_STATUSES:
+                    return
+                continue
+            
+            event = self._events.setdefault(analysis_id, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+    
+    def _forget(self, analysis_id: str):
+        if self._states.get(analysis_id, {}).get("status") in TERMINAL_STATUSES + HANDOFF_STATUSES:
+            self._states.pop(analysis_id, None)
+            self._versions.pop(analysis_id, None)
+            self._persisted.pop(analysis_id, None)
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator, List, Optional
+from urllib.parse import urlsplit
+
+# Per-host request rate and burst, overridable through the environment
+HOST_REQUESTS_PER_SECOND = float(os.environ.get('HOST_REQUESTS_PER_SECOND', 5))
+HOST_BURST = int(os.environ.get('HOST_BURST', 10))
+# Longest a host is paused after a 429/503
+HOST_BACKOFF_MAX = float(os.environ.get('HOST_BACKOFF_MAX', 300))
+
+# Responses that mean the host wants us to slow down
+THROTTLE_STATUSES = (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+class HostBucket:
+    """Token bucket and backoff state for one host"""
+    
+    def __init__(self, rate: float, burst: int):
+        self.base_rate = rate
+        self.base_burst = burst
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+        # Temporary rate caps, e.g. one per crawl of this host
+        self.caps: List[float] = []
+    
+    def refill(self, now: float):
+        """Credit tokens earned since the last update at the current rate"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def apply_caps(self):
+        self.refill(time.monotonic())
+        self.max_rate = min([self.base_rate] + self.caps)
+        self.rate = min(self.rate, self.max_rate)
+        # Capped hosts get evenly spaced requests rather than bursts
+        self.burst = 1 if self.caps else self.base_burst
+        self.tokens = min(self.tokens, self.burst)
+    
+    def reserve(self, now: float) -> float:
+        """Take a token, returning how long to wait before using it"""
+        self.refill(now)
+        self.tokens -= 1
+        # A negative balance is a queue of reservations, served in order
+        wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(wait, self.blocked_until - now)
+    
+    def refund(self, now: float):
+        """Give back a reserved token that will not be used"""
+        self.refill(now)
+        self.tokens = min(self.burst, self.tokens + 1)
+
+class HostRateLimiter:
+    """Shared per-host politeness for every outbound request
+    
+    Each host gets a token bucket refilled at requests_per_second. A 429
+    or 503 pauses the host until its Retry-After (or an exponential
+    backoff) and halves its rate; each successful response then adds back
+    a tenth of the normal rate, so throughput recovers gradually.
+    
+    State lives in this process only; with WORKER_PROCESSES workers and the
+    API all fetching, a host can see that many times requests_per_second.
+    """
+    
+    def __init__(self, requests_per_second: float = HOST_REQUESTS_PER_SECOND, burst: int = HOST_BURST,
+                 max_backoff: float = HOST_BACKOFF_MAX, max_hosts: int = 10000):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_backoff = max_backoff
+        self.max_hosts = max_hosts
+        self._buckets: "OrderedDict[str, HostBucket]" = OrderedDict()
+    
+    def _bucket(self, url: str) -> HostBucket:
+        host = urlsplit(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = HostBucket(self.requests_per_second, self.burst)
+            if len(self._buckets) > self.max_hosts:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(host)
+        return bucket
+    
+    async def acquire(self, url: str):
+        """Wait until a request to the URL's host is allowed"""
+        bucket = self._bucket(url)
+        wait = bucket.reserve(time.monotonic())
+        acquired = False
+        try:
+            while wait > 0:
+                await asyncio.sleep(wait)
+                # The host may have pushed back while we were waiting
+                wait = bucket.blocked_until - time.monotonic()
+            acquired = True
+        finally:
+            # A cancelled waiter (e.g. its analysis timed out) must not use up the host's rate
+            if not acquired:
+                bucket.refund(time.monotonic())
+    
+    def record(self, url: str, status: int, retry_after: Optional[str] = None) -> float:
+        """Adapt the host's rate to a response; returns the pause imposed, 0 if none"""
+        bucket = self._bucket(url)
+        now = time.monotonic()
+        bucket.refill(now)
+        if status not in THROTTLE_STATUSES:
+            bucket.strikes = 0
+            bucket.rate = min(bucket.max_rate, bucket.rate + bucket.max_rate / 10)
+            return 0.0
+        
+        bucket.strikes += 1
+        delay = parse_retry_after(retry_after)
+        if delay is None:
+            delay = 2.0 ** (bucket.strikes - 1)
+        delay = min(delay, self.max_backoff)
+        bucket.blocked_until = max(bucket.blocked_until, now + delay)
+        bucket.rate = max(bucket.max_rate / 64, bucket.rate / 2)
+        return delay
+    
+    @contextmanager
+    def limited(self, url: str, requests_per_second: float) -> Iterator[None]:
+        """Cap a host's rate while the block runs, e.g. for a crawl's limit or a robots.txt Crawl-delay"""
+        bucket = self._bucket(url)
+        bucket.caps.append(requests_per_second)
+        bucket.apply_caps()
+        try:
+            yield
+        finally:
+            bucket.caps.remove(requests_per_second)
+            bucket.apply_caps()
+
+# Shared by every analysis, batch and crawl in the process
+host_limiter = HostRateLimiter()
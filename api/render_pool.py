@@ -0,0 +1,197 @@
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from report_generator import PDFReportGenerator
+from result_store import get_result_store
+
+# "process" (default) or "thread" where worker processes are not available
+PDF_RENDER_EXECUTOR = os.environ.get('PDF_RENDER_EXECUTOR', 'process')
+PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 2))
+# Renders allowed to wait for a free worker before new ones are turned away
+PDF_RENDER_QUEUE_SIZE = int(os.environ.get('PDF_RENDER_QUEUE_SIZE', 50))
+# Longest a render may take, time spent waiting for a worker included
+PDF_RENDER_TIMEOUT = float(os.environ.get('PDF_RENDER_TIMEOUT', 60))
+# Extra time multi-site reports get for each site they cover
+PDF_RENDER_TIMEOUT_PER_SITE = float(os.environ.get('PDF_RENDER_TIMEOUT_PER_SITE', 0.5))
+
+class RenderQueueFull(RuntimeError):
+    """Too many renders are already waiting for a worker"""
+
+class RenderTimeout(RuntimeError):
+    """A render did not finish within the render timeout"""
+
+_generator: Optional[PDFReportGenerator] = None
+
+def render_report(analysis_data: Dict[str, Any], analysis_id: str) -> str:
+    """Lay out and write a PDF report in a render worker, reusing the worker's generator"""
+    global _generator
+    if _generator is None:
+        _generator = PDFReportGenerator()
+    return _generator.generate_report(analysis_data, analysis_id)
+
+def render_multi_site_report(analysis_ids: List[str], report_id: str, title: str) -> str:
+    """Lay out one PDF over many stored analyses in a render worker, reading them from the result store as it goes"""
+    global _generator
+    if _generator is None:
+        _generator = PDFReportGenerator()
+    result_store = get_result_store()
+    
+    def records():
+        for analysis_id in analysis_ids:
+            record = result_store.get(analysis_id)
+            if record is not None:
+                yield record
+    
+    return _generator.generate_multi_site_report(records, report_id, title)
+
+class RenderPool:
+    """Bounded pool of workers laying out PDF reports off the event loop
+    
+    At most `workers` renders run at once and at most `queue_size` wait
+    for a turn; beyond that render() fails fast with RenderQueueFull. A
+    render that runs past the timeout fails with RenderTimeout, but keeps
+    its worker slot until ReportLab actually finishes, so the pool never
+    runs more renders than it has workers.
+    """
+    
+    def __init__(self, workers: int = PDF_RENDER_WORKERS, queue_size: int = PDF_RENDER_QUEUE_SIZE,
+                 timeout: float = PDF_RENDER_TIMEOUT, executor_type: str = PDF_RENDER_EXECUTOR,
+                 latency_window: int = 200):
+        if executor_type not in ('process', 'thread'):
+            raise ValueError(f"Unknown PDF render executor: {executor_type}")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.executor_type = executor_type
+        self._executor: Optional[Executor] = None
+        self._slots = asyncio.Semaphore(workers)
+        self.queued = 0
+        self.rendering = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        # Recent render and queue wait times in seconds, for the percentiles in stats()
+        self._render_times = deque(maxlen=latency_window)
+        self._wait_times = deque(maxlen=latency_window)
+    
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='render')
+        return self._executor
+    
+    async def render(self, analysis_data: Dict[str, Any], analysis_id: str) -> str:
+        """Render a report in the pool and return the path of the written PDF"""
+        return await self._submit(self.timeout, render_report, analysis_data, analysis_id)
+    
+    async def render_multi_site(self, analysis_ids: List[str], report_id: str, title: str) -> str:
+        """Render one report over many stored analyses in the pool and return its path"""
+        timeout = self.timeout + PDF_RENDER_TIMEOUT_PER_SITE * len(analysis_ids)
+        return await self._submit(timeout, render_multi_site_report, analysis_ids, report_id, title)
+    
+    async def _submit(self, timeout: float, render: Callable[..., str], *args) -> str:
+        """Run a render function in a worker once a slot is free, within the timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        enqueued = time.monotonic()
+        if not self._slots.locked():
+            # A worker is free, so this takes its slot without waiting
+            await self._slots.acquire()
+        else:
+            if self.queued >= self.queue_size:
+                self.rejected += 1
+                raise RenderQueueFull(f"{self.queued} PDF renders are already waiting")
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise RenderTimeout(f"PDF render waited {timeout:g}s for a free worker")
+            finally:
+                self.queued -= 1
+        
+        started = time.monotonic()
+        self._wait_times.append(started - enqueued)
+        self.rendering += 1
+        try:
+            future = loop.run_in_executor(self._get_executor(), render, *args)
+        except BaseException:
+            self._release(None, started)
+            raise
+        future.add_done_callback(lambda done: self._release(done, started))
+        
+        try:
+            # Shielded so a timeout or cancellation leaves the render (and its slot) to finish on its own
+            path = await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise RenderTimeout(f"PDF render timed out after {timeout:g}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        self.completed += 1
+        return path
+    
+    def _release(self, future: Optional[asyncio.Future], started: float):
+        """Free a worker slot once its render has really ended"""
+        self.rendering -= 1
+        self._slots.release()
+        self._render_times.append(time.monotonic() - started)
+        if future is not None and not future.cancelled():
+            # Retrieved so renders nobody waited for do not warn about their errors
+            future.exception()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, queue depth, outcome counts and recent latency percentiles in milliseconds"""
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self.queued,
+            "rendering": self.rendering,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "render_ms": _percentiles(self._render_times),
+            "queue_wait_ms": _percentiles(self._wait_times)
+        }
+    
+    def shutdown(self):
+        """Stop the render workers, dropping renders that have not started"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def _percentiles(samples) -> Optional[Dict[str, float]]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    def at(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 1)
+    return {"p50": at(0.5), "p95": at(0.95), "max": at(1.0)}
+
+_render_pool: Optional[RenderPool] = None
+
+def get_render_pool() -> RenderPool:
+    """Get the process-wide PDF render pool"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = RenderPool()
+    return _render_pool
+
+def shutdown_render_pool():
+    """Stop the render workers"""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown()
+        _render_pool = None
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from render_pool import get_render_pool
+from single_flight import SingleFlight
+
+# Where rendered reports are kept; the report generator writes into reports/
+REPORT_CACHE_DIR = 'reports'
+# Total size of cached reports (bytes) and longest a report is kept unused (seconds)
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+REPORT_CACHE_MAX_AGE = float(os.environ.get('REPORT_CACHE_MAX_AGE', 7 * 86400))
+
+def report_digest(results: Dict[str, Any]) -> str:
+    """Content hash of an analysis result document, the name of its cached report"""
+    canonical = json.dumps(results, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class ReportCache:
+    """PDF reports rendered on first download and kept by content hash
+    
+    Identical result documents (e.g. a cached or coalesced analysis) share
+    one file, and concurrent downloads of a report that is not rendered yet
+    wait on a single render. Files are written under a temporary name and
+    renamed into place, so other processes never serve a partial PDF.
+    Reading a report refreshes its modification time, which evict() uses
+    for both the age limit and least-recently-used size trimming.
+    """
+    
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES,
+                 max_age: float = REPORT_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Renders run to completion and are cached even if every download waiting on them gives up
+        self._renders = SingleFlight(cancel_abandoned=False)
+    
+    def path_for(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.pdf")
+    
+    def lookup(self, digest: str) -> Optional[str]:
+        """Path of an already rendered report, marking it recently used"""
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+    
+    async def get(self, results: Dict[str, Any]) -> str:
+        """Path of the report for a result document, rendering it if needed"""
+        return await self._get(report_digest(results), lambda name: get_render_pool().render(results, name))
+    
+    async def get_multi_site(self, source: Dict[str, Any], title: str) -> str:
+        """Path of the combined report for a finished batch or crawl record, rendering it if needed"""
+        return await self._get(report_digest(source),
+                               lambda name: get_render_pool().render_multi_site(source["analysis_ids"], name, title))
+    
+    async def _get(self, digest: str, render: Callable[[str], Awaitable[str]]) -> str:
+        path = self.lookup(digest)
+        if path is not None:
+            return path
+        
+        return await self._renders.do(digest, lambda: self._render(digest, render))
+    
+    async def _render(self, digest: str, render: Callable[[str], Awaitable[str]]) -> str:
+        # Hidden until complete, so evict() leaves it alone and nothing serves it half-written
+        temporary = f".{digest}-{uuid.uuid4().hex}"
+        rendered = await render(temporary)
+        path = self.path_for(digest)
+        os.replace(rendered, path)
+        self.evict()
+        return path
+    
+    def evict(self) -> int:
+        """Delete reports unused for max_age, then the least recently used until under max_bytes"""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        
+        cutoff = time.time() - self.max_age
+        reports = []
+        for name in names:
+            if not name.endswith('.pdf'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.startswith('.'):
+                # Renders in progress; only leftovers of crashed renders are old enough to go
+                if stat.st_mtime < cutoff:
+                    reports.append((stat.st_mtime, 0, path))
+                continue
+            reports.append((stat.st_mtime, stat.st_size, path))
+        
+        removed = 0
+        total = sum(size for _, size, _ in reports)
+        for mtime, size, path in sorted(reports):
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,172 @@
+import csv
+import html
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from history import extract_issues
+from scoring import CATEGORIES, grade_for
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+class ReportRenderer:
+    """Interface for a text report format, rendered as a stream of chunks
+    
+    `source` is the stored record the report is about (an analysis, batch
+    or crawl) and `records` the analysis records it covers, which may be a
+    lazy iterator over thousands of stored items: renderers consume it one
+    record at a time and never hold the whole report in memory.
+    """
+    
+    media_type = 'text/plain'
+    extension = 'txt'
+    
+    def render(self, source: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        raise NotImplementedError
+
+class JSONRenderer(ReportRenderer):
+    """The source's summary (batch aggregate or crawl site report) and every analysis in full"""
+    
+    media_type = 'application/json'
+    extension = 'json'
+    
+    def render(self, source: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        header = {
+            "id": source.get("id"),
+            "type": source.get("type", "analysis"),
+            "summary": source.get("summary") or source.get("report")
+        }
+        # Emit the header object without its closing brace, then the analyses array item by item
+        yield json.dumps(header)[:-1] + ', "analyses": ['
+        for index, record in enumerate(records):
+            yield (", " if index else "") + json.dumps(_analysis_entry(record))
+        yield "]}\n"
+
+class CSVRenderer(ReportRenderer):
+    """One row per analysis: overall and category scores, issue count and error"""
+    
+    media_type = 'text/csv'
+    extension = 'csv'
+    
+    def render(self, source: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        yield _csv_row(['analysis_id', 'url', 'status', 'overall_score', *CATEGORIES, 'issues', 'error'])
+        for record in records:
+            results = record.get("results") or {}
+            scores = [(results.get(category) or {}).get("score") for category in CATEGORIES]
+            yield _csv_row([record.get("id"), record.get("url"), record.get("status"), results.get("overall_score"),
+                            *scores, len(extract_issues(results)) if results else None, record.get("error")])
+
+class HTMLRenderer(ReportRenderer):
+    """Compact self-contained HTML page: score table, issues and recommendations per analysis"""
+    
+    media_type = 'text/html'
+    extension = 'html'
+    
+    STYLE = ("body{font-family:sans-serif;max-width:960px;margin:auto;color:#222}"
+             "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:2px 8px;text-align:center}"
+             ".issue{color:#b00}.recommendation{color:#036}")
+    
+    def render(self, source: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        title = f"Website Analysis Report - {source.get('url') or source.get('id')}"
+        yield (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>"
+               f"<style>{self.STYLE}</style></head><body><h1>{html.escape(title)}</h1>\n")
+        for record in records:
+            yield self._section(record)
+        yield "</body></html>\n"
+    
+    def _section(self, record: Dict[str, Any]) -> str:
+        url = html.escape(record.get("url") or "")
+        parts = [f"<section><h2><a href=\"{url}\">{url}</a></h2>"]
+        results = record.get("results")
+        if not results:
+            parts.append(f"<p>Status: {html.escape(str(record.get('status')))}"
+                         f"{' - ' + html.escape(record['error']) if record.get('error') else ''}</p></section>\n")
+            return "".join(parts)
+        
+        overall = results.get("overall_score", 0)
+        parts.append(f"<p><b>Overall Score:</b> {overall}/100 ({grade_for(overall)})</p>")
+        parts.append("<table><tr>" + "".join(f"<th>{category.title()}</th>" for category in CATEGORIES) + "</tr><tr>")
+        parts.append("".join(f"<td>{(results.get(category) or {}).get('score', '-')}</td>" for category in CATEGORIES))
+        parts.append("</tr></table>")
+        for label, css_class, items in (("Issues", "issue", extract_issues(results)),
+                                        ("Recommendations", "recommendation", _recommendations(results))):
+            if items:
+                parts.append(f"<h3>{label}</h3><ul class=\"{css_class}\">")
+                parts.extend(f"<li>{html.escape(item)}</li>" for item in items)
+                parts.append("</ul>")
+        parts.append("</section>\n")
+        return "".join(parts)
+
+class SARIFRenderer(ReportRenderer):
+    """SARIF 2.1.0 log with one result per issue, located at the analyzed URL
+    
+    Rules are the analysis categories. Issues are errors when their
+    category scored below 50 and warnings otherwise; analyses that failed
+    become tool execution notifications.
+    """
+    
+    media_type = 'application/sarif+json'
+    extension = 'sarif'
+    
+    def render(self, source: Dict[str, Any], records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+        driver = {
+            "name": "Website Analyzer",
+            "rules": [{"id": category, "name": category.title()} for category in CATEGORIES]
+        }
+        yield (f'{{"$schema": "{SARIF_SCHEMA}", "version": "2.1.0", "runs": [{{'
+               f'"tool": {json.dumps({"driver": driver})}, "results": [')
+        failures = []
+        first = True
+        for record in records:
+            results = record.get("results")
+            if not results:
+                if record.get("error"):
+                    failures.append({"level": "error", "message": {"text": f"{record.get('url')}: {record['error']}"}})
+                continue
+            location = [{"physicalLocation": {"artifactLocation": {"uri": record.get("url")}}}]
+            for category in CATEGORIES:
+                data = results.get(category) or {}
+                level = "error" if data.get("score", 100) < 50 else "warning"
+                for issue in data.get("issues", []):
+                    yield ("" if first else ", ") + json.dumps({
+                        "ruleId": category,
+                        "level": level,
+                        "message": {"text": issue},
+                        "locations": location
+                    })
+                    first = False
+        invocation = {"executionSuccessful": not failures, "toolExecutionNotifications": failures}
+        yield f'], "invocations": [{json.dumps(invocation)}]}}]}}\n'
+
+# Streaming formats by name; PDF reports are rendered separately (see report_cache)
+RENDERERS: Dict[str, ReportRenderer] = {
+    'json': JSONRenderer(),
+    'csv': CSVRenderer(),
+    'html': HTMLRenderer(),
+    'sarif': SARIFRenderer()
+}
+
+def get_renderer(name: str) -> ReportRenderer:
+    """Get the renderer for a report format"""
+    renderer = RENDERERS.get(name)
+    if renderer is None:
+        raise ValueError(f"Unknown report format: {name}")
+    return renderer
+
+def _analysis_entry(record: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "analysis_id": record.get("id"),
+        "url": record.get("url"),
+        "status": record.get("status"),
+        "error": record.get("error"),
+        "results": record.get("results")
+    }
+
+def _recommendations(results: Dict[str, Any]) -> List[str]:
+    return [f"[{category.upper()}] {recommendation}"
+            for category in CATEGORIES for recommendation in (results.get(category) or {}).get("recommendations", [])]
+
+def _csv_row(values: List[Optional[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(values)
+    return buffer.getvalue()
@@ -1,73 +1,355 @@
 import os
+from html import escape
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle, StyleSheet1
 from reportlab.lib.units import inch
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from datetime import datetime
-from typing import Dict, Any
-import asyncio
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
 
-class PDFReportGenerator:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-        
-        # Create reports directory if it doesn't exist
-        os.makedirs("reports", exist_ok=True)
+from scoring import GRADES, ScoreAggregate
+
+def _build_styles() -> StyleSheet1:
+    """Sample stylesheet plus the report's custom paragraph styles"""
+    styles = getSampleStyleSheet()
+    
+    # Title style
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    ))
+    
+    # Section header style
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        spaceAfter=12,
+        spaceBefore=20,
+        textColor=colors.darkblue
+    ))
+    
+    # Score style
+    styles.add(ParagraphStyle(
+        name='Score',
+        parent=styles['Normal'],
+        fontSize=14,
+        alignment=TA_CENTER,
+        textColor=colors.darkgreen
+    ))
+    
+    # Issue style
+    styles.add(ParagraphStyle(
+        name='Issue',
+        parent=styles['Normal'],
+        fontSize=10,
+        leftIndent=20,
+        textColor=colors.red
+    ))
+    
+    # Recommendation style
+    styles.add(ParagraphStyle(
+        name='Recommendation',
+        parent=styles['Normal'],
+        fontSize=10,
+        leftIndent=20,
+        textColor=colors.blue
+    ))
+    return styles
+
+# Styles are only read while laying out, so one set serves every report in the process
+STYLES = _build_styles()
+
+# Check / value / status tables
+METRICS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Wider tables of measurements with a regular-size header
+DATA_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+# Long tables (request waterfall, site overview): small type, numbers right-aligned
+COMPACT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+])
+
+METRICS_COLUMN_WIDTHS = [2*inch, 1.5*inch, 1*inch]
+ENCODING_COLUMN_WIDTHS = [1.3*inch, 1*inch, 1.4*inch, 1.4*inch, 0.8*inch]
+WATERFALL_COLUMN_WIDTHS = [2.1*inch, 0.75*inch, 0.5*inch, 0.45*inch, 0.6*inch, 0.5*inch, 0.7*inch, 0.65*inch]
+OVERVIEW_COLUMN_WIDTHS = [0.4*inch, 2.2*inch, 0.6*inch] + [0.61*inch] * 5
+
+# Sites per overview table in multi-site reports; each chunk is laid out and freed before the next is read
+SITE_OVERVIEW_ROWS = 40
+
+class LazyStory(list):
+    """Story list that pulls flowables from an iterator as ReportLab lays them out
+    
+    doc.build() consumes its story from the front, checking its length
+    before each flowable and looking only a few flowables ahead (for
+    keepWithNext), so topping the list up to `window` items on every
+    length check keeps just that window in memory.
+    """
     
-    def _setup_custom_styles(self):
-        """Setup custom styles for the PDF report"""
-        # Title style
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        ))
+    def __init__(self, flowables: Iterable, window: int = 64):
+        super().__init__()
+        self._source = iter(flowables)
+        self._window = window
+    
+    def __len__(self):
+        size = super().__len__()
+        while size < self._window:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+            size += 1
+        return size
+
+class ReportSection:
+    """Declarative layout of one category of the result document
+    
+    A section is its header, then the score line when score_label is set,
+    then whatever each of `blocks` returns for the category's data (tables,
+    metric lines), then its issues and recommendations under the given
+    labels; a label of None leaves that list out. short_label heads the
+    category's column in multi-site overview tables.
+    """
+    
+    def __init__(self, key: str, title: str, score_label: Optional[str] = None,
+                 blocks: Sequence[Callable[[Dict[str, Any]], list]] = (),
+                 issues_label: Optional[str] = "Issues Found", recommendations_label: str = "Recommendations",
+                 short_label: Optional[str] = None):
+        self.key = key
+        self.title = title
+        self.score_label = score_label
+        self.blocks = blocks
+        self.issues_label = issues_label
+        self.recommendations_label = recommendations_label
+        self.short_label = short_label or score_label
+    
+    def build(self, data: Dict[str, Any]) -> list:
+        """Flowables for this section, header and trailing space included"""
+        elements = [Paragraph(self.title, STYLES['SectionHeader'])]
         
-        # Section header style
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            spaceAfter=12,
-            spaceBefore=20,
-            textColor=colors.darkblue
-        ))
+        if self.score_label:
+            score = data.get('score', 0)
+            elements.append(Paragraph(f"<b>{self.score_label} Score: {score}/100</b>", STYLES['Score']))
+            elements.append(Spacer(1, 10))
         
-        # Score style
-        self.styles.add(ParagraphStyle(
-            name='Score',
-            parent=self.styles['Normal'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            textColor=colors.darkgreen
-        ))
+        for block in self.blocks:
+            elements.extend(block(data))
         
-        # Issue style
-        self.styles.add(ParagraphStyle(
-            name='Issue',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            leftIndent=20,
-            textColor=colors.red
-        ))
+        issues = data.get('issues', []) if self.issues_label else []
+        if issues:
+            elements.append(Paragraph(f"<b>{self.issues_label}:</b>", STYLES['Normal']))
+            elements.extend(bullets(issues, 'Issue'))
+            elements.append(Spacer(1, 10))
+        
+        recommendations = data.get('recommendations', [])
+        if recommendations:
+            elements.append(Paragraph(f"<b>{self.recommendations_label}:</b>", STYLES['Normal']))
+            elements.extend(bullets(recommendations, 'Recommendation'))
+        
+        elements.append(Spacer(1, 20))
+        return elements
+
+def bullets(items: List[str], style: str) -> list:
+    """One paragraph per item; items are plain text, so markup-like text such as <head> is escaped"""
+    return [Paragraph(f"• {escape(item)}", STYLES[style]) for item in items]
+
+def data_table(rows: list, col_widths: list, style: TableStyle = METRICS_TABLE_STYLE) -> list:
+    """A table with one of the shared table styles, followed by a small gap"""
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(style)
+    return [table, Spacer(1, 10)]
+
+def status_indicator(value: float, threshold: float, unit: str, reverse: bool = False) -> str:
+    """Get status indicator for metrics"""
+    if unit == 's':  # seconds
+        if value <= threshold:
+            return "Good"
+        elif value <= threshold * 1.5:
+            return "Fair"
+        else:
+            return "Poor"
+    elif unit == 'bytes':
+        if value <= threshold:
+            return "Good"
+        elif value <= threshold * 2:
+            return "Fair"
+        else:
+            return "Poor"
+    elif unit == 'code':
+        if value == 200:
+            return "Good"
+        else:
+            return "Poor"
+    elif unit == 'count':
+        if reverse:
+            if value == 0:
+                return "Good"
+            elif value <= 3:
+                return "Fair"
+            else:
+                return "Poor"
+        else:
+            if value <= threshold:
+                return "Good"
+            elif value <= threshold * 2:
+                return "Fair"
+            else:
+                return "Poor"
+    else:
+        return "Info"
+
+def performance_metrics(performance_data: Dict[str, Any]) -> list:
+    """Load time, size and request metrics table"""
+    metrics_data = [
+        ['Metric', 'Value', 'Status'],
+        ['Load Time', f"{performance_data.get('load_time', 0)}s", status_indicator(performance_data.get('load_time', 0), 2, 's')],
+        ['Page Size', f"{performance_data.get('page_size', 0):,} bytes", status_indicator(performance_data.get('page_size', 0), 500000, 'bytes')],
+        ['Status Code', str(performance_data.get('status_code', 0)), status_indicator(performance_data.get('status_code', 0), 200, 'code')],
+        ['Total Images', str(performance_data.get('total_images', 0)), 'Info'],
+        ['Unoptimized Images', str(performance_data.get('unoptimized_images', 0)), status_indicator(performance_data.get('unoptimized_images', 0), 0, 'count', reverse=True)]
+    ]
+    
+    # Image sizes only cover the images probed within the time budget
+    if performance_data.get('images_skipped'):
+        probed = performance_data['images_probed']
+        metrics_data.append(['Images Measured', f"{probed} of {probed + performance_data['images_skipped']}", 'Info'])
+    
+    # Waterfall aggregates, absent from analyses stored before they were measured
+    timing = performance_data.get('timing') or {}
+    if timing.get('ttfb') is not None:
+        metrics_data.append(['Time to First Byte', f"{timing['ttfb']}s", status_indicator(timing['ttfb'], 0.8, 's')])
+    resources = performance_data.get('resources')
+    if resources:
+        metrics_data.extend([
+            ['Fully Loaded', f"{resources['fully_loaded']}s", status_indicator(resources['fully_loaded'], 3, 's')],
+            ['Requests', str(resources['requests']), status_indicator(resources['requests'], 50, 'count')],
+            ['Total Page Weight', f"{resources['total_bytes']:,} bytes", status_indicator(resources['total_bytes'], 1500000, 'bytes')]
+        ])
+    
+    return data_table(metrics_data, METRICS_COLUMN_WIDTHS)
+
+def waterfall_table(performance_data: Dict[str, Any], max_rows: int = 15) -> list:
+    """Request waterfall table, phases in milliseconds"""
+    waterfall = performance_data.get('waterfall')
+    if not waterfall:
+        return []
+    
+    def ms(seconds):
+        return '-' if seconds is None else f"{seconds * 1000:.0f}"
+    
+    def short(url):
+        return url if len(url) <= 32 else '...' + url[-29:]
+    
+    rows = [['Resource', 'Type', 'Start', 'DNS', 'Connect', 'Wait', 'Download', 'Size']]
+    for row in waterfall[:max_rows]:
+        rows.append([short(row['url']), row['type'], ms(row['start']), ms(row['dns']), ms(row['connect']),
+                     ms(row['wait']), 'failed' if row['error'] else ms(row['download']),
+                     f"{row['transfer_size']:,}"])
+    
+    table = Table(rows, colWidths=WATERFALL_COLUMN_WIDTHS)
+    table.setStyle(COMPACT_TABLE_STYLE)
+    
+    elements = [Paragraph("<b>Request Waterfall (ms):</b>", STYLES['Normal']), Spacer(1, 5), table]
+    if len(waterfall) > max_rows:
+        elements.append(Paragraph(f"{len(waterfall) - max_rows} more requests not shown", STYLES['Normal']))
+    elements.append(Spacer(1, 10))
+    return elements
+
+def transport_tables(transport_data: Dict[str, Any]) -> list:
+    """Compression by Accept-Encoding and protocol checks tables"""
+    if transport_data.get('error'):
+        return [Paragraph(f"Audit could not be completed: {escape(transport_data['error'])}", STYLES['Issue'])]
+    
+    compression = transport_data['compression']
+    encoding_data = [['Accept-Encoding', 'Served As', 'Transferred', 'Decoded', 'Ratio']]
+    for coding, entry in compression['encodings'].items():
+        decoded = '-' if entry['content_size'] is None else f"{entry['content_size']:,} bytes"
+        ratio = '-' if entry['ratio'] is None else f"{entry['ratio']:.0%}"
+        encoding_data.append([coding, entry['content_encoding'], f"{entry['transfer_size']:,} bytes", decoded, ratio])
+    elements = data_table(encoding_data, ENCODING_COLUMN_WIDTHS, DATA_TABLE_STYLE)
+    
+    protocol = transport_data['protocol']
+    keep_alive = transport_data['keep_alive']
+    savings = compression['savings']
+    tls_status = {'TLSv1.3': 'Good', 'TLSv1.2': 'Fair'}.get(protocol['tls_version'], 'Poor' if protocol['tls_version'] else 'Info')
+    keep_alive_value = {True: 'Yes', False: 'No', None: 'Unknown'}[keep_alive['supported']]
+    protocol_data = [
+        ['Check', 'Result', 'Status'],
+        ['Best Compression', compression['best_encoding'] or 'None',
+         'Poor' if not compression['supported'] else ('Good' if compression['best_encoding'] in ('br', 'zstd') else 'Fair')],
+        ['Compression Savings', '-' if savings is None else f"{savings:.0%}", 'Info'],
+        ['Protocol', protocol['http_version'], 'Good' if protocol['http_version'] == 'HTTP/2' else 'Poor'],
+        ['TLS Version', protocol['tls_version'] or '-', tls_status],
+        ['HTTP/3 Advertised', 'Yes' if protocol['http3_advertised'] else 'No', 'Good' if protocol['http3_advertised'] else 'Info'],
+        ['Keep-Alive', keep_alive_value, {'Yes': 'Good', 'No': 'Poor'}.get(keep_alive_value, 'Info')]
+    ]
+    elements.extend(data_table(protocol_data, METRICS_COLUMN_WIDTHS))
+    
+    if protocol.get('error'):
+        elements.append(Paragraph(escape(protocol['error']), STYLES['Issue']))
+    return elements
+
+def word_count_line(content_data: Dict[str, Any]) -> list:
+    word_count = content_data.get('word_count', 0)
+    return [Paragraph(f"<b>Word Count:</b> {word_count:,} words", STYLES['Normal']), Spacer(1, 10)]
+
+# Report sections in order; a category is laid out when its data is present and non-empty
+SECTIONS = [
+    ReportSection('performance', "Performance Analysis", score_label="Performance",
+                  blocks=(performance_metrics, waterfall_table), issues_label=None, short_label="Perf."),
+    # Compression and protocol audit (informational, not scored)
+    ReportSection('transport', "Compression &amp; Protocol", blocks=(transport_tables,)),
+    ReportSection('accessibility', "Accessibility Analysis", score_label="Accessibility", short_label="Access."),
+    ReportSection('seo', "SEO Analysis", score_label="SEO"),
+    ReportSection('security', "Security Analysis", score_label="Security",
+                  issues_label="Security Issues", recommendations_label="Security Recommendations"),
+    ReportSection('content', "Content Analysis", score_label="Content", blocks=(word_count_line,),
+                  issues_label="Content Issues", recommendations_label="Content Recommendations")
+]
+
+# Categories that count towards the overall score, in report order
+SCORED_SECTIONS = [section for section in SECTIONS if section.score_label]
+SCORED_CATEGORIES = [section.key for section in SCORED_SECTIONS]
+
+class PDFReportGenerator:
+    def __init__(self):
+        self.styles = STYLES
         
-        # Recommendation style
-        self.styles.add(ParagraphStyle(
-            name='Recommendation',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            leftIndent=20,
-            textColor=colors.blue
-        ))
+        # Create reports directory if it doesn't exist
+        os.makedirs("reports", exist_ok=True)
     
-    async def generate_report(self, analysis_data: Dict[str, Any], analysis_id: str) -> str:
-        """Generate comprehensive PDF report"""
+    def generate_report(self, analysis_data: Dict[str, Any], analysis_id: str) -> str:
+        """Generate comprehensive PDF report; CPU-bound, so async callers go through render_pool"""
         filename = f"reports/{analysis_id}.pdf"
         doc = SimpleDocTemplate(filename, pagesize=A4)
         story = []
@@ -77,7 +359,7 @@ class PDFReportGenerator:
         story.append(Spacer(1, 20))
         
         # Basic info
-        story.append(Paragraph(f"<b>Website URL:</b> {analysis_data['url']}", self.styles['Normal']))
+        story.append(Paragraph(f"<b>Website URL:</b> {escape(analysis_data['url'])}", self.styles['Normal']))
         story.append(Paragraph(f"<b>Analysis Date:</b> {analysis_data['analyzed_at']}", self.styles['Normal']))
         story.append(Paragraph(f"<b>Overall Score:</b> {analysis_data['overall_score']}/100", self.styles['Score']))
         story.append(Spacer(1, 30))
@@ -88,46 +370,112 @@ class PDFReportGenerator:
         story.append(Paragraph(summary, self.styles['Normal']))
         story.append(Spacer(1, 20))
         
-        # Performance Analysis
-        if 'performance' in analysis_data and analysis_data['performance']:
-            story.append(Paragraph("Performance Analysis", self.styles['SectionHeader']))
-            story.extend(self._generate_performance_section(analysis_data['performance']))
-            story.append(Spacer(1, 20))
-        
-        # Accessibility Analysis
-        if 'accessibility' in analysis_data and analysis_data['accessibility']:
-            story.append(Paragraph("Accessibility Analysis", self.styles['SectionHeader']))
-            story.extend(self._generate_accessibility_section(analysis_data['accessibility']))
-            story.append(Spacer(1, 20))
-        
-        # SEO Analysis
-        if 'seo' in analysis_data and analysis_data['seo']:
-            story.append(Paragraph("SEO Analysis", self.styles['SectionHeader']))
-            story.extend(self._generate_seo_section(analysis_data['seo']))
-            story.append(Spacer(1, 20))
-        
-        # Security Analysis
-        if 'security' in analysis_data and analysis_data['security']:
-            story.append(Paragraph("Security Analysis", self.styles['SectionHeader']))
-            story.extend(self._generate_security_section(analysis_data['security']))
-            story.append(Spacer(1, 20))
-        
-        # Content Analysis
-        if 'content' in analysis_data and analysis_data['content']:
-            story.append(Paragraph("Content Analysis", self.styles['SectionHeader']))
-            story.extend(self._generate_content_section(analysis_data['content']))
-            story.append(Spacer(1, 20))
+        # One section per category present in the results
+        for section in SECTIONS:
+            if analysis_data.get(section.key):
+                story.extend(section.build(analysis_data[section.key]))
         
         # Recommendations Summary
         story.append(Paragraph("Priority Recommendations", self.styles['SectionHeader']))
         recommendations = self._generate_priority_recommendations(analysis_data)
-        for rec in recommendations:
-            story.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
+        story.extend(bullets(recommendations, 'Recommendation'))
         
         # Build PDF
         doc.build(story)
         return filename
     
+    def generate_multi_site_report(self, records: Callable[[], Iterable[Dict[str, Any]]], report_id: str,
+                                   title: str = "Multi-Site Analysis Report") -> str:
+        """Generate one PDF across many analyses in memory that does not grow with their number
+        
+        records() must return a fresh iterator of analysis records (url,
+        status, results, error) on each call. It is read three times: to
+        aggregate the summary, then for the overview tables and for the
+        per-site sections, which are laid out as they are read.
+        """
+        filename = f"reports/{report_id}.pdf"
+        doc = SimpleDocTemplate(filename, pagesize=A4)
+        
+        aggregate = ScoreAggregate()
+        for record in records():
+            aggregate.add(record.get("status"), record.get("results"))
+        
+        doc.build(LazyStory(self._multi_site_story(title, aggregate.to_dict(), records)))
+        return filename
+    
+    def _multi_site_story(self, title: str, summary: Dict[str, Any],
+                          records: Callable[[], Iterable[Dict[str, Any]]]) -> Iterator:
+        """Flowables of a multi-site report: summary, overview tables, then a section per site"""
+        yield Paragraph(escape(title), self.styles['CustomTitle'])
+        yield Spacer(1, 20)
+        yield Paragraph(f"<b>Sites:</b> {summary['total']}", self.styles['Normal'])
+        yield Paragraph(f"<b>Report Date:</b> {datetime.now().isoformat(timespec='seconds')}", self.styles['Normal'])
+        if summary['average_score'] is not None:
+            yield Paragraph(f"<b>Average Score:</b> {summary['average_score']}/100 "
+                            f"(lowest {summary['min_score']}, highest {summary['max_score']})", self.styles['Score'])
+        yield Spacer(1, 30)
+        
+        yield Paragraph("Summary", self.styles['SectionHeader'])
+        scored = sum(summary['grade_distribution'].values())
+        grade_rows = [['Grade', 'Sites', 'Share']]
+        for _, grade in GRADES:
+            count = summary['grade_distribution'][grade]
+            grade_rows.append([grade, str(count), f"{count / scored:.0%}" if scored else '-'])
+        yield from data_table(grade_rows, METRICS_COLUMN_WIDTHS)
+        
+        category_rows = [['Category', 'Average Score', 'Status']]
+        for category, average in summary['category_averages'].items():
+            category_rows.append([category.title(), f"{average}/100",
+                                  'Good' if average >= 80 else 'Fair' if average >= 60 else 'Poor'])
+        yield from data_table(category_rows, METRICS_COLUMN_WIDTHS)
+        
+        status_rows = [['Status', 'Sites']] + [[status.title(), str(count)] for status, count in summary['by_status'].items()]
+        yield from data_table(status_rows, METRICS_COLUMN_WIDTHS[:2])
+        
+        yield Paragraph("Site Overview", self.styles['SectionHeader'])
+        header = ['#', 'URL', 'Overall'] + [section.short_label for section in SCORED_SECTIONS]
+        rows = [header]
+        for index, record in enumerate(records(), 1):
+            rows.append(self._overview_row(index, record))
+            if len(rows) > SITE_OVERVIEW_ROWS:
+                yield self._overview_table(rows)
+                rows = [header]
+        if len(rows) > 1:
+            yield self._overview_table(rows)
+        
+        for record in records():
+            yield PageBreak()
+            yield from self._site_section(record)
+    
+    def _overview_row(self, index: int, record: Dict[str, Any]) -> List[str]:
+        url = record.get("url") or ""
+        row = [str(index), url if len(url) <= 38 else url[:35] + '...']
+        results = record.get("results")
+        if not results:
+            return row + [record.get("status") or '-'] + [''] * len(SCORED_CATEGORIES)
+        return row + [str(results.get('overall_score', '-'))] + [
+            str((results.get(category) or {}).get('score', '-')) for category in SCORED_CATEGORIES
+        ]
+    
+    def _overview_table(self, rows: List[List[str]]) -> Table:
+        table = Table(rows, colWidths=OVERVIEW_COLUMN_WIDTHS, repeatRows=1)
+        table.setStyle(COMPACT_TABLE_STYLE)
+        return table
+    
+    def _site_section(self, record: Dict[str, Any]) -> Iterator:
+        """One site of a multi-site report: its score and every category section"""
+        yield Paragraph(escape(record.get("url") or ""), self.styles['Heading1'])
+        results = record.get("results")
+        if not results:
+            error = f": {escape(record['error'])}" if record.get("error") else ""
+            yield Paragraph(f"Analysis {record.get('status')}{error}", self.styles['Issue'])
+            return
+        yield Paragraph(f"<b>Overall Score:</b> {results.get('overall_score', 0)}/100", self.styles['Score'])
+        yield Spacer(1, 10)
+        for section in SECTIONS:
+            if results.get(section.key):
+                yield from section.build(results[section.key])
+    
     def _generate_executive_summary(self, analysis_data: Dict[str, Any]) -> str:
         """Generate executive summary"""
         overall_score = analysis_data.get('overall_score', 0)
@@ -158,7 +506,7 @@ class PDFReportGenerator:
         
         # Add specific highlights
         highlights = []
-        for category in ['performance', 'accessibility', 'seo', 'security', 'content']:
+        for category in SCORED_CATEGORIES:
             if category in analysis_data and analysis_data[category]:
                 score = analysis_data[category].get('score', 0)
                 if score >= 90:
@@ -173,159 +521,12 @@ class PDFReportGenerator:
         
         return summary
     
-    def _generate_performance_section(self, performance_data: Dict[str, Any]) -> list:
-        """Generate performance analysis section"""
-        elements = []
-        
-        score = performance_data.get('score', 0)
-        elements.append(Paragraph(f"<b>Performance Score: {score}/100</b>", self.styles['Score']))
-        elements.append(Spacer(1, 10))
-        
-        # Metrics table
-        metrics_data = [
-            ['Metric', 'Value', 'Status'],
-            ['Load Time', f"{performance_data.get('load_time', 0)}s", self._get_status_indicator(performance_data.get('load_time', 0), 2, 's')],
-            ['Page Size', f"{performance_data.get('page_size', 0):,} bytes", self._get_status_indicator(performance_data.get('page_size', 0), 500000, 'bytes')],
-            ['Status Code', str(performance_data.get('status_code', 0)), self._get_status_indicator(performance_data.get('status_code', 0), 200, 'code')],
-            ['Total Images', str(performance_data.get('total_images', 0)), 'Info'],
-            ['Unoptimized Images', str(performance_data.get('unoptimized_images', 0)), self._get_status_indicator(performance_data.get('unoptimized_images', 0), 0, 'count', reverse=True)]
-        ]
-        
-        table = Table(metrics_data, colWidths=[2*inch, 1.5*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 10))
-        
-        # Recommendations
-        recommendations = performance_data.get('recommendations', [])
-        if recommendations:
-            elements.append(Paragraph("<b>Recommendations:</b>", self.styles['Normal']))
-            for rec in recommendations:
-                elements.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
-        
-        return elements
-    
-    def _generate_accessibility_section(self, accessibility_data: Dict[str, Any]) -> list:
-        """Generate accessibility analysis section"""
-        elements = []
-        
-        score = accessibility_data.get('score', 0)
-        elements.append(Paragraph(f"<b>Accessibility Score: {score}/100</b>", self.styles['Score']))
-        elements.append(Spacer(1, 10))
-        
-        # Issues
-        issues = accessibility_data.get('issues', [])
-        if issues:
-            elements.append(Paragraph("<b>Issues Found:</b>", self.styles['Normal']))
-            for issue in issues:
-                elements.append(Paragraph(f"• {issue}", self.styles['Issue']))
-            elements.append(Spacer(1, 10))
-        
-        # Recommendations
-        recommendations = accessibility_data.get('recommendations', [])
-        if recommendations:
-            elements.append(Paragraph("<b>Recommendations:</b>", self.styles['Normal']))
-            for rec in recommendations:
-                elements.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
-        
-        return elements
-    
-    def _generate_seo_section(self, seo_data: Dict[str, Any]) -> list:
-        """Generate SEO analysis section"""
-        elements = []
-        
-        score = seo_data.get('score', 0)
-        elements.append(Paragraph(f"<b>SEO Score: {score}/100</b>", self.styles['Score']))
-        elements.append(Spacer(1, 10))
-        
-        # Issues
-        issues = seo_data.get('issues', [])
-        if issues:
-            elements.append(Paragraph("<b>Issues Found:</b>", self.styles['Normal']))
-            for issue in issues:
-                elements.append(Paragraph(f"• {issue}", self.styles['Issue']))
-            elements.append(Spacer(1, 10))
-        
-        # Recommendations
-        recommendations = seo_data.get('recommendations', [])
-        if recommendations:
-            elements.append(Paragraph("<b>Recommendations:</b>", self.styles['Normal']))
-            for rec in recommendations:
-                elements.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
-        
-        return elements
-    
-    def _generate_security_section(self, security_data: Dict[str, Any]) -> list:
-        """Generate security analysis section"""
-        elements = []
-        
-        score = security_data.get('score', 0)
-        elements.append(Paragraph(f"<b>Security Score: {score}/100</b>", self.styles['Score']))
-        elements.append(Spacer(1, 10))
-        
-        # Issues
-        issues = security_data.get('issues', [])
-        if issues:
-            elements.append(Paragraph("<b>Security Issues:</b>", self.styles['Normal']))
-            for issue in issues:
-                elements.append(Paragraph(f"• {issue}", self.styles['Issue']))
-            elements.append(Spacer(1, 10))
-        
-        # Recommendations
-        recommendations = security_data.get('recommendations', [])
-        if recommendations:
-            elements.append(Paragraph("<b>Security Recommendations:</b>", self.styles['Normal']))
-            for rec in recommendations:
-                elements.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
-        
-        return elements
-    
-    def _generate_content_section(self, content_data: Dict[str, Any]) -> list:
-        """Generate content analysis section"""
-        elements = []
-        
-        score = content_data.get('score', 0)
-        elements.append(Paragraph(f"<b>Content Score: {score}/100</b>", self.styles['Score']))
-        elements.append(Spacer(1, 10))
-        
-        # Content metrics
-        word_count = content_data.get('word_count', 0)
-        elements.append(Paragraph(f"<b>Word Count:</b> {word_count:,} words", self.styles['Normal']))
-        elements.append(Spacer(1, 10))
-        
-        # Issues
-        issues = content_data.get('issues', [])
-        if issues:
-            elements.append(Paragraph("<b>Content Issues:</b>", self.styles['Normal']))
-            for issue in issues:
-                elements.append(Paragraph(f"• {issue}", self.styles['Issue']))
-            elements.append(Spacer(1, 10))
-        
-        # Recommendations
-        recommendations = content_data.get('recommendations', [])
-        if recommendations:
-            elements.append(Paragraph("<b>Content Recommendations:</b>", self.styles['Normal']))
-            for rec in recommendations:
-                elements.append(Paragraph(f"• {rec}", self.styles['Recommendation']))
-        
-        return elements
-    
     def _generate_priority_recommendations(self, analysis_data: Dict[str, Any]) -> list:
         """Generate priority recommendations based on all analysis data"""
         all_recommendations = []
         
         # Collect all recommendations
-        for category in ['performance', 'accessibility', 'seo', 'security', 'content']:
+        for category in SCORED_CATEGORIES:
             if category in analysis_data and analysis_data[category]:
                 category_data = analysis_data[category]
                 score = category_data.get('score', 0)
@@ -338,42 +539,3 @@ class PDFReportGenerator:
         
         # Return top 10 recommendations
         return all_recommendations[:10]
-    
-    def _get_status_indicator(self, value: float, threshold: float, unit: str, reverse: bool = False) -> str:
-        """Get status indicator for metrics"""
-        if unit == 's':  # seconds
-            if value <= threshold:
-                return "Good"
-            elif value <= threshold * 1.5:
-                return "Fair"
-            else:
-                return "Poor"
-        elif unit == 'bytes':
-            if value <= threshold:
-                return "Good"
-            elif value <= threshold * 2:
-                return "Fair"
-            else:
-                return "Poor"
-        elif unit == 'code':
-            if value == 200:
-                return "Good"
-            else:
-                return "Poor"
-        elif unit == 'count':
-            if reverse:
-                if value == 0:
-                    return "Good"
-                elif value <= 3:
-                    return "Fair"
-                else:
-                    return "Poor"
-            else:
-                if value <= threshold:
-                    return "Good"
-                elif value <= threshold * 2:
-                    return "Fair"
-                else:
-                    return "Poor"
-        else:
-            return "Info"
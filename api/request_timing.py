@@ -0,0 +1,174 @@
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+class RequestTiming:
+    """Phase timestamps of one request, for the performance waterfall
+    
+    The analyzer marks when the request starts, when the response headers
+    arrive and when the body is done; the session's trace hooks (see
+    create_trace_config) fill in the connection phases in between when the
+    instance is passed as trace_request_ctx. Timestamps are time.monotonic()
+    values. aiohttp reports the TCP and TLS handshakes as one step, so
+    connect covers both. Time spent waiting on our own per-host rate
+    limiter before the request goes out is kept apart as the throttled
+    phase; the request itself starts when the limiter lets it through.
+    """
+    
+    __slots__ = ('url', 'resource_type', 'throttle_start', 'start', 'queue_start', 'queue_end', 'dns_start',
+                 'dns_end', 'connect_start', 'connect_end', 'reused', 'response_start', 'end', 'status',
+                 'transfer_size', 'error')
+    
+    def __init__(self, url: str, resource_type: str = 'document'):
+        self.url = url
+        self.resource_type = resource_type
+        self.begin()
+    
+    def begin(self, throttle_start: Optional[float] = None):
+        """Start (or restart, for a retried request) the measurement
+        
+        throttle_start is when the request began waiting on the rate
+        limiter, if it had to.
+        """
+        self.start = time.monotonic()
+        self.throttle_start = self.start if throttle_start is None else throttle_start
+        self.queue_start = self.queue_end = None
+        self.dns_start = self.dns_end = None
+        self.connect_start = self.connect_end = None
+        self.reused = False
+        self.response_start = None
+        self.end = None
+        self.status = None
+        self.transfer_size = 0
+        self.error = None
+    
+    def headers_received(self, status: int):
+        self.response_start = time.monotonic()
+        self.status = status
+    
+    def finish(self, error: Optional[str] = None):
+        self.end = time.monotonic()
+        self.error = error
+    
+    @property
+    def ttfb(self) -> Optional[float]:
+        """Seconds from the request start to the response headers"""
+        if self.response_start is None:
+            return None
+        return self.response_start - self.start
+    
+    def phases(self) -> Dict[str, Optional[float]]:
+        """Duration of each phase in seconds; None for phases that did not happen or were not traced"""
+        def span(start, end):
+            return None if start is None or end is None else max(0.0, end - start)
+        
+        dns = span(self.dns_start, self.dns_end)
+        connect = span(self.connect_start, self.connect_end)
+        if connect is not None and dns is not None:
+            # Name resolution happens inside connection setup
+            connect = max(0.0, connect - dns)
+        
+        # Waiting is what is left between the request going out and the first byte coming back
+        ready = max(t for t in (self.start, self.queue_end, self.dns_end, self.connect_end) if t is not None)
+        return {
+            "throttled": span(self.throttle_start, self.start),
+            "blocked": span(self.queue_start, self.queue_end),
+            "dns": dns,
+            "connect": connect,
+            "wait": span(ready, self.response_start),
+            "download": span(self.response_start, self.end)
+        }
+    
+    def summary(self) -> Dict[str, Optional[float]]:
+        """Phase durations and TTFB in seconds, rounded to milliseconds"""
+        durations = {**self.phases(), "ttfb": self.ttfb}
+        return {key: _rounded(value) for key, value in durations.items()}
+    
+    def entry(self, origin: float, clock: Optional[Callable[[float], float]] = None) -> Dict[str, Any]:
+        """Waterfall row with times in seconds, start relative to origin on clock (see unthrottled_clock)"""
+        end = self.end if self.end is not None else self.response_start
+        start = clock(self.start) if clock else self.start
+        return {
+            "url": self.url,
+            "type": self.resource_type,
+            "status": self.status,
+            "start": _rounded(start - origin),
+            **self.summary(),
+            "duration": _rounded(None if end is None else end - self.start),
+            "transfer_size": self.transfer_size,
+            "reused_connection": self.reused,
+            "error": self.error
+        }
+
+def unthrottled_clock(timings: Iterable[RequestTiming]) -> Callable[[float], float]:
+    """Clock over a set of requests that stands still while they only wait on our rate limiter
+    
+    Whenever some request is throttled and none is on the network, the
+    delay is ours rather than the site's, so those stretches are cut out;
+    the returned function maps a monotonic time onto what is left. Request
+    durations are unchanged, since no stretch overlaps a request.
+    """
+    timings = list(timings)
+    throttled = _merged((timing.throttle_start, timing.start) for timing in timings)
+    active = _merged((timing.start, timing.end if timing.end is not None else timing.response_start)
+                     for timing in timings)
+    
+    idle = []
+    for start, end in throttled:
+        for active_start, active_end in active:
+            if active_end <= start or active_start >= end:
+                continue
+            if active_start > start:
+                idle.append((start, active_start))
+            start = max(start, active_end)
+            if start >= end:
+                break
+        if start < end:
+            idle.append((start, end))
+    
+    def clock(moment: float) -> float:
+        return moment - sum(max(0.0, min(end, moment) - start) for start, end in idle)
+    return clock
+
+def _merged(intervals: Iterable[Tuple[float, Optional[float]]]) -> List[Tuple[float, float]]:
+    """Non-empty intervals, sorted, with overlapping ones joined; open-ended ones are left out"""
+    merged: List[Tuple[float, float]] = []
+    for start, end in sorted((start, end) for start, end in intervals if end is not None and end > start):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def _rounded(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds, 3)
+
+def _timing(trace_config_ctx) -> Optional[RequestTiming]:
+    timing = trace_config_ctx.trace_request_ctx
+    return timing if isinstance(timing, RequestTiming) else None
+
+def _mark(attribute: str):
+    """Trace hook storing the current time on the request's RequestTiming, if it has one"""
+    async def hook(session, trace_config_ctx, params):
+        timing = _timing(trace_config_ctx)
+        if timing is not None:
+            setattr(timing, attribute, time.monotonic())
+    return hook
+
+async def _on_connection_reused(session, trace_config_ctx, params):
+    timing = _timing(trace_config_ctx)
+    if timing is not None:
+        timing.reused = True
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """Trace hooks recording connection phases into RequestTiming request contexts"""
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_queued_start.append(_mark('queue_start'))
+    trace_config.on_connection_queued_end.append(_mark('queue_end'))
+    trace_config.on_dns_resolvehost_start.append(_mark('dns_start'))
+    trace_config.on_dns_resolvehost_end.append(_mark('dns_end'))
+    trace_config.on_connection_create_start.append(_mark('connect_start'))
+    trace_config.on_connection_create_end.append(_mark('connect_end'))
+    trace_config.on_connection_reuseconn.append(_on_connection_reused)
+    return trace_config
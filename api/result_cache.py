@@ -0,0 +1,71 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from url_utils import normalize_url
+
+# Cache sizing, overridable through the environment
+RESULT_CACHE_TTL = float(os.environ.get('RESULT_CACHE_TTL', 3600))
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', 1000))
+
+class CachedResult:
+    """Analysis output for one URL plus the validators needed to revalidate it"""
+    
+    def __init__(self, results: Dict[str, Any], etag: Optional[str], last_modified: Optional[str]):
+        self.results = results
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time()
+
+class ResultCache:
+    """LRU cache of analysis results keyed by normalized URL and options
+    
+    Entries younger than ttl are served directly. Older entries can be
+    served again once a conditional GET confirms the page is unchanged.
+    """
+    
+    def __init__(self, ttl: float = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Get an entry regardless of age, marking it recently used"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+    
+    def is_fresh(self, entry: CachedResult) -> bool:
+        return time.time() - entry.stored_at < self.ttl
+    
+    def refresh(self, entry: CachedResult):
+        """Restart an entry's TTL after a successful revalidation"""
+        entry.stored_at = time.time()
+    
+    def put(self, key: str, results: Dict[str, Any]):
+        """Store results, taking validators from the page's response headers"""
+        headers = (results.get("performance") or {}).get("headers") or {}
+        self._entries[key] = CachedResult(
+            results, _header(headers, 'ETag'), _header(headers, 'Last-Modified')
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+def cache_key(url: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Cache key for a URL analyzed with the given options"""
+    return f"{normalize_url(url)} {json.dumps(options or {}, sort_keys=True)}"
+
+def _header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """Case-insensitive header lookup on a plain dict"""
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
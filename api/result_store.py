@@ -0,0 +1,198 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlite_db import SQLiteDatabase
+
+class ResultStore:
+    """Interface for analysis records keyed by analysis_id"""
+    
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single analysis record, or None if it does not exist"""
+        raise NotImplementedError
+    
+    def save(self, analysis_id: str, result: Dict[str, Any]):
+        """Insert or replace a whole analysis record"""
+        raise NotImplementedError
+    
+    def update(self, analysis_id: str, **fields) -> bool:
+        """Atomically update fields of an existing record; returns False if it does not exist"""
+        raise NotImplementedError
+    
+    def delete(self, analysis_id: str) -> bool:
+        """Delete a record; returns False if it did not exist"""
+        raise NotImplementedError
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        """Delete records not updated within max_age_seconds; returns the number removed"""
+        raise NotImplementedError
+
+class JSONFileResultStore(ResultStore):
+    """Legacy backend keeping every record in one JSON file
+    
+    Every write rewrites the whole file, so cost grows with history size.
+    Kept for deployments that still read analysis_results.json directly.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'analysis_results.json')
+        self._lock = threading.Lock()
+    
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+    
+    def _dump(self, results: Dict[str, Any]):
+        with open(self.path, 'w') as f:
+            json.dump(results, f)
+    
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        return self._load().get(analysis_id)
+    
+    def save(self, analysis_id: str, result: Dict[str, Any]):
+        with self._lock:
+            results = self._load()
+            results[analysis_id] = result
+            self._dump(results)
+    
+    def update(self, analysis_id: str, **fields) -> bool:
+        with self._lock:
+            results = self._load()
+            if analysis_id not in results:
+                return False
+            results[analysis_id].update(fields)
+            self._dump(results)
+            return True
+    
+    def delete(self, analysis_id: str) -> bool:
+        with self._lock:
+            results = self._load()
+            if results.pop(analysis_id, None) is None:
+                return False
+            self._dump(results)
+            return True
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        cutoff = datetime.now().timestamp() - max_age_seconds
+        with self._lock:
+            results = self._load()
+            expired = [
+                analysis_id for analysis_id, result in results.items()
+                if _started_timestamp(result) < cutoff
+            ]
+            for analysis_id in expired:
+                del results[analysis_id]
+            if expired:
+                self._dump(results)
+            return len(expired)
+
+class SQLiteResultStore(ResultStore):
+    """Indexed backend storing one row per analysis in SQLite (WAL mode)
+    
+    status and progress live in their own columns so progress updates are
+    single-row writes; the rest of the record is a JSON document.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'analysis_results.db')
+        self._db = SQLiteDatabase(self.path)
+        with self._db.connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    analysis_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    progress INTEGER,
+                    record TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_updated_at ON analyses(updated_at)")
+    
+    def get(self, analysis_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db.connect().execute(
+            "SELECT status, progress, record FROM analyses WHERE analysis_id = ?", (analysis_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, progress, record = row
+        result = json.loads(record)
+        result["status"] = status
+        result["progress"] = progress
+        return result
+    
+    def save(self, analysis_id: str, result: Dict[str, Any]):
+        record = {key: value for key, value in result.items() if key not in ('status', 'progress')}
+        now = time.time()
+        with self._db.connect() as conn:
+            conn.execute("""
+                INSERT INTO analyses (analysis_id, status, progress, record, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(analysis_id) DO UPDATE SET
+                    status = excluded.status,
+                    progress = excluded.progress,
+                    record = excluded.record,
+                    updated_at = excluded.updated_at
+            """, (analysis_id, result.get("status"), result.get("progress"), json.dumps(record), now, now))
+    
+    def update(self, analysis_id: str, **fields) -> bool:
+        assignments = ["updated_at = ?"]
+        params = [time.time()]
+        for column in ('status', 'progress'):
+            if column in fields:
+                assignments.append(f"{column} = ?")
+                params.append(fields.pop(column))
+        if fields:
+            # Patch the JSON document in place so concurrent writers never clobber each other
+            paths = ", ".join("?, json(?)" for _ in fields)
+            assignments.append(f"record = json_set(record, {paths})")
+            for key, value in fields.items():
+                params.extend([f'$."{key}"', json.dumps(value)])
+        params.append(analysis_id)
+        with self._db.connect() as conn:
+            cursor = conn.execute(f"UPDATE analyses SET {', '.join(assignments)} WHERE analysis_id = ?", params)
+        return cursor.rowcount > 0
+    
+    def delete(self, analysis_id: str) -> bool:
+        with self._db.connect() as conn:
+            cursor = conn.execute("DELETE FROM analyses WHERE analysis_id = ?", (analysis_id,))
+        return cursor.rowcount > 0
+    
+    def cleanup(self, max_age_seconds: float) -> int:
+        with self._db.connect() as conn:
+            cursor = conn.execute("DELETE FROM analyses WHERE updated_at < ?", (time.time() - max_age_seconds,))
+        return cursor.rowcount
+
+def _started_timestamp(result: Dict[str, Any]) -> float:
+    """Best-effort age of a legacy record from its ISO timestamps"""
+    for key in ('started_at', 'analyzed_at'):
+        value = result.get(key) or (result.get('results') or {}).get(key)
+        if value:
+            try:
+                return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                pass
+    return float('inf')
+
+_result_store: Optional[ResultStore] = None
+
+def get_result_store() -> ResultStore:
+    """Get the configured store; RESULT_STORE selects 'sqlite' (default) or legacy 'json'"""
+    global _result_store
+    if _result_store is None:
+        backend = os.environ.get('RESULT_STORE', 'sqlite')
+        path = os.environ.get('RESULT_STORE_PATH')
+        if backend == 'json':
+            _result_store = JSONFileResultStore(path)
+        elif backend == 'sqlite':
+            _result_store = SQLiteResultStore(path)
+        else:
+            raise ValueError(f"Unknown result store backend: {backend}")
+    return _result_store
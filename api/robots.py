@@ -0,0 +1,73 @@
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from rate_limit import HostRateLimiter, host_limiter
+from single_flight import SingleFlight
+
+class RobotsCache:
+    """Parsed robots.txt per origin, shared by every analysis in the process
+    
+    Concurrent lookups for the same origin wait on a single fetch, which
+    carries on for the others when one of them is cancelled.
+    """
+    
+    def __init__(self, user_agent: str = '*', ttl: float = 3600, limiter: Optional[HostRateLimiter] = host_limiter):
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.limiter = limiter
+        self._parsers: Dict[str, Tuple[RobotFileParser, float]] = {}
+        self._fetches = SingleFlight()
+    
+    async def get(self, url: str, session: aiohttp.ClientSession) -> RobotFileParser:
+        """Get the parsed robots.txt for the origin of url"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        
+        cached = self._parsers.get(origin)
+        if cached and time.time() - cached[1] < self.ttl:
+            return cached[0]
+        
+        return await self._fetches.do(origin, lambda: self._fetch_and_cache(origin, session))
+    
+    async def _fetch_and_cache(self, origin: str, session: aiohttp.ClientSession) -> RobotFileParser:
+        parser = await self._fetch(origin, session)
+        self._parsers[origin] = (parser, time.time())
+        return parser
+    
+    async def allowed(self, url: str, session: aiohttp.ClientSession) -> bool:
+        """Check whether robots.txt allows fetching url"""
+        parser = await self.get(url, session)
+        return parser.can_fetch(self.user_agent, url)
+    
+    async def crawl_delay(self, url: str, session: aiohttp.ClientSession) -> Optional[float]:
+        """Crawl-delay requested for the origin of url, if any"""
+        parser = await self.get(url, session)
+        delay = parser.crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+    
+    async def _fetch(self, origin: str, session: aiohttp.ClientSession) -> RobotFileParser:
+        robots_url = f"{origin}/robots.txt"
+        parser = RobotFileParser(robots_url)
+        try:
+            if self.limiter:
+                await self.limiter.acquire(robots_url)
+            async with session.get(robots_url, timeout=10) as response:
+                if self.limiter:
+                    self.limiter.record(robots_url, response.status, response.headers.get('Retry-After'))
+                if response.status in (401, 403):
+                    parser.disallow_all = True
+                elif response.status >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse((await response.text()).splitlines())
+        except Exception:
+            # Unreachable robots.txt is treated as no restrictions
+            parser.allow_all = True
+        return parser
+
+# Shared by single, batch and crawl analyses
+robots_cache = RobotsCache()
@@ -0,0 +1,62 @@
+from collections import Counter
+from typing import Any, Dict, Optional
+
+# Scored categories, in report order. This module has no network or parsing
+# dependencies, so render workers can import it without loading the analyzer
+CATEGORIES = ['performance', 'accessibility', 'seo', 'security', 'content']
+
+# Grade bands used across reports
+GRADES = [(90, 'Excellent'), (80, 'Good'), (70, 'Fair'), (60, 'Poor'), (0, 'Critical')]
+
+def grade_for(score: float) -> str:
+    """Grade label for an overall score"""
+    for threshold, grade in GRADES:
+        if score >= threshold:
+            return grade
+    return GRADES[-1][1]
+
+class ScoreAggregate:
+    """Running summary of many analyses, kept in constant memory"""
+    
+    def __init__(self):
+        self.statuses = Counter()
+        self.grades = Counter()
+        self.score_total = 0
+        self.scored = 0
+        self.min_score: Optional[int] = None
+        self.max_score: Optional[int] = None
+        self.category_totals = Counter()
+        self.category_counts = Counter()
+    
+    def add(self, status: str, results: Optional[Dict[str, Any]] = None):
+        """Fold one analysis into the summary"""
+        self.statuses[status] += 1
+        if not results:
+            return
+        
+        overall = results.get("overall_score", 0)
+        self.score_total += overall
+        self.scored += 1
+        self.min_score = overall if self.min_score is None else min(self.min_score, overall)
+        self.max_score = overall if self.max_score is None else max(self.max_score, overall)
+        self.grades[grade_for(overall)] += 1
+        
+        for category in CATEGORIES:
+            category_data = results.get(category) or {}
+            if "score" in category_data:
+                self.category_totals[category] += category_data["score"]
+                self.category_counts[category] += 1
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": sum(self.statuses.values()),
+            "by_status": dict(self.statuses),
+            "average_score": round(self.score_total / self.scored) if self.scored else None,
+            "min_score": self.min_score,
+            "max_score": self.max_score,
+            "category_averages": {
+                category: round(self.category_totals[category] / self.category_counts[category])
+                for category in CATEGORIES if self.category_counts[category]
+            },
+            "grade_distribution": {grade: self.grades[grade] for _, grade in GRADES}
+        }
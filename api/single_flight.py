@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Flight:
+    __slots__ = ('task', 'owner', 'waiters')
+    
+    def __init__(self, task: asyncio.Task, owner: Any):
+        self.task = task
+        self.owner = owner
+        self.waiters = 0
+
+class SingleFlight:
+    """Concurrent calls for the same key share one run of the work
+    
+    The first call for a key starts the work in a task of its own and
+    later calls wait on that task. Callers wait through a shield, so one
+    of them being cancelled or timing out never cancels the work for the
+    others; once every caller has given up the work is cancelled too,
+    unless cancel_abandoned is False (e.g. for results worth keeping).
+    With owned=True the work instead belongs to the caller that started
+    it and is cancelled as soon as that caller gives up, e.g. when the
+    work reports progress on the starter's behalf. If the work is
+    cancelled while a caller still wants it, that caller runs it again
+    rather than inheriting a cancellation it never asked for.
+    """
+    
+    def __init__(self, cancel_abandoned: bool = True, owned: bool = False):
+        self.cancel_abandoned = cancel_abandoned
+        self.owned = owned
+        self._flights: Dict[Hashable, _Flight] = {}
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._flights
+    
+    def owner(self, key: Hashable) -> Any:
+        """Owner given by the call that started the running work for key, None when nothing runs"""
+        flight = self._flights.get(key)
+        return flight.owner if flight is not None else None
+    
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]], owner: Any = None) -> Any:
+        """Run work() for key, or join the run already in progress, and return its result"""
+        while True:
+            flight = self._flights.get(key)
+            started = flight is None or flight.task.cancelled()
+            if started:
+                flight = self._flights[key] = _Flight(asyncio.ensure_future(work()), owner)
+                flight.task.add_done_callback(lambda done: self._finish(key, done))
+            
+            flight.waiters += 1
+            try:
+                return await asyncio.shield(flight.task)
+            except asyncio.CancelledError:
+                if flight.task.cancelled() and not asyncio.current_task().cancelling():
+                    # The work was cancelled from elsewhere while this caller still wants it
+                    continue
+                raise
+            finally:
+                flight.waiters -= 1
+                abandoned = (started and self.owned) or (flight.waiters == 0 and self.cancel_abandoned)
+                if abandoned and not flight.task.done():
+                    flight.task.cancel()
+    
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        flight = self._flights.get(key)
+        if flight is not None and flight.task is task:
+            del self._flights[key]
+        # Mark any error retrieved; every caller may have given up on the work
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,32 @@
+import sqlite3
+import threading
+
+class SQLiteDatabase:
+    """Connections to one SQLite database file in WAL mode, one per thread
+    
+    sqlite3 connections must stay on the thread that opened them, so each
+    thread opens its own on first use and keeps it. WAL lets readers in any
+    thread or process carry on while a writer commits, and with WAL,
+    synchronous=NORMAL only risks the last commits on power loss. With
+    autocommit, statements are not wrapped in implicit transactions, so
+    callers can open their own (e.g. BEGIN IMMEDIATE).
+    """
+    
+    def __init__(self, path: str, autocommit: bool = False, timeout: float = 30):
+        self.path = path
+        self.autocommit = autocommit
+        self.timeout = timeout
+        self._local = threading.local()
+    
+    def connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.autocommit:
+                conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            else:
+                conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
@@ -0,0 +1,49 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+
+from http_session import close_shared_session, start_shared_session
+from main import create_job_worker
+from parse_pool import shutdown_parse_executor
+from render_pool import shutdown_render_pool
+
+# Worker processes to start; each runs up to MAX_CONCURRENT_ANALYSES analyses at a time
+# and has its own HOST_REQUESTS_PER_SECOND limit, so lower that when raising this
+WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', 1))
+
+async def serve():
+    """Run queued analyses until SIGINT or SIGTERM, then hand running jobs back"""
+    await start_shared_session()
+    worker = create_job_worker()
+    
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    
+    task = asyncio.create_task(worker.run())
+    print(f"Worker {worker.worker_id} started")
+    await stopping.wait()
+    
+    await worker.stop()
+    task.cancel()
+    await close_shared_session()
+    shutdown_parse_executor()
+    shutdown_render_pool()
+    print(f"Worker {worker.worker_id} stopped")
+
+def run_worker_process():
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    if WORKER_PROCESSES == 1:
+        run_worker_process()
+    else:
+        processes = [multiprocessing.Process(target=run_worker_process) for _ in range(WORKER_PROCESSES)]
+        for process in processes:
+            process.start()
+        # Pass termination on so every worker shuts down cleanly
+        signal.signal(signal.SIGTERM, lambda *_: [process.terminate() for process in processes])
+        for process in processes:
+            process.join()
@@ -0,0 +1,2 @@
+# test_api.py is a manual script for a running server (python test_api.py), not a pytest module
+collect_ignore = ["test_api.py"]
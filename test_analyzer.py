@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import os
+import sys
+import tracemalloc
+from concurrent.futures import Executor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import pytest
+from aiohttp import web
+from multidict import CIMultiDict
+
+from analyzer import ACCEPT_ENCODING, CATEGORIES, DOCUMENT_CATEGORIES, PageDocument, WebsiteAnalyzer
+from rate_limit import HostRateLimiter
+
+PAGE_URL = 'https://example.com/'
+
+class FailingExecutor(Executor):
+    """Executor whose every submission fails, like a broken parse pool"""
+
+    def submit(self, fn, *args, **kwargs):
+        raise RuntimeError("parse pool is broken")
+
+def make_page():
+    content = '<html><head><title>Home</title></head><body><p>Hello</p></body></html>'
+    return PageDocument(PAGE_URL, 200, CIMultiDict({'Content-Type': 'text/html'}), content, 0.1)
+
+def test_failed_evaluation_gives_category_errors():
+    analyzer = WebsiteAnalyzer(executor=FailingExecutor(), limiter=None)
+    results = asyncio.run(analyzer.analyze_all(PAGE_URL, page=make_page()))
+
+    assert set(results) == set(CATEGORIES)
+    for category in DOCUMENT_CATEGORIES:
+        assert results[category] == {"error": "parse pool is broken", "score": 0}
+    # Performance does not depend on the parse, so it still runs
+    assert "error" not in results["performance"]
+    assert results["performance"]["assets"] == []
+
+async def with_server(handle, scenario):
+    """Serve every path with handle on a local port and run scenario(base_url) against it"""
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        return await scenario(f"http://127.0.0.1:{runner.addresses[0][1]}/")
+    finally:
+        await runner.cleanup()
+
+def test_rate_limit_waits_stay_out_of_the_waterfall():
+    scripts = ''.join(f'<script src="/s{index}.js" async></script>' for index in range(40))
+    page_html = f'<html><head><title>Scripts</title>{scripts}</head><body><p>Hello</p></body></html>'
+
+    async def serve(request):
+        if request.path == '/':
+            return web.Response(text=page_html, content_type='text/html')
+        return web.Response(text='var x = 1;', content_type='application/javascript')
+
+    async def scenario(url):
+        async with WebsiteAnalyzer(limiter=HostRateLimiter(requests_per_second=5, burst=10)) as analyzer:
+            page = await analyzer.fetch_page(url)
+            return await analyzer.analyze_performance(url, page)
+
+    performance = asyncio.run(with_server(serve, scenario))
+    waterfall = performance["waterfall"]
+    assert len(waterfall) == 41
+    # 30 of the scripts wait about 0.2s each on the limiter, which shows only as their throttled phase
+    assert sum(row["throttled"] for row in waterfall) > 3
+    assert performance["resources"]["fully_loaded"] < 1
+    assert performance["score"] == 100
+
+def test_images_left_out_by_the_probe_budget_are_reported():
+    images = ''.join(f'<img src="/{speed}{index}.png" alt="">' for speed in ('fast', 'slow') for index in range(3))
+    page_html = f'<html><head><title>Images</title></head><body>{images}</body></html>'
+
+    async def serve(request):
+        if request.path == '/':
+            return web.Response(text=page_html, content_type='text/html')
+        if request.path.startswith('/slow'):
+            await asyncio.sleep(1.5)
+        return web.Response(body=b'x' * 200000, content_type='image/png')
+
+    async def scenario(url):
+        async with WebsiteAnalyzer(limiter=None, image_probe_budget=0.3) as analyzer:
+            page = await analyzer.fetch_page(url)
+            return await analyzer.analyze_performance(url, page)
+
+    performance = asyncio.run(with_server(serve, scenario))
+    assert (performance["images_probed"], performance["images_skipped"]) == (3, 3)
+    assert performance["total_image_size"] == 600000
+    assert performance["unoptimized_images"] == 3
+
+def compress(coding, data):
+    if coding == 'gzip':
+        return gzip.compress(data)
+    if coding == 'br':
+        return pytest.importorskip('brotli').compress(data)
+    return pytest.importorskip('zstandard').ZstdCompressor().compress(data)
+
+@pytest.mark.parametrize('coding', ['gzip', 'br', 'zstd'])
+def test_compression_bomb_stops_at_the_page_cap(coding):
+    if coding not in ACCEPT_ENCODING:
+        pytest.skip(f"{coding} decoding is not available")
+    body = compress(coding, b'<p>' + b' ' * (64 * 1024 * 1024))
+    cap = 1024 * 1024
+
+    async def serve(request):
+        return web.Response(body=body, headers={'Content-Type': 'text/html', 'Content-Encoding': coding})
+
+    async def scenario(url):
+        async with WebsiteAnalyzer(limiter=None, max_page_bytes=cap) as analyzer:
+            tracemalloc.start()
+            try:
+                page = await analyzer.fetch_page(url)
+                return page, tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    page, peak = asyncio.run(with_server(serve, scenario))
+    assert page.truncated
+    assert page.content_size == cap
+    # The decoded page itself plus at most a few chunks of decoder output
+    assert peak < 8 * cap
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import sys
+from collections import Counter
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from batch import BatchRunner, parse_url_list, unique_urls
+
+def test_duplicates_are_dropped_after_normalization():
+    urls = ["https://Example.com", "https://example.com:443/", "ftp://example.com/file",
+            "https://example.com/?b=2&a=1", "https://example.com/?a=1&b=2#top", "https://example.org"]
+
+    assert unique_urls(urls) == ["https://Example.com", "https://example.com/?b=2&a=1", "https://example.org"]
+    assert parse_url_list("\n".join(urls + ["# comment", ""])) == unique_urls(urls)
+
+def test_batches_never_exceed_their_limits_and_keep_busy_hosts_from_blocking_others():
+    urls = [f"https://slow.example/{i}" for i in range(6)] + [f"https://host{i}.example/" for i in range(6)]
+    running = Counter()
+    peaks = Counter()
+    started = []
+
+    async def analyze(url):
+        host = urlsplit(url).hostname
+        running[host] += 1
+        running["all"] += 1
+        peaks[host] = max(peaks[host], running[host])
+        peaks["all"] = max(peaks["all"], running["all"])
+        started.append(url)
+        await asyncio.sleep(0.05 if host == "slow.example" else 0.01)
+        running[host] -= 1
+        running["all"] -= 1
+        return {"results": {"overall_score": 50}}
+
+    async def scenario():
+        runner = BatchRunner(analyze, concurrency=3, per_host_concurrency=2, robots=None)
+        return [item async for item in runner.run(urls)]
+
+    items = asyncio.run(scenario())
+
+    assert sorted(item["url"] for item in items) == sorted(urls)
+    assert {item["status"] for item in items} == {"completed"}
+    assert peaks["all"] == 3
+    assert peaks["slow.example"] == 2
+    # The third slot went to other hosts while the slow host was at its limit
+    assert started[2] == "https://host0.example/"
+
+def test_workers_pause_while_nobody_reads_the_results():
+    started = []
+
+    async def analyze(url):
+        started.append(url)
+        return {}
+
+    async def scenario():
+        runner = BatchRunner(analyze, concurrency=2, per_host_concurrency=2, robots=None)
+        results = runner.run(f"https://host{i}.example/" for i in range(100))
+        await results.__anext__()
+        await asyncio.sleep(0.05)
+        await results.aclose()
+
+    asyncio.run(scenario())
+
+    assert len(started) < 10
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from analyzer import WebsiteAnalyzer
+from crawler import BloomFilter, SiteCrawler
+from rate_limit import HostRateLimiter
+from robots import RobotsCache
+
+SITE = {
+    '/': ['/a', '/b?y=2&x=1', '/private/secret', 'https://elsewhere.example/'],
+    '/a': ['/', '/b?x=1&y=2', '/a#top', '/c'],
+    '/b': ['/c'],
+    '/c': ['/d'],
+    '/d': [],
+    '/private/secret': []
+}
+ROBOTS = "User-agent: *\nDisallow: /private/\n"
+SLOW_ROBOTS = ROBOTS + "Crawl-delay: 1\n"
+
+async def with_site(scenario, robots=ROBOTS, robots_status=200):
+    """Serve SITE and its robots.txt on a local port and run scenario(base_url, requests) against it"""
+    requests = []
+
+    async def handle(request):
+        requests.append(request.path)
+        if request.path == '/robots.txt':
+            await asyncio.sleep(0.05)
+            return web.Response(text=robots, status=robots_status)
+        links = ''.join(f'<a href="{link}">link</a>' for link in SITE.get(request.path, []))
+        return web.Response(text=f'<html><head><title>{request.path}</title></head><body>{links}</body></html>',
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        return await scenario(f"http://127.0.0.1:{runner.addresses[0][1]}", requests)
+    finally:
+        await runner.cleanup()
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(10000, error_rate=0.001)
+    for index in range(10000):
+        bloom.add(f"https://example.com/page/{index}")
+
+    assert all(f"https://example.com/page/{index}" in bloom for index in range(10000))
+    false_positives = sum(f"https://example.com/other/{index}" in bloom for index in range(10000))
+    assert false_positives < 30
+    # About 1.8 bytes per URL, whatever the URLs' length
+    assert len(bloom.bits) < 20000
+
+def test_robots_rules_are_fetched_once_per_origin():
+    robots = RobotsCache(limiter=None)
+
+    async def scenario(base, requests):
+        async with aiohttp.ClientSession() as session:
+            allowed = await asyncio.gather(*(robots.allowed(f"{base}{path}", session)
+                                             for path in ('/', '/a', '/private/secret', '/private/')))
+            return allowed, await robots.crawl_delay(base, session), requests
+
+    allowed, delay, requests = asyncio.run(with_site(scenario, robots=SLOW_ROBOTS))
+
+    assert allowed == [True, True, False, False]
+    assert delay == 1.0
+    assert requests == ['/robots.txt']
+
+@pytest.mark.parametrize('status, allowed', [(403, False), (404, True), (500, True)])
+def test_robots_errors_decide_between_all_and_nothing(status, allowed):
+    robots = RobotsCache(limiter=None)
+
+    async def scenario(base, requests):
+        async with aiohttp.ClientSession() as session:
+            return await robots.allowed(f"{base}/a", session)
+
+    assert asyncio.run(with_site(scenario, robots_status=status)) is allowed
+
+def test_unreachable_robots_allows_everything():
+    robots = RobotsCache(limiter=None)
+
+    async def scenario():
+        async with aiohttp.ClientSession() as session:
+            return await robots.allowed("http://127.0.0.1:9/page", session)
+
+    assert asyncio.run(scenario()) is True
+
+def crawl(use_bloom_filter, max_pages=10, max_depth=3, requests_per_second=100, robots=ROBOTS):
+    async def scenario(base, requests):
+        async with WebsiteAnalyzer(limiter=HostRateLimiter(requests_per_second=100, burst=100)) as analyzer:
+            crawler = SiteCrawler(lambda url, page: asyncio.sleep(0, {"overall_score": 80}), analyzer=analyzer,
+                                  max_depth=max_depth, max_pages=max_pages, requests_per_second=requests_per_second,
+                                  use_bloom_filter=use_bloom_filter, robots=RobotsCache(limiter=None))
+            started = time.monotonic()
+            items = [item async for item in crawler.crawl(f"{base}/")]
+            return items, time.monotonic() - started, base
+
+    items, elapsed, base = asyncio.run(with_site(scenario, robots=robots))
+    return {item["url"][len(base):]: (item["status"], item["depth"]) for item in items}, elapsed
+
+@pytest.mark.parametrize('use_bloom_filter', [False, True])
+def test_crawl_visits_each_page_once_and_respects_robots(use_bloom_filter):
+    pages, elapsed = crawl(use_bloom_filter, requests_per_second=10)
+
+    assert pages == {
+        '/': ('completed', 0),
+        '/a': ('completed', 1),
+        '/b?y=2&x=1': ('completed', 1),
+        '/private/secret': ('skipped', 1),
+        '/c': ('completed', 2),
+        '/d': ('completed', 3)
+    }
+    # Five fetches at the crawl's ten requests a second, although the host limit allows a hundred
+    assert elapsed > 0.35
+
+def test_crawl_stops_at_its_page_and_depth_limits():
+    assert set(crawl(False, max_pages=3)[0]) == {'/', '/a', '/b?y=2&x=1'}
+    assert set(crawl(False, max_depth=1)[0]) == {'/', '/a', '/b?y=2&x=1', '/private/secret'}
+
+def test_crawl_delay_caps_the_crawl_rate():
+    pages, elapsed = crawl(False, max_pages=2, robots=SLOW_ROBOTS)
+
+    assert len(pages) == 2
+    assert elapsed > 0.9
@@ -0,0 +1,99 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from fastapi.testclient import TestClient
+
+import main
+from history import SQLiteHistoryStore, diff_runs, extract_metrics
+
+PAGE_URL = 'https://example.com/'
+
+def results(overall, load_time, issues, seo=None):
+    return {
+        "url": PAGE_URL,
+        "overall_score": overall,
+        "performance": {"score": 90, "load_time": load_time},
+        "seo": seo or {"score": 80, "issues": issues},
+        "content": {"score": 70, "word_count": 500}
+    }
+
+def run(analysis_id, document):
+    return {"analysis_id": analysis_id, "recorded_at": "2026-01-01T00:00:00",
+            "metrics": extract_metrics(document), "issues": [f"[SEO] {issue}" for issue in document["seo"].get("issues", [])]}
+
+def test_failed_categories_leave_their_metrics_out():
+    metrics = extract_metrics(results(70, 1.5, [], seo={"error": "timed out", "score": 0}))
+
+    assert metrics == {"overall_score": 70, "performance.score": 90, "performance.load_time": 1.5,
+                       "content.score": 70, "content.word_count": 500}
+
+def test_diff_reports_changes_past_their_threshold_and_issue_churn():
+    previous = run('a1', results(80, 1.0, ["Missing meta description", "Title too long"]))
+    current_document = results(75, 1.05, ["Title too long", "No canonical link"])
+    current_document["content"]["word_count"] = 650
+    current_document["performance"]["load_time"] = 2.0
+
+    diff = diff_runs(previous, run('a2', current_document))
+
+    assert diff["regressions"] == ["overall_score", "performance.load_time"]
+    assert diff["changes"]["performance.load_time"] == {"previous": 1.0, "current": 2.0, "delta": 1.0, "direction": "regressed"}
+    # Word count is neither better nor worse, just different
+    assert diff["changes"]["content.word_count"]["direction"] == "changed"
+    assert diff["improvements"] == []
+    assert diff["new_issues"] == ["[SEO] No canonical link"]
+    assert diff["resolved_issues"] == ["[SEO] Missing meta description"]
+    assert (diff["previous"]["analysis_id"], diff["current"]["analysis_id"]) == ('a1', 'a2')
+
+def test_changes_below_the_threshold_and_failed_metrics_are_not_changes():
+    previous = run('a1', results(80, 1.0, []))
+    current = run('a2', results(80, 1.05, [], seo={"error": "timed out", "score": 0}))
+
+    diff = diff_runs(previous, current)
+
+    assert diff["changes"] == {}
+    assert diff["missing"] == ["seo.score"]
+
+def test_a_first_run_has_nothing_to_compare_with():
+    diff = diff_runs(None, run('a1', results(80, 1.0, ["Title too long"])))
+
+    assert diff["previous"] is None
+    assert diff["changes"] == {} and diff["missing"] == []
+    assert diff["new_issues"] == ["[SEO] Title too long"]
+
+def test_runs_are_kept_per_normalized_url_oldest_first(tmp_path):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    for index in range(5):
+        store.record('https://Example.com:443', f'a{index}', results(60 + index, 1.0, []))
+    store.record('https://example.org/', 'other', results(10, 1.0, []))
+
+    runs = store.runs(PAGE_URL, limit=3)
+
+    assert [entry["analysis_id"] for entry in runs] == ['a2', 'a3', 'a4']
+    assert runs[-1]["metrics"]["overall_score"] == 64
+    assert store.cleanup(3600) == 0
+    assert store.cleanup(-1) == 6
+    assert store.runs(PAGE_URL) == []
+
+def test_history_endpoints(tmp_path, monkeypatch):
+    store = SQLiteHistoryStore(str(tmp_path / 'history.db'))
+    monkeypatch.setattr(main, 'get_history_store', lambda: store)
+    client = TestClient(main.app)
+
+    assert client.get('/api/history', params={"url": PAGE_URL}).status_code == 404
+    assert client.get('/api/history/diff', params={"url": PAGE_URL}).status_code == 404
+
+    store.record(PAGE_URL, 'a1', results(80, 1.0, ["Title too long"]))
+    first_diff = client.get('/api/history/diff', params={"url": PAGE_URL}).json()
+    assert first_diff["previous"] is None and first_diff["current"]["analysis_id"] == 'a1'
+
+    store.record(PAGE_URL, 'a2', results(70, 1.0, []))
+    trend = client.get('/api/history', params={"url": PAGE_URL, "metric": ["overall_score", "seo.score"]}).json()
+    assert [entry["metrics"] for entry in trend["runs"]] == [{"overall_score": 80, "seo.score": 80},
+                                                             {"overall_score": 70, "seo.score": 80}]
+    diff = client.get('/api/history/diff', params={"url": PAGE_URL}).json()
+    assert diff["url"] == PAGE_URL
+    assert diff["regressions"] == ["overall_score"]
+    assert diff["resolved_issues"] == ["[SEO] Title too long"]
+    assert client.get('/api/history', params={"url": PAGE_URL, "limit": 0}).status_code == 422
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import pytest
+from fastapi import HTTPException
+
+import job_queue
+from job_queue import JobWorker, SQLiteJobQueue, retry_delay
+from result_store import SQLiteResultStore
+import main
+
+PAGE_URL = 'https://example.com/'
+
+def test_jobs_are_claimed_once_in_priority_order(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    queue.enqueue('analysis', {"n": 1}, job_id='low', priority=-5)
+    queue.enqueue('analysis', {"n": 2}, job_id='normal')
+    queue.enqueue('report', {"n": 3}, job_id='other-type', priority=5)
+
+    first = queue.claim('w1', job_types=['analysis'])
+    second = queue.claim('w2', job_types=['analysis'])
+
+    assert (first.job_id, first.payload, first.attempts) == ('normal', {"n": 2}, 1)
+    assert second.job_id == 'low'
+    assert queue.claim('w3', job_types=['analysis']) is None
+    assert queue.stats() == {'running': 2, 'queued': 1}
+    # Only the worker holding a lease can finish the job
+    assert not queue.complete('normal', 'w2')
+    assert queue.complete('normal', 'w1')
+    assert queue.pending_count() == 2
+
+def test_an_expired_lease_lets_another_worker_take_the_job_as_a_new_attempt(tmp_path):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    queue.enqueue('analysis', {}, job_id='j1')
+
+    queue.claim('dead-worker', visibility_timeout=0)
+    retry = queue.claim('w2', visibility_timeout=60)
+
+    assert (retry.job_id, retry.attempts) == ('j1', 2)
+    # The worker that lost its lease can no longer touch the job
+    assert not queue.heartbeat('j1', 'dead-worker')
+    assert not queue.complete('j1', 'dead-worker')
+    assert queue.heartbeat('j1', 'w2')
+    assert queue.claim('w3') is None
+
+def test_failures_retry_after_a_jittered_backoff_until_attempts_run_out(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    queue.enqueue('analysis', {}, job_id='j1', max_attempts=2)
+    monkeypatch.setattr(job_queue, 'retry_delay', lambda attempts: 30)
+
+    queue.claim('w1')
+    assert queue.fail('j1', 'w1', "boom")
+    # Not claimable again until the backoff has passed
+    assert queue.claim('w1') is None
+    monkeypatch.setattr(time, 'time', lambda real=time.time: real() + 31)
+    job = queue.claim('w1')
+    assert (job.attempts, job.final_attempt) == (2, True)
+    assert not queue.fail('j1', 'w1', "boom again")
+    assert queue.stats() == {'failed': 1}
+
+def test_retry_delays_are_spread_below_an_exponential_cap():
+    random.seed(7)
+    for attempts, cap in [(1, 5), (2, 10), (3, 20), (10, 300)]:
+        delays = [retry_delay(attempts, base=5, cap=300) for _ in range(200)]
+        assert all(0 <= delay <= cap for delay in delays)
+        # Full jitter: retries are spread over the whole window rather than bunched at its end
+        assert min(delays) < cap / 4 and max(delays) > cap * 3 / 4
+
+def test_a_failing_job_is_retried_by_the_worker_then_completes(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    queue.enqueue('analysis', {}, job_id='j1')
+    monkeypatch.setattr(job_queue, 'retry_delay', lambda attempts: 0)
+    attempts = []
+
+    async def flaky(job):
+        attempts.append(job.attempts)
+        if job.attempts == 1:
+            raise RuntimeError("first try fails")
+
+    async def scenario():
+        worker = JobWorker(queue, {'analysis': flaky}, poll_interval=0.01)
+        task = asyncio.create_task(worker.run())
+        while queue.stats() != {'completed': 1}:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert attempts == [1, 2]
+
+def test_new_analyses_are_refused_while_the_queue_is_full(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    queue.enqueue(main.ANALYSIS_JOB, {}, job_id='waiting')
+    monkeypatch.setattr(main, 'get_job_queue', lambda: queue)
+    monkeypatch.setattr(main, 'MAX_QUEUED_ANALYSES', 1)
+
+    with pytest.raises(HTTPException) as refused:
+        asyncio.run(main.start_analysis(main.AnalysisRequest(url=PAGE_URL)))
+
+    assert refused.value.status_code == 503
+    assert refused.value.headers["Retry-After"] == "30"
+    assert queue.pending_count() == 1
+
+def test_shutdown_mid_job_puts_the_analysis_back_in_the_queue(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+    store = SQLiteResultStore(str(tmp_path / 'results.db'))
+    monkeypatch.setattr(main, 'get_job_queue', lambda: queue)
+    monkeypatch.setattr(main, 'get_result_store', lambda: store)
+
+    async def slow_analysis(analysis_id, url, key, options, publish_progress=True):
+        main.progress_bus.publish(analysis_id, progress=48)
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(main, 'produce_analysis', slow_analysis)
+
+    async def scenario():
+        store.save('a1', {"id": 'a1', "url": PAGE_URL, "status": "queued", "progress": 0, "results": None, "error": None})
+        queue.enqueue(main.ANALYSIS_JOB, {"analysis_id": 'a1', "url": PAGE_URL, "options": {}}, job_id='a1')
+        worker = main.create_job_worker()
+        task = asyncio.create_task(worker.run())
+        while store.get('a1')["progress"] != 48:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        task.cancel()
+
+    asyncio.run(scenario())
+    record = store.get('a1')
+    assert (record["status"], record["progress"]) == ("queued", 0)
+    assert queue.stats() == {'queued': 1}
+    # Handing the job back did not use up an attempt
+    assert queue.claim('another-worker').attempts == 1
@@ -0,0 +1,80 @@
+import asyncio
+import functools
+import gc
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import pytest
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+import main
+from analyzer import CATEGORIES
+from batch import BatchRunner
+from main import AnalysisRequest, StreamSlots
+from result_cache import ResultCache
+from result_store import SQLiteResultStore
+
+async def endless_stream():
+    while True:
+        yield "line\n"
+        await asyncio.sleep(1)
+
+def test_stream_slots_reject_beyond_the_limit_and_come_back():
+    async def scenario():
+        slots = StreamSlots(2, "batches")
+        first = slots.stream(endless_stream(), media_type="application/x-ndjson")
+        second = slots.stream(endless_stream(), media_type="application/x-ndjson")
+        with pytest.raises(HTTPException) as rejected:
+            slots.stream(endless_stream(), media_type="application/x-ndjson")
+        assert rejected.value.status_code == 503
+        assert rejected.value.headers["Retry-After"] == "30"
+
+        # A client going away mid-stream gives its slot back
+        await first.body_iterator.__anext__()
+        await first.body_iterator.aclose()
+        assert slots.running == 1
+
+        # So does a response dropped before it started streaming
+        del second
+        gc.collect()
+        return slots.running
+
+    assert asyncio.run(scenario()) == 0
+
+def test_requests_cannot_raise_their_queue_priority():
+    assert AnalysisRequest(url="https://example.com", priority=-5).priority == -5
+    for priority in (1, 10 ** 9, -11):
+        with pytest.raises(ValidationError):
+            AnalysisRequest(url="https://example.com", priority=priority)
+
+def test_batch_items_share_the_result_cache_and_use_the_batch_options(tmp_path, monkeypatch):
+    store = SQLiteResultStore(str(tmp_path / 'results.db'))
+    history = []
+    audits = []
+
+    async def fake_analyze_url(analyzer, url, on_progress=None, page=None, audit_transport=False):
+        audits.append(audit_transport)
+        return {"url": url, "overall_score": 70, **{category: {"score": 70} for category in CATEGORIES}}
+
+    monkeypatch.setattr(main, 'get_result_store', lambda: store)
+    monkeypatch.setattr(main, 'result_cache', ResultCache())
+    monkeypatch.setattr(main, 'analyze_url', fake_analyze_url)
+    monkeypatch.setattr(main, 'record_history', lambda analysis_id, results: history.append(analysis_id))
+    monkeypatch.setattr(main, 'BatchRunner', functools.partial(BatchRunner, robots=None))
+
+    async def batch(batch_id):
+        lines = [json.loads(line) async for line in main.run_batch(batch_id, ["https://example.com/"], {"transport_audit": True})]
+        return lines[1]
+
+    first = asyncio.run(batch('b1'))
+    second = asyncio.run(batch('b2'))
+
+    assert audits == [True]
+    assert "cached" not in first and second["cached"] is True
+    # Only the run that analyzed the page enters the history, under the id of its stored record
+    assert history == [first["analysis_id"]]
+    assert store.get(first["analysis_id"])["results"]["overall_score"] == 70
@@ -0,0 +1,92 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from bs4 import BeautifulSoup
+from multidict import CIMultiDict
+
+from analyzer import DOCUMENT_CATEGORIES, PageDocument, WebsiteAnalyzer
+from html_parsers import available_backends, get_parser_backend
+import html_parsers
+
+# Every backend must reproduce what the reference backend reports on these pages
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'test_fixtures', 'pages')
+REFERENCE_BACKEND = 'bs4'
+PAGE_URL = 'https://example.com/blog/post'
+
+def analyze_fixture(path, backend):
+    """Run the document checks on a fixture page with one parser backend"""
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+
+    html_parsers.HTML_PARSER = backend
+    page = PageDocument(PAGE_URL, 200, CIMultiDict({'Content-Type': 'text/html'}), content, 0.5)
+    analyzer = WebsiteAnalyzer()
+
+    # Whole category results, so measured fields such as content.word_count must agree too
+    outcome = {}
+    for category in DOCUMENT_CATEGORIES:
+        outcome[category] = getattr(analyzer, f"_check_{category}")(PAGE_URL, page)
+    outcome['image_sources'] = page.image_sources()
+    outcome['internal_links'] = page.internal_links()
+    outcome['sub_resources'] = page.sub_resources()
+    return outcome
+
+def fixture_names():
+    return sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith('.html'))
+
+def compare_backends():
+    """Return a list of (fixture, backend, field) where a backend disagrees with the reference"""
+    mismatches = []
+    for name in fixture_names():
+        path = os.path.join(FIXTURES_DIR, name)
+        expected = analyze_fixture(path, REFERENCE_BACKEND)
+        for backend in available_backends():
+            if backend == REFERENCE_BACKEND:
+                continue
+            actual = analyze_fixture(path, backend)
+            for field in expected:
+                if actual[field] != expected[field]:
+                    mismatches.append((name, backend, field))
+    return mismatches
+
+def test_backends_agree():
+    original = html_parsers.HTML_PARSER
+    try:
+        assert compare_backends() == []
+    finally:
+        html_parsers.HTML_PARSER = original
+
+def test_reference_backend_reports_what_the_original_soup_code_did():
+    original = html_parsers.HTML_PARSER
+    try:
+        html_parsers.HTML_PARSER = REFERENCE_BACKEND
+        for name in fixture_names():
+            with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+                content = f.read()
+            # The per-category parses the analyzers did before the single-pass rules
+            soup = BeautifulSoup(content, 'html.parser')
+            index = PageDocument(PAGE_URL, 200, CIMultiDict({'Content-Type': 'text/html'}), content, 0.5).index
+
+            assert len(index['text'].split()) == len(soup.get_text().split()), name
+            assert index['h1'] == len(soup.find_all('h1')), name
+            assert index['headings'] == len(soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])), name
+            assert index['paragraphs'] == len(soup.find_all('p')), name
+            assert index['lists'] == len(soup.find_all(['ul', 'ol'])), name
+            assert index['images']['sources'] == [img.get('src') for img in soup.find_all('img')], name
+            assert index['links'] == [a['href'] for a in soup.find_all('a', href=True)], name
+    finally:
+        html_parsers.HTML_PARSER = original
+
+if __name__ == "__main__":
+    print(f"Parser backends installed: {', '.join(available_backends())}")
+    print(f"Default backend: {get_parser_backend().name}")
+
+    mismatches = compare_backends()
+    for name, backend, field in mismatches:
+        print(f"MISMATCH {name}: {backend} differs from {REFERENCE_BACKEND} in {field}")
+
+    if mismatches:
+        sys.exit(1)
+    print("\nAll backends agree on every fixture page")
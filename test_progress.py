@@ -0,0 +1,51 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from progress import ProgressBus
+
+def run_analysis(bus, analysis_id):
+    bus.publish(analysis_id, status="analyzing", progress=10, error=None)
+    for progress in (20, 34, 48, 62, 76, 90):
+        bus.publish(analysis_id, progress=progress)
+    bus.publish(analysis_id, results={"overall_score": 80}, progress=95)
+    bus.publish(analysis_id, status="completed", progress=100)
+
+def test_unwatched_progress_is_persisted_coarsely():
+    persisted = []
+
+    async def scenario():
+        bus = ProgressBus(persist=lambda analysis_id, state: persisted.append(state), retention=0)
+        run_analysis(bus, 'a1')
+
+    asyncio.run(scenario())
+    assert [state.get("progress") for state in persisted] == [10, 20, 34, 48, 62, 76, 90, 100]
+    # Only the final state carries the results
+    assert all("results" not in state for state in persisted[:-1])
+    assert persisted[-1]["results"] == {"overall_score": 80}
+
+def test_watched_progress_only_persists_final_state():
+    persisted = []
+
+    async def scenario():
+        bus = ProgressBus(persist=lambda analysis_id, state: persisted.append(state), retention=0)
+        seen = []
+
+        async def watch():
+            async for state in bus.subscribe('a1'):
+                seen.append(state["progress"])
+
+        watcher = asyncio.ensure_future(watch())
+        await asyncio.sleep(0)
+        bus.publish('a1', status="analyzing", progress=10)
+        await asyncio.sleep(0)
+        bus.publish('a1', progress=50)
+        await asyncio.sleep(0)
+        bus.publish('a1', status="completed", progress=100)
+        await asyncio.wait_for(watcher, 1)
+        return seen
+
+    assert asyncio.run(scenario()) == [10, 50, 100]
+    assert [state["status"] for state in persisted] == ["completed"]
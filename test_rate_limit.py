@@ -0,0 +1,86 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import pytest
+
+from rate_limit import HostBucket, HostRateLimiter, parse_retry_after
+
+def test_a_burst_goes_out_at_once_then_requests_are_spaced_at_the_rate():
+    bucket = HostBucket(rate=5, burst=2)
+    now = bucket.updated
+
+    assert [bucket.reserve(now) for _ in range(4)] == [0.0, 0.0, pytest.approx(0.2), pytest.approx(0.4)]
+    # Tokens earned later pay off the queued reservations first, and never pile up beyond the burst
+    assert bucket.reserve(now + 0.5) == pytest.approx(0.1)
+    assert bucket.reserve(now + 10) == 0.0
+    assert bucket.tokens == 1
+
+def test_refunds_never_exceed_the_burst():
+    bucket = HostBucket(rate=5, burst=2)
+    now = bucket.updated
+    bucket.reserve(now)
+    bucket.reserve(now)
+    bucket.reserve(now)
+
+    bucket.refund(now)
+    assert bucket.tokens == pytest.approx(0.0)
+    bucket.refund(now)
+    bucket.refund(now)
+    bucket.refund(now)
+    assert bucket.tokens == 2
+
+def test_cancelled_waiters_hand_their_token_back():
+    limiter = HostRateLimiter(requests_per_second=10, burst=1)
+    url = "https://example.com/"
+
+    async def scenario():
+        await limiter.acquire(url)
+        waiters = [asyncio.ensure_future(limiter.acquire(url)) for _ in range(5)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        started = time.monotonic()
+        await limiter.acquire(url)
+        return time.monotonic() - started
+
+    # Without the refunds this request would queue behind five abandoned reservations (0.6s)
+    assert asyncio.run(scenario()) < 0.2
+
+def test_throttling_pauses_the_host_and_halves_its_rate_until_it_recovers():
+    limiter = HostRateLimiter(requests_per_second=8, burst=1, max_backoff=60)
+    url = "https://example.com/"
+    bucket = limiter._bucket(url)
+
+    assert limiter.record(url, 429, retry_after="120") == 60
+    assert bucket.blocked_until - time.monotonic() == pytest.approx(60, abs=1)
+    assert bucket.rate == 4
+    # Without Retry-After the pause doubles with each strike
+    assert limiter.record(url, 503) == 2
+    assert bucket.rate == 2
+
+    for _ in range(10):
+        limiter.record(url, 200)
+    assert bucket.rate == 8
+    assert bucket.strikes == 0
+
+def test_caps_hold_a_host_below_its_rate_while_they_last():
+    limiter = HostRateLimiter(requests_per_second=8, burst=10)
+    url = "https://example.com/"
+    bucket = limiter._bucket(url)
+
+    with limiter.limited(url, 2):
+        assert (bucket.rate, bucket.burst) == (2, 1)
+        limiter.record(url, 200)
+        assert bucket.rate == 2
+    assert (bucket.max_rate, bucket.burst) == (8, 10)
+
+def test_retry_after_accepts_seconds_and_dates():
+    assert parse_retry_after("30") == 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import report_cache
+from report_cache import ReportCache, report_digest
+
+class FakeRenderPool:
+    """Writes a small file per render into the cache directory, counting renders"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.renders = 0
+
+    async def render(self, results, name):
+        self.renders += 1
+        await asyncio.sleep(0.05)
+        path = os.path.join(self.directory, f"{name}.pdf")
+        with open(path, 'wb') as f:
+            f.write(b'%PDF ' + repr(results).encode())
+        return path
+
+def make_cache(tmp_path, monkeypatch, **limits):
+    pool = FakeRenderPool(str(tmp_path))
+    monkeypatch.setattr(report_cache, 'get_render_pool', lambda: pool)
+    return ReportCache(str(tmp_path), **limits), pool
+
+def test_digests_depend_on_content_not_key_order():
+    assert report_digest({"a": 1, "b": [1, 2]}) == report_digest({"b": [1, 2], "a": 1})
+    assert report_digest({"a": 1}) != report_digest({"a": 2})
+
+def test_reports_render_once_and_are_served_from_the_cache_after(tmp_path, monkeypatch):
+    cache, pool = make_cache(tmp_path, monkeypatch)
+    results = {"url": "https://example.com/", "overall_score": 80}
+
+    async def scenario():
+        concurrent = await asyncio.gather(*(cache.get(dict(results)) for _ in range(5)))
+        return concurrent, await cache.get(results)
+
+    concurrent, later = asyncio.run(scenario())
+
+    assert pool.renders == 1
+    assert set(concurrent) == {later} == {cache.path_for(report_digest(results))}
+    # Only the finished report is left, under its content hash
+    assert os.listdir(tmp_path) == [f"{report_digest(results)}.pdf"]
+
+def test_changed_results_get_a_new_report(tmp_path, monkeypatch):
+    cache, pool = make_cache(tmp_path, monkeypatch)
+
+    async def scenario():
+        first = await cache.get({"overall_score": 80})
+        second = await cache.get({"overall_score": 81})
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first != second
+    assert pool.renders == 2
+
+def test_a_render_abandoned_by_its_download_is_still_cached(tmp_path, monkeypatch):
+    cache, pool = make_cache(tmp_path, monkeypatch)
+    results = {"overall_score": 80}
+
+    async def scenario():
+        download = asyncio.ensure_future(cache.get(results))
+        await asyncio.sleep(0.01)
+        download.cancel()
+        await asyncio.sleep(0.1)
+        return cache.lookup(report_digest(results))
+
+    assert asyncio.run(scenario()) is not None
+    assert pool.renders == 1
+
+def write_report(directory, name, size, age):
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    then = time.time() - age
+    os.utime(path, (then, then))
+    return path
+
+def test_eviction_drops_stale_reports_then_the_least_recently_used(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=250, max_age=3600)
+    write_report(tmp_path, 'stale.pdf', 10, age=7200)
+    write_report(tmp_path, 'oldest.pdf', 100, age=300)
+    write_report(tmp_path, 'older.pdf', 100, age=200)
+    write_report(tmp_path, 'recent.pdf', 100, age=100)
+    write_report(tmp_path, '.rendering.pdf', 1000, age=10)
+    write_report(tmp_path, '.crashed.pdf', 1000, age=7200)
+    # Downloading a report makes it recently used again
+    assert cache.lookup('oldest') is not None
+
+    assert cache.evict() == 3
+
+    assert sorted(os.listdir(tmp_path)) == ['.rendering.pdf', 'oldest.pdf', 'recent.pdf']
+    assert cache.lookup('older') is None
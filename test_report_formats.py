@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import pytest
+
+from report_formats import RENDERERS, get_renderer
+
+def completed(analysis_id, url, overall, seo_score, seo_issues):
+    return {
+        "id": analysis_id,
+        "url": url,
+        "status": "completed",
+        "error": None,
+        "results": {
+            "url": url,
+            "overall_score": overall,
+            "performance": {"score": 90, "issues": [], "recommendations": ["Use a CDN"]},
+            "seo": {"score": seo_score, "issues": seo_issues, "recommendations": []}
+        }
+    }
+
+RECORDS = [
+    completed('a1', 'https://example.com/', 85, 40, ['Missing <title> & meta description']),
+    completed('a2', 'https://example.org/?q="x"', 72, 80, ['Title too long']),
+    {"id": 'a3', "url": 'https://down.example/', "status": "failed", "error": "Connection refused", "results": None}
+]
+BATCH = {"id": 'b1', "type": "batch", "summary": {"total": 3, "average_score": 78}}
+
+def render(name, records=RECORDS, source=BATCH):
+    return ''.join(get_renderer(name).render(source, iter(records)))
+
+def test_json_report_streams_the_summary_and_every_analysis():
+    report = json.loads(render('json'))
+
+    assert report["id"] == 'b1' and report["summary"] == BATCH["summary"]
+    assert [entry["analysis_id"] for entry in report["analyses"]] == ['a1', 'a2', 'a3']
+    assert report["analyses"][2] == {"analysis_id": 'a3', "url": 'https://down.example/', "status": "failed",
+                                     "error": "Connection refused", "results": None}
+    assert json.loads(render('json', records=[]))["analyses"] == []
+
+def test_csv_report_has_a_row_per_analysis_with_category_scores():
+    rows = list(csv.reader(io.StringIO(render('csv'))))
+
+    assert rows[0] == ['analysis_id', 'url', 'status', 'overall_score', 'performance', 'accessibility',
+                       'seo', 'security', 'content', 'issues', 'error']
+    assert rows[1] == ['a1', 'https://example.com/', 'completed', '85', '90', '', '40', '', '', '1', '']
+    # Quotes in URLs survive the round trip
+    assert rows[2][1] == 'https://example.org/?q="x"'
+    assert rows[3] == ['a3', 'https://down.example/', 'failed', '', '', '', '', '', '', '', 'Connection refused']
+
+def test_html_report_escapes_page_text():
+    page = render('html', source={"id": 'a1', "url": 'https://example.com/'}, records=RECORDS[:1] + RECORDS[2:])
+
+    assert page.startswith('<!DOCTYPE html>') and page.rstrip().endswith('</html>')
+    assert '<title>Website Analysis Report - https://example.com/</title>' in page
+    assert '<li>[SEO] Missing &lt;title&gt; &amp; meta description</li>' in page
+    assert '<li>[PERFORMANCE] Use a CDN</li>' in page
+    assert 'Overall Score:</b> 85/100 (Good)' in page
+    assert 'Status: failed - Connection refused' in page
+
+def test_sarif_report_has_a_result_per_issue_and_notes_failed_analyses():
+    log = json.loads(render('sarif'))
+
+    assert log["version"] == "2.1.0"
+    run = log["runs"][0]
+    assert [rule["id"] for rule in run["tool"]["driver"]["rules"]] == ['performance', 'accessibility', 'seo',
+                                                                       'security', 'content']
+    assert [(result["ruleId"], result["level"], result["message"]["text"]) for result in run["results"]] == [
+        ('seo', 'error', 'Missing <title> & meta description'),
+        ('seo', 'warning', 'Title too long')
+    ]
+    assert run["results"][1]["locations"][0]["physicalLocation"]["artifactLocation"]["uri"] == 'https://example.org/?q="x"'
+    invocation = run["invocations"][0]
+    assert invocation["executionSuccessful"] is False
+    assert invocation["toolExecutionNotifications"][0]["message"]["text"] == 'https://down.example/: Connection refused'
+
+def test_renderers_consume_records_one_at_a_time():
+    for name in RENDERERS:
+        consumed = []
+
+        def records():
+            for record in RECORDS:
+                consumed.append(record["id"])
+                yield record
+
+        chunks = get_renderer(name).render(BATCH, records())
+        next(chunks)
+        assert consumed == []
+        next(chunks)
+        assert len(consumed) <= 1
+
+def test_unknown_formats_are_rejected():
+    with pytest.raises(ValueError):
+        get_renderer('xml')
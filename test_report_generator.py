@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from reportlab.platypus import Spacer
+
+from report_generator import LazyStory, PDFReportGenerator, transport_tables
+
+API_DIR = os.path.join(os.path.dirname(__file__), 'api')
+
+def transport(error):
+    return {
+        'compression': {'encodings': {}, 'best_encoding': None, 'supported': False, 'savings': None},
+        'protocol': {'http_version': 'HTTP/1.1', 'tls_version': None, 'http3_advertised': False, 'error': error},
+        'keep_alive': {'supported': None},
+    }
+
+def test_protocol_errors_are_printed_as_text_not_markup():
+    error = "[SSL] <urlopen error> & unexpected EOF"
+
+    elements = transport_tables(transport(error))
+
+    assert elements[-1].getPlainText() == error
+
+def test_audit_errors_are_printed_as_text_not_markup():
+    elements = transport_tables({'error': "<b>refused</b> & closed"})
+
+    assert elements[0].getPlainText() == "Audit could not be completed: <b>refused</b> & closed"
+
+def test_render_workers_do_not_load_the_analyzer():
+    code = "import sys, report_generator, report_formats; print(sorted({'analyzer', 'aiohttp'} & set(sys.modules)))"
+
+    loaded = subprocess.run([sys.executable, '-c', code], cwd=API_DIR, capture_output=True, text=True, check=True)
+
+    assert loaded.stdout.strip() == "[]"
+
+def test_lazy_story_holds_only_its_window_of_flowables():
+    pulled = []
+
+    def flowables():
+        for index in range(1000):
+            pulled.append(index)
+            yield Spacer(1, 1)
+
+    story = LazyStory(flowables(), window=8)
+
+    assert len(story) == 8 and len(pulled) == 8
+    story.pop(0)
+    assert len(story) == 8 and len(pulled) == 9
+
+def test_multi_site_reports_stream_their_records_in_three_passes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir('reports')
+    reads = []
+
+    def records():
+        reads.append(0)
+        for index in range(45):
+            reads[-1] += 1
+            if index % 10 == 9:
+                yield {"url": f"https://site{index}.example/", "status": "failed", "error": "<refused> & closed"}
+            else:
+                yield {"url": f"https://site{index}.example/", "status": "completed",
+                       "results": {"overall_score": 50 + index, "seo": {"score": 70, "issues": ["Missing <title>"],
+                                                                        "recommendations": []}}}
+
+    path = PDFReportGenerator().generate_multi_site_report(records, 'batch-1', title="Batch <1>")
+
+    # Once for the summary, once for the overview tables and once for the site sections
+    assert reads == [45, 45, 45]
+    with open(path, 'rb') as f:
+        assert f.read(5) == b'%PDF-'
@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from aiohttp import web
+
+import main
+from analyzer import WebsiteAnalyzer
+from result_cache import ResultCache, cache_key
+from scoring import CATEGORIES
+
+PAGE_URL = 'https://example.com/'
+
+def analysis(score, etag='"v1"', failed=()):
+    document = {"url": PAGE_URL, "overall_score": score}
+    for category in CATEGORIES:
+        document[category] = {"error": "timed out", "score": 0} if category in failed else {"score": score}
+    document["performance"]["headers"] = {"ETag": etag, "last-modified": "Wed, 01 Jan 2025 00:00:00 GMT"}
+    return document
+
+def test_keys_match_any_form_of_the_url_but_not_other_options():
+    assert cache_key('https://Example.com:443/?b=2&a=1#top') == cache_key('https://example.com/?a=1&b=2')
+    assert cache_key(PAGE_URL, {"a": 1, "b": 2}) == cache_key(PAGE_URL, {"b": 2, "a": 1})
+    assert cache_key(PAGE_URL) != cache_key(PAGE_URL, {"transport_audit": True})
+
+def test_entries_keep_their_validators_and_the_least_recently_used_goes_first():
+    cache = ResultCache(ttl=60, max_entries=2)
+    cache.put('a', analysis(80))
+    cache.put('b', analysis(70))
+    cache.get('a')
+    cache.put('c', analysis(60))
+
+    assert cache.get('b') is None
+    entry = cache.get('a')
+    assert (entry.etag, entry.last_modified) == ('"v1"', "Wed, 01 Jan 2025 00:00:00 GMT")
+    assert cache.is_fresh(entry)
+    assert not ResultCache(ttl=0).is_fresh(entry)
+    cache.invalidate('a')
+    assert cache.get('a') is None
+
+def test_the_origin_is_asked_whether_a_stale_page_changed():
+    async def serve(request):
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text='<html></html>', content_type='text/html', headers={'ETag': '"v2"'})
+
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/', serve)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        url = f"http://127.0.0.1:{runner.addresses[0][1]}/"
+        try:
+            async with WebsiteAnalyzer(limiter=None) as analyzer:
+                return [await analyzer.is_unchanged(url, etag) for etag in ('"v1"', '"v0"', None)]
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(scenario()) == [True, False, False]
+
+class FakeAnalyzer:
+    """Stands in for WebsiteAnalyzer in produce_analysis, answering revalidations from a flag"""
+
+    unchanged = True
+    checked = 0
+
+    def __init__(self, executor=None):
+        pass
+
+    async def is_unchanged(self, url, etag=None, last_modified=None):
+        FakeAnalyzer.checked += 1
+        return FakeAnalyzer.unchanged
+
+def produce_with(monkeypatch, cache, documents):
+    runs = []
+
+    async def fake_analyze_url(analyzer, url, on_progress=None, page=None, audit_transport=False):
+        runs.append(url)
+        return documents[len(runs) - 1]
+
+    monkeypatch.setattr(main, 'result_cache', cache)
+    monkeypatch.setattr(main, 'WebsiteAnalyzer', FakeAnalyzer)
+    monkeypatch.setattr(main, 'analyze_url', fake_analyze_url)
+    monkeypatch.setattr(main, 'record_history', lambda analysis_id, results: None)
+    monkeypatch.setattr(FakeAnalyzer, 'unchanged', True)
+    monkeypatch.setattr(FakeAnalyzer, 'checked', 0)
+
+    def produce():
+        return asyncio.run(main.produce_analysis('a1', PAGE_URL, cache_key(PAGE_URL), {}, publish_progress=False))
+
+    return produce, runs
+
+def test_fresh_results_are_served_without_asking_the_origin(monkeypatch):
+    produce, runs = produce_with(monkeypatch, ResultCache(ttl=60), [analysis(80)])
+
+    assert produce() == {"results": analysis(80)}
+    assert produce() == {"results": analysis(80), "cached": True}
+    assert (len(runs), FakeAnalyzer.checked) == (1, 0)
+
+def test_stale_results_are_served_only_while_the_page_is_unchanged(monkeypatch):
+    produce, runs = produce_with(monkeypatch, ResultCache(ttl=0), [analysis(80), analysis(60, etag='"v2"')])
+
+    produce()
+    assert produce()["cached"] is True
+    FakeAnalyzer.unchanged = False
+    assert produce() == {"results": analysis(60, etag='"v2"')}
+    assert (len(runs), FakeAnalyzer.checked) == (2, 2)
+
+def test_partial_analyses_are_not_cached(monkeypatch):
+    produce, runs = produce_with(monkeypatch, ResultCache(ttl=60), [analysis(50, failed=('seo',)), analysis(80)])
+
+    produce()
+    assert produce() == {"results": analysis(80)}
+    assert len(runs) == 2
@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+import pytest
+
+from result_store import JSONFileResultStore, SQLiteResultStore
+
+@pytest.fixture(params=['sqlite', 'json'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteResultStore(str(tmp_path / 'results.db'))
+    return JSONFileResultStore(str(tmp_path / 'results.json'))
+
+def record(analysis_id, **fields):
+    return {"id": analysis_id, "url": "https://example.com/", "status": "queued", "progress": 0,
+            "started_at": datetime.now().isoformat(), "results": None, "error": None, **fields}
+
+def test_records_round_trip_and_update_in_place(store):
+    store.save('a1', record('a1'))
+
+    assert store.update('a1', status="completed", progress=100, results={"overall_score": 80})
+    assert store.get('a1') == record('a1', status="completed", progress=100, results={"overall_score": 80},
+                                     started_at=store.get('a1')["started_at"])
+    assert not store.update('missing', status="failed")
+    assert store.get('missing') is None
+    assert store.delete('a1') and not store.delete('a1')
+    assert store.get('a1') is None
+
+def test_saving_replaces_the_whole_record(store):
+    store.save('a1', record('a1', error="first try"))
+    store.save('a1', record('a1', status="analyzing"))
+
+    assert store.get('a1')["error"] is None
+    assert store.get('a1')["status"] == "analyzing"
+
+def test_sqlite_cleanup_removes_records_not_written_recently(tmp_path, monkeypatch):
+    store = SQLiteResultStore(str(tmp_path / 'results.db'))
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now - 30 * 86400)
+    store.save('old', record('old'))
+    store.save('touched', record('touched'))
+    monkeypatch.setattr(time, 'time', lambda: now)
+    store.save('new', record('new'))
+    store.update('touched', progress=50)
+
+    assert store.cleanup(7 * 86400) == 1
+    assert store.get('old') is None
+    assert store.get('touched')["progress"] == 50
+
+def test_json_cleanup_ages_records_by_when_they_started(tmp_path):
+    store = JSONFileResultStore(str(tmp_path / 'results.json'))
+    store.save('old', record('old', started_at=(datetime.now() - timedelta(days=30)).isoformat()))
+    store.save('new', record('new'))
+
+    assert store.cleanup(7 * 86400) == 1
+    assert store.get('old') is None and store.get('new') is not None
+
+def test_concurrent_updates_of_different_fields_all_land(tmp_path):
+    store = SQLiteResultStore(str(tmp_path / 'results.db'))
+    store.save('a1', record('a1'))
+
+    def write(field):
+        for index in range(20):
+            store.update('a1', **{field: index})
+
+    threads = [threading.Thread(target=write, args=(f"field_{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = store.get('a1')
+    assert [saved[f"field_{index}"] for index in range(4)] == [19] * 4
+    assert saved["url"] == "https://example.com/"
@@ -0,0 +1,99 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api'))
+
+from urllib.robotparser import RobotFileParser
+
+from robots import RobotsCache
+from single_flight import SingleFlight
+
+class SlowRobotsCache(RobotsCache):
+    """Robots cache whose fetch takes a while and is counted instead of sent"""
+
+    def __init__(self):
+        super().__init__(limiter=None)
+        self.fetches = 0
+
+    async def _fetch(self, origin, session):
+        self.fetches += 1
+        await asyncio.sleep(0.05)
+        parser = RobotFileParser(f"{origin}/robots.txt")
+        parser.parse(["User-agent: *", "Disallow: /private"])
+        return parser
+
+def test_cancelled_lookup_leaves_shared_robots_fetch_running():
+    async def scenario():
+        robots = SlowRobotsCache()
+        first = asyncio.ensure_future(robots.allowed('https://example.com/a', None))
+        second = asyncio.ensure_future(robots.allowed('https://example.com/private/b', None))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        allowed = await asyncio.wait_for(second, 1)
+        return first.cancelled(), allowed, robots.fetches
+
+    assert asyncio.run(scenario()) == (True, False, 1)
+
+def test_work_is_cancelled_once_every_caller_gives_up():
+    async def scenario():
+        flights = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flights.do('key', work)) for _ in range(2)]
+        await started.wait()
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+        callers[1].cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return 'key' in flights
+
+    assert asyncio.run(scenario()) is False
+
+def test_caller_reruns_work_cancelled_elsewhere():
+    async def scenario():
+        flights = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(asyncio.current_task())
+            await asyncio.sleep(0.05)
+            return len(runs)
+
+        caller = asyncio.ensure_future(flights.do('key', work))
+        await asyncio.sleep(0.01)
+        runs[0].cancel()
+        return await asyncio.wait_for(caller, 1)
+
+    assert asyncio.run(scenario()) == 2
+
+def test_owned_work_stops_with_its_starter_and_joiners_rerun_it():
+    async def scenario():
+        flights = SingleFlight(owned=True)
+        runs = []
+
+        async def work():
+            runs.append(flights.owner('key'))
+            await asyncio.sleep(0.05)
+            return len(runs)
+
+        starter = asyncio.ensure_future(flights.do('key', work, owner='a'))
+        await asyncio.sleep(0.01)
+        joiner = asyncio.ensure_future(flights.do('key', work, owner='b'))
+        await asyncio.sleep(0.01)
+        starter.cancel()
+        result = await asyncio.wait_for(joiner, 1)
+        return starter.cancelled(), result, runs
+
+    assert asyncio.run(scenario()) == (True, 2, ['a', 'b'])